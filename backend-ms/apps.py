@@ -1,51 +1,128 @@
 # apps.py
 import os
+import io
+import copy
 import json
+import hashlib
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 from bson import ObjectId
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
-from werkzeug.utils import secure_filename
-from pymongo import MongoClient
+from werkzeug.exceptions import RequestEntityTooLarge
+from pymongo import ASCENDING, MongoClient, ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from flask_bcrypt import Bcrypt
 from flask_jwt_extended import (
     JWTManager, create_access_token, jwt_required, get_jwt_identity
 )
-import google.generativeai as genai
 
 # --- Vos modules locaux (gardez vos implémentations existantes) ---
 from cv_parsing.extractors import extract_text
 from cv_parsing.gemini_parser import parse_cv_with_gemini
 from cv_parsing.job_parsing import parse_job
+from cv_parsing.normalization import derive_filters, prefilter_query
 from cv_job_matching import CVJobEmbeddingSimilarity
 from quiz_module import QuizGenerator, QuizEvaluator, Quiz, QuizQuestion
 from models.result import create_result
+from cache import BoundedCache, all_cache_stats
+from job_queue import JobQueue, current_job_id, serialize_job
+from quiz_store import QuizPrefetchStore, QuizStore, skills_key
+from question_bank import QuestionBank
+import llm_gateway
+import metrics
+from skill_taxonomy import taxonomy as skill_taxonomy
+from chat_sessions import ChatSessionStore
+from job_dedup import JobDeduplicator
 
 # -------------------- CONFIG APP --------------------
 app = Flask(__name__)
 # CORS pour Vite (5173) + Allow Authorization header
 CORS(app, resources={r"/api/*": {"origins": "*"}}, supports_credentials=True)
 
-UPLOAD_FOLDER = 'uploads'
 ALLOWED_EXTENSIONS = {'pdf', 'txt', 'docx'}
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+# Taille max d'un fichier uploadé (octets). Le corps HTTP est plafonné un peu au-dessus
+# (enveloppe multipart) : la requête est rejetée en 413 avant d'avoir tout lu.
+MAX_UPLOAD_BYTES = int(os.getenv('MAX_UPLOAD_BYTES', 10 * 1024 * 1024))
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+UPLOAD_CHUNK_SIZE = 64 * 1024
+# Upload groupé de CV (/api/parse-cv/batch)
+MAX_BATCH_FILES = int(os.getenv('MAX_BATCH_FILES', 50))
+MAX_BATCH_UPLOAD_BYTES = int(os.getenv('MAX_BATCH_UPLOAD_BYTES', 100 * 1024 * 1024))
+# Plafond global Werkzeug (le plus grand des deux) ; /api/upload applique en plus sa propre limite
+app.config['MAX_CONTENT_LENGTH'] = max(MAX_UPLOAD_BYTES, MAX_BATCH_UPLOAD_BYTES) + MULTIPART_OVERHEAD_BYTES
+
+# Cache des extractions (clé = extension + SHA-256 du contenu) : un ré-upload du même
+# fichier ne repasse pas par pdfplumber/docx.
+extraction_cache = BoundedCache("upload_extraction", max_size=int(os.getenv('EXTRACTION_CACHE_SIZE', 256)))
 
 app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'super-secret-key')
 
-# MongoDB
+# MongoDB (MONGO_MOCK=1 : base en mémoire via mongomock, pour les tests de charge locaux)
 mongo_uri = os.getenv('MONGO_URI', 'mongodb://localhost:27017/')
-client = MongoClient(mongo_uri)
+if os.getenv('MONGO_MOCK', '0').lower() in ('1', 'true', 'yes'):
+    import mongomock
+    client = mongomock.MongoClient()
+else:
+    client = MongoClient(mongo_uri)
 db = client['jobmatch']
 users_collection = db['users']
 
+# Index de préfiltrage des résultats CV/offre (champs typés "filters.*", cf. cv_parsing/normalization.py)
+try:
+    for _field in ("years_experience", "degree_level", "contract", "location"):
+        db.results.create_index([("user", ASCENDING), ("type", ASCENDING), (f"filters.{_field}", ASCENDING)])
+except Exception as e:
+    print(f"⚠️  Index de préfiltrage non créés: {e}")
+try:
+    # Un résultat par (tâche, type) : les nouvelles tentatives d'une tâche restent idempotentes
+    db.results.create_index([("meta.jobId", ASCENDING), ("type", ASCENDING)], unique=True,
+                            partialFilterExpression={"meta.jobId": {"$exists": True}})
+except Exception as e:
+    print(f"⚠️  Index résultats/tâches non créé: {e}")
+
 bcrypt = Bcrypt(app)
 jwt = JWTManager(app)
 
 # -------------------- GEMINI --------------------
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-gemini_model = genai.GenerativeModel('gemini-1.5-flash')
+gemini_model = llm_gateway.get_model('gemini-1.5-flash')
+
+# Single-flight inter-processus (plusieurs workers gunicorn) : appels Gemini identiques partagés via Mongo
+if os.getenv('LLM_SINGLE_FLIGHT_SHARED', '0').lower() in ('1', 'true', 'yes'):
+    llm_gateway.enable_shared_single_flight(db['llm_flights'])
+
+# File de tâches asynchrones (Mongo = file durable, workers locaux ; handlers enregistrés plus bas)
+# Seules les indisponibilités (délai, circuit ouvert, erreurs serveur/quota Gemini) sont retentées
+job_queue = JobQueue(db['jobs'], is_transient=llm_gateway.is_unavailable_error)
+
+# Exécuteur borné pour paralléliser les appels de parsing indépendants (CV / job)
+parse_executor = ThreadPoolExecutor(max_workers=int(os.getenv('PARSE_WORKERS', 4)),
+                                    thread_name_prefix="parse")
+# Exécuteur des uploads groupés (extraction + parsing) ; le budget d'appels Gemini
+# reste partagé via llm_gateway
+batch_executor = ThreadPoolExecutor(max_workers=int(os.getenv('BATCH_PARSE_WORKERS', 4)),
+                                    thread_name_prefix="batch")
+# Parsing spéculatif lancé dès /api/upload (clé = hash du texte) ; parse-cv et match s'y rattachent.
+# Exécuteur dédié : un thread de parse_executor peut attendre ces futures sans risque d'interblocage.
+# Réservé aux utilisateurs authentifiés, dans la limite d'un quota horaire par utilisateur.
+SPECULATIVE_PARSE_ENABLED = os.getenv('SPECULATIVE_PARSE', '1').lower() in ('1', 'true', 'yes')
+SPECULATIVE_PARSE_HOURLY_QUOTA = int(os.getenv('SPECULATIVE_PARSE_HOURLY_QUOTA', 20))
+speculative_quota = db['speculative_parse_quota']
+try:
+    speculative_quota.create_index([("user", ASCENDING), ("hour", ASCENDING)], unique=True)
+    speculative_quota.create_index("expiresAt", expireAfterSeconds=0)
+except Exception as e:
+    print(f"⚠️  Index quota parsing spéculatif non créés: {e}")
+speculative_executor = ThreadPoolExecutor(max_workers=int(os.getenv('SPECULATIVE_PARSE_WORKERS', 2)),
+                                          thread_name_prefix="speculative")
+_speculative_lock = threading.Lock()
+speculative_parses = BoundedCache("speculative_cv_parse",
+                                  max_size=int(os.getenv('SPECULATIVE_PARSE_CACHE_SIZE', 128)),
+                                  ttl_seconds=float(os.getenv('SPECULATIVE_PARSE_TTL_S', 1800)))
 
 # Similarity model
 try:
@@ -55,14 +132,29 @@ except Exception as e:
     print(f"❌ Erreur modèle similarité: {e}")
     similarity_calculator = None
 
+# Offres déjà parsées (tous utilisateurs) : une offre quasi identique réutilise parsing + embeddings
+job_dedup = JobDeduplicator(db['job_signatures'])
+
+# Banque de questions réutilisables (par compétence normalisée et niveau)
+question_bank = QuestionBank(db['question_bank'], db['question_bank_seen'])
+
 # Quiz generator
 try:
-    quiz_generator = QuizGenerator(gemini_model)
+    quiz_generator = QuizGenerator(gemini_model, question_bank=question_bank)
     print("✅ Générateur de quiz prêt")
 except Exception as e:
     print(f"❌ Erreur générateur quiz: {e}")
     quiz_generator = None
 
+# Évaluateur de quiz partagé (même modèle que le générateur)
+quiz_evaluator = QuizEvaluator(gemini_model)
+# Quiz persistés côté serveur (vérifiés une fois, en arrière-plan, après génération)
+quiz_store = QuizStore(db['quizzes'])
+# Quiz pré-générés après parsing du CV (un par niveau, cap par utilisateur)
+quiz_prefetch = QuizPrefetchStore(db['quiz_prefetch'], db['quiz_prefetch_quota'])
+QUIZ_PREFETCH_COUNT = int(os.getenv('QUIZ_PREFETCH_COUNT', 10))
+QUIZ_PREFETCH_ENABLED = os.getenv('QUIZ_PREFETCH', '1').lower() in ('1', 'true', 'yes')
+
 # -------------------- HELPERS GÉNÉRAUX --------------------
 def _first_non_empty(*vals):
     for v in vals:
@@ -76,13 +168,158 @@ def _top(items: List[str], k=8):
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def read_upload_capped(file_storage, limit: int = MAX_UPLOAD_BYTES) -> io.BytesIO:
+    """
+    Lit le flux d'un fichier uploadé par blocs, en mémoire (aucun fichier temporaire sur disque).
+    Lève RequestEntityTooLarge dès que la limite est dépassée, sans lire le reste du flux.
+    """
+    buf = io.BytesIO()
+    size = 0
+    while True:
+        chunk = file_storage.stream.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > limit:
+            raise RequestEntityTooLarge()
+        buf.write(chunk)
+    buf.seek(0)
+    return buf
+
+def reject_if_body_too_large(limit: int) -> None:
+    """413 immédiat si le Content-Length annoncé dépasse la limite (avant toute lecture du corps)."""
+    if request.content_length is not None and request.content_length > limit + MULTIPART_OVERHEAD_BYTES:
+        raise RequestEntityTooLarge()
+
+def extract_upload_text(content: io.BytesIO, filename: str):
+    """Extraction (avec cache par hash du contenu). Renvoie (texte, warning, cached)."""
+    ext = filename.rsplit('.', 1)[1].lower()
+    cache_key = (ext, hashlib.sha256(content.getbuffer()).hexdigest())
+    cached = extraction_cache.get(cache_key)
+    if cached is not None:
+        extracted_text, warning = cached
+        return extracted_text, warning, True
+    extracted_text = extract_text(content, filename=filename)
+    warning = ""
+    if not extracted_text.strip():
+        warning = "Aucun texte détecté. PDF scanné ? Utilisez un PDF texte ou un OCR."
+    elif len(extracted_text.strip()) < 50:
+        warning = "Texte très court détecté. Vérifiez la qualité du fichier."
+    extraction_cache.set(cache_key, (extracted_text, warning))
+    return extracted_text, warning, False
+
+def _cv_text_key(cv_text: str) -> str:
+    return hashlib.sha256(cv_text.strip().encode('utf-8')).hexdigest()
+
+def consume_speculative_quota(user_id) -> bool:
+    """Réserve un parsing spéculatif sur le quota horaire de l'utilisateur ; False si épuisé."""
+    now = datetime.utcnow()
+    try:
+        speculative_quota.update_one(
+            {"user": ObjectId(user_id), "hour": now.strftime("%Y-%m-%dT%H"),
+             "count": {"$lt": SPECULATIVE_PARSE_HOURLY_QUOTA}},
+            {"$inc": {"count": 1}, "$setOnInsert": {"expiresAt": now + timedelta(hours=2)}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        # Document de l'heure déjà au quota : l'upsert tente une insertion en doublon
+        return False
+    return True
+
+def start_speculative_parse(cv_text: str, user_id=None) -> bool:
+    """
+    Lance (une seule fois par texte) le parsing Gemini en arrière-plan ; renvoie True si un parsing est disponible.
+    Jamais pour un envoi anonyme (appel Gemini payant), et dans la limite du quota horaire de l'utilisateur.
+    """
+    if not SPECULATIVE_PARSE_ENABLED or not user_id or len(cv_text.strip()) < 50:
+        return False
+    key = _cv_text_key(cv_text)
+    with _speculative_lock:
+        if speculative_cv_parse(cv_text) is None:
+            if SPECULATIVE_PARSE_HOURLY_QUOTA <= 0 or not consume_speculative_quota(user_id):
+                metrics.incr("cv_parse.speculative_quota_exceeded")
+                return False
+            speculative_parses.set(key, speculative_executor.submit(parse_cv_with_gemini, cv_text.strip()))
+            metrics.incr("cv_parse.speculative_started")
+    return True
+
+def is_degraded(parsed) -> bool:
+    """Résultat partiel du pré-parsing local (Gemini indisponible)."""
+    return isinstance(parsed, dict) and bool(parsed.get('degraded'))
+
+def speculative_cv_parse(cv_text: str) -> Optional[Future]:
+    """Parsing spéculatif (en cours ou terminé) de ce texte, ou None (absent ou en échec)."""
+    key = _cv_text_key(cv_text)
+    future = speculative_parses.get(key)
+    if future is not None and future.done() and (future.exception() is not None or is_degraded(future.result())):
+        speculative_parses.pop(key)
+        return None
+    return future
+
+def resolve_cv_parse(cv_text: str, future: Optional[Future] = None):
+    """Attend le parsing spéculatif s'il existe, sinon (ou s'il échoue) parse directement."""
+    if future is not None:
+        try:
+            parsed = future.result()
+            if not is_degraded(parsed):
+                metrics.incr("cv_parse.speculative_hits")
+                return copy.deepcopy(parsed)
+            # Résultat partiel (Gemini indisponible) : jamais resservi, nouvelle tentative
+            speculative_parses.pop(_cv_text_key(cv_text))
+        except Exception as e:
+            speculative_parses.pop(_cv_text_key(cv_text))
+            print(f"⚠️  Parsing spéculatif en échec, nouveau parsing: {e}")
+    metrics.incr("cv_parse.speculative_misses")
+    return parse_cv_with_gemini(cv_text)
+
+def result_filters(result_type, data):
+    """Champs de préfiltrage d'un résultat ; une normalisation en échec n'empêche pas la sauvegarde."""
+    try:
+        return derive_filters(result_type, data)
+    except Exception as e:
+        print(f"⚠️  Normalisation {result_type} en échec: {e}")
+        return None
+
 def save_result_to_db(user_id, result_type, data, meta=None, refs=None):
     try:
-        result = create_result(user_id, result_type, data, meta, refs)
-        db.results.insert_one(result)
+        job_id = current_job_id()
+        if job_id:
+            meta = {**(meta or {}), "jobId": job_id}
+        result = create_result(user_id, result_type, data, meta, refs, result_filters(result_type, data))
+        if job_id:
+            # Exécuté par un worker : une nouvelle tentative de la même tâche ne crée pas de doublon
+            saved = db.results.find_one_and_update(
+                {"user": result["user"], "type": result_type, "meta.jobId": job_id},
+                {"$setOnInsert": result}, upsert=True, return_document=ReturnDocument.AFTER)
+            print(f"✅ Résultat {result_type} sauvegardé (tâche {job_id})")
+            return saved["_id"]
+        inserted_id = db.results.insert_one(result).inserted_id
         print(f"✅ Résultat {result_type} sauvegardé")
+        return inserted_id
     except Exception as e:
         print(f"❌ Erreur save_result: {e}")
+        return None
+
+def error_status(e):
+    """503 si Gemini est indisponible (la tâche sera retentée), 500 pour une erreur déterministe."""
+    return 503 if llm_gateway.is_unavailable_error(e) else 500
+
+def wants_async(data: Dict[str, Any]) -> bool:
+    """Mode asynchrone demandé via ?async=1 ou {"async": true} dans le corps."""
+    flag = request.args.get('async')
+    if flag is not None:
+        return flag.lower() in ('1', 'true', 'yes')
+    return bool((data or {}).get('async'))
+
+def enqueue_job_response(job_type: str, payload: Dict[str, Any], user_id):
+    """Met la tâche en file et répond 202 avec l'id de tâche à interroger."""
+    try:
+        job_id = job_queue.enqueue(job_type, payload, user_id)
+    except Exception as e:
+        return jsonify({'error': f'Mise en file impossible: {e}'}), 500
+    resp = jsonify({'success': True, 'jobId': job_id, 'status': 'queued', 'statusUrl': f'/api/jobs/{job_id}'})
+    resp.headers['Location'] = f'/api/jobs/{job_id}'
+    return resp, 202
 
 def generate_feedback(percentage: float, detailed_results: list) -> dict:
     if percentage >= 80:
@@ -310,39 +547,12 @@ def get_user_profile():
 def _norm_list(x):
     return x if isinstance(x, list) else (x or [])
 
-KNOWN_CERTS = {
-    "aws": [
-        {"certification": "AWS Certified Cloud Practitioner", "priority": "Moyenne", "relevance": "AWS"},
-        {"certification": "AWS Solutions Architect – Associate", "priority": "Haute", "relevance": "AWS"},
-    ],
-    "azure": [
-        {"certification": "Microsoft Azure Fundamentals (AZ-900)", "priority": "Moyenne", "relevance": "Azure"},
-        {"certification": "Azure Administrator Associate (AZ-104)", "priority": "Haute", "relevance": "Azure"},
-    ],
-    "gcp": [{"certification": "Google Associate Cloud Engineer", "priority": "Moyenne", "relevance": "GCP"}],
-    "kubernetes": [{"certification": "CKA - Certified Kubernetes Administrator", "priority": "Haute", "relevance": "Kubernetes"}],
-    "docker": [{"certification": "Docker Certified Associate", "priority": "Moyenne", "relevance": "Docker"}],
-    "elastic": [{"certification": "Elastic Certified Engineer", "priority": "Haute", "relevance": "ELK Stack"}],
-    "elk": [{"certification": "Elastic Certified Engineer", "priority": "Haute", "relevance": "ELK Stack"}],
-    "oracle": [{"certification": "Oracle Certified Professional, SQL and PL/SQL", "priority": "Haute", "relevance": "Oracle/SQL"}],
-    "sql": [{"certification": "Oracle Certified Professional, SQL and PL/SQL", "priority": "Haute", "relevance": "SQL"}],
-    "java": [
-        {"certification": "Oracle Certified Associate, Java SE Programmer", "priority": "Haute", "relevance": "Java"},
-        {"certification": "Oracle Certified Professional, Java SE Programmer", "priority": "Moyenne", "relevance": "Java"},
-    ],
-    "python": [{"certification": "PCAP – Certified Associate in Python Programming", "priority": "Moyenne", "relevance": "Python"}],
-}
-
 def suggest_certs_for_skills(skills):
+    """Certifications de la taxonomie (compétence reconnue ou parente), sinon certification générique."""
     out = []
-    for s in skills:
-        key = str(s).lower()
-        added = False
-        for k, certs in KNOWN_CERTS.items():
-            if k in key:
-                out.extend(certs); added = True; break
-        if not added:
-            out.append({"certification": f"Certification {s}", "priority": "Moyenne", "relevance": str(s)})
+    for s, found in zip(skills, skill_taxonomy.extract_each(skills)):
+        certs = next((c for c in map(skill_taxonomy.certifications, found) if c), None)
+        out.extend(certs or [{"certification": f"Certification {s}", "priority": "Moyenne", "relevance": str(s)}])
     # unicité
     seen = set(); uniq = []
     for c in out:
@@ -352,23 +562,10 @@ def suggest_certs_for_skills(skills):
     return uniq[:8]
 
 def suggest_projects_for_skills(skills):
+    """Idée de projet de la taxonomie (compétence reconnue ou parente), sinon mini-projet générique."""
     ideas = []
-    for s in skills:
-        t = str(s); low = t.lower()
-        if "java" in low or "j2ee" in low:
-            ideas.append("Application J2EE (CRUD + Auth + Tests)")
-        elif "elk" in low or "elastic" in low:
-            ideas.append("Analyse de logs avec ELK Stack (Filebeat → Logstash → ES → Kibana)")
-        elif "sql" in low or "oracle" in low:
-            ideas.append("Optimisation de requêtes SQL et modélisation relationnelle")
-        elif "kubernetes" in low:
-            ideas.append("Déploiement applicatif sur Kubernetes (Ingress, HPA, ConfigMaps)")
-        elif "docker" in low:
-            ideas.append("Containerisation d’un microservice + CI/CD")
-        elif "aws" in low:
-            ideas.append("Serverless sur AWS (API Gateway + Lambda + DynamoDB)")
-        else:
-            ideas.append(f"Mini-projet appliquant {t}")
+    for s, found in zip(skills, skill_taxonomy.extract_each(skills)):
+        ideas.append(next((p for p in map(skill_taxonomy.project, found) if p), None) or f"Mini-projet appliquant {s}")
     # unicité
     seen = set(); uniq = []
     for p in ideas:
@@ -517,7 +714,7 @@ def get_me():
 def home():
     return jsonify({'message': 'Serveur de matching CV actif',
                     'status': 'ok',
-                    'endpoints': ['/api/upload','/api/parse-cv','/api/parse-job','/api/match','/api/assistant/cards','/api/assistant/recommendations','/api/chat','/api/quiz']})
+                    'endpoints': ['/api/upload','/api/parse-cv','/api/parse-cv/batch','/api/parse-job','/api/match','/api/assistant/cards','/api/assistant/recommendations','/api/chat','/api/chat/stream','/api/quiz','/api/quiz/stream','/api/jobs/<id>']})
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
@@ -525,30 +722,53 @@ def health_check():
                     'model_available': bool(similarity_calculator and getattr(similarity_calculator, 'model', None)),
                     'model_type': getattr(similarity_calculator, 'model_type', 'none')})
 
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    return jsonify({'caches': all_cache_stats(), 'llm': llm_gateway.health(), 'job_dedup': job_dedup.stats(),
+                    **metrics.snapshot()})
+
 # Upload/extraction texte
 @app.route('/api/upload', methods=['POST'])
+@jwt_required(optional=True)
 def upload_file():
+    reject_if_body_too_large(MAX_UPLOAD_BYTES)
     if 'file' not in request.files: return jsonify({'error': 'Aucun fichier fourni'}), 400
     file = request.files['file']
     if file.filename == '': return jsonify({'error': 'Aucun fichier sélectionné'}), 400
     if not allowed_file(file.filename): return jsonify({'error': 'Type de fichier non supporté'}), 400
 
-    tmp = os.path.join(UPLOAD_FOLDER, secure_filename(file.filename))
-    file.save(tmp)
     try:
-        extracted_text = extract_text(tmp)
-        warning = ""
-        if not extracted_text.strip():
-            warning = "Aucun texte détecté. PDF scanné ? Utilisez un PDF texte ou un OCR."
-        elif len(extracted_text.strip()) < 50:
-            warning = "Texte très court détecté. Vérifiez la qualité du fichier."
-        return jsonify({'text': extracted_text, 'filename': file.filename, 'warning': warning, 'success': True})
+        content = read_upload_capped(file)
+        extracted_text, warning, cached = extract_upload_text(content, file.filename)
+        # Le parsing démarre pendant que l'utilisateur saisit l'offre ; parse-cv/match s'y rattachent
+        parsing = start_speculative_parse(extracted_text, get_jwt_identity())
+        return jsonify({'text': extracted_text, 'filename': file.filename, 'warning': warning,
+                        'cached': cached, 'parsing': parsing, 'success': True})
+    except RequestEntityTooLarge:
+        raise
     except Exception as e:
         return jsonify({'error': f"Erreur d'extraction: {e}"}), 500
-    finally:
-        if os.path.exists(tmp): os.remove(tmp)
 
 # Parse CV
+CV_DEGRADED_WARNING = ("Service d'analyse momentanément indisponible : résultat partiel (coordonnées et "
+                       "compétences détectées), non enregistré. Relancez l'analyse dans quelques instants.")
+
+def run_parse_cv(user_id, cv_text):
+    """Parse + sauvegarde d'un CV. Renvoie (réponse JSON, code HTTP) — utilisé en synchrone et par les workers."""
+    try:
+        parsed = resolve_cv_parse(cv_text, speculative_cv_parse(cv_text))
+        if isinstance(parsed, str):
+            parsed = json.loads(parsed)
+    except Exception as e:
+        return {'error': f'Erreur parsing CV: {e}'}, error_status(e)
+
+    if is_degraded(parsed):
+        # Analyse partielle : ni enregistrée (elle remplacerait le dernier CV), ni prefetch de quiz
+        return {'parsed_cv': parsed, 'success': True, 'degraded': True, 'warning': CV_DEGRADED_WARNING}, 200
+    save_result_to_db(user_id, "cv", parsed, {"source": "gemini_parser", "original_text_length": len(cv_text)})
+    schedule_quiz_prefetch(user_id)
+    return {'parsed_cv': parsed, 'success': True}, 200
+
 @app.route('/api/parse-cv', methods=['POST'])
 @jwt_required()
 def parse_cv():
@@ -556,17 +776,146 @@ def parse_cv():
     cv_text = (data.get('cvText') or '').strip()
     if not cv_text: return jsonify({'error': 'Texte CV manquant'}), 400
 
+    if wants_async(data):
+        return enqueue_job_response("parse_cv", {"cvText": cv_text}, get_jwt_identity())
+    payload, status = run_parse_cv(get_jwt_identity(), cv_text)
+    return jsonify(payload), status
+
+# Parse CV groupé (upload de plusieurs fichiers + parsing en parallèle borné)
+def _batch_set_file(batch_id, index, **fields):
+    db.parse_batches.update_one({"_id": batch_id},
+                                {"$set": {**{f"files.{index}.{k}": v for k, v in fields.items()},
+                                          "updatedAt": datetime.utcnow()}})
+
+def _process_batch_file(batch_id, user_id, index, filename, content: io.BytesIO):
+    """Extraction + parsing d'un fichier du lot ; sauvegarde du résultat dès qu'il est prêt."""
     try:
-        parsed = parse_cv_with_gemini(cv_text)
+        _batch_set_file(batch_id, index, status="extracting")
+        cv_text, warning, _ = extract_upload_text(content, filename)
+        if not cv_text.strip():
+            raise ValueError(warning or "Aucun texte détecté")
+        _batch_set_file(batch_id, index, status="parsing", warning=warning)
+        parsed = parse_cv_with_gemini(cv_text.strip())
         if isinstance(parsed, str):
             parsed = json.loads(parsed)
+        if is_degraded(parsed):
+            raise RuntimeError("Service d'analyse indisponible, résultat partiel non enregistré")
+        result_id = save_result_to_db(user_id, "cv", parsed,
+                                      {"source": "batch_parser", "batch_id": str(batch_id), "filename": filename,
+                                       "original_text_length": len(cv_text)})
+        _batch_set_file(batch_id, index, status="done", resultId=str(result_id) if result_id else None,
+                        name=(parsed or {}).get("name"))
+        counter = "done"
     except Exception as e:
-        return jsonify({'error': f'Erreur parsing CV: {e}'}), 500
+        _batch_set_file(batch_id, index, status="failed", error=str(e))
+        counter = "failed"
+    batch = db.parse_batches.find_one_and_update({"_id": batch_id}, {"$inc": {counter: 1}},
+                                                 return_document=ReturnDocument.AFTER)
+    if batch and batch.get("done", 0) + batch.get("failed", 0) >= batch.get("total", 0):
+        db.parse_batches.update_one({"_id": batch_id},
+                                    {"$set": {"status": "completed", "finishedAt": datetime.utcnow()}})
+
+def serialize_batch(batch: Dict[str, Any]) -> Dict[str, Any]:
+    total = batch.get("total", 0)
+    finished = batch.get("done", 0) + batch.get("failed", 0)
+    return {
+        'batchId': str(batch["_id"]),
+        'status': batch.get("status"),
+        'total': total,
+        'done': batch.get("done", 0),
+        'failed': batch.get("failed", 0),
+        'progress': round(finished / total * 100, 1) if total else 100.0,
+        'files': batch.get("files", []),
+    }
 
-    save_result_to_db(get_jwt_identity(), "cv", parsed, {"source": "gemini_parser", "original_text_length": len(cv_text)})
-    return jsonify({'parsed_cv': parsed, 'success': True})
+@app.route('/api/parse-cv/batch', methods=['POST'])
+@jwt_required()
+def parse_cv_batch():
+    reject_if_body_too_large(MAX_BATCH_UPLOAD_BYTES)
+    files = [f for f in request.files.getlist('files') if f and f.filename]
+    if not files: return jsonify({'error': 'Aucun fichier fourni'}), 400
+    if len(files) > MAX_BATCH_FILES:
+        return jsonify({'error': f'Trop de fichiers (max {MAX_BATCH_FILES})'}), 400
+
+    user_id = get_jwt_identity()
+    entries, contents = [], []
+    for i, f in enumerate(files):
+        entry = {"index": i, "filename": f.filename, "status": "pending"}
+        if not allowed_file(f.filename):
+            entry.update(status="failed", error="Type de fichier non supporté")
+            contents.append(None)
+        else:
+            try:
+                contents.append(read_upload_capped(f))
+            except RequestEntityTooLarge:
+                entry.update(status="failed", error="Fichier trop volumineux")
+                contents.append(None)
+        entries.append(entry)
+
+    rejected = sum(1 for e in entries if e["status"] == "failed")
+    now = datetime.utcnow()
+    batch = {"user": ObjectId(user_id), "status": "running" if rejected < len(entries) else "completed",
+             "total": len(entries), "done": 0, "failed": rejected, "files": entries,
+             "createdAt": now, "updatedAt": now}
+    batch_id = db.parse_batches.insert_one(batch).inserted_id
+
+    for entry, content in zip(entries, contents):
+        if content is not None:
+            batch_executor.submit(_process_batch_file, batch_id, user_id, entry["index"], entry["filename"], content)
+
+    batch["_id"] = batch_id
+    resp = jsonify({'success': True, **serialize_batch(batch), 'statusUrl': f'/api/parse-cv/batch/{batch_id}'})
+    resp.headers['Location'] = f'/api/parse-cv/batch/{batch_id}'
+    return resp, 202
+
+@app.route('/api/parse-cv/batch/<batch_id>', methods=['GET'])
+@jwt_required()
+def parse_cv_batch_status(batch_id):
+    try:
+        batch = db.parse_batches.find_one({"_id": ObjectId(batch_id), "user": ObjectId(get_jwt_identity())})
+    except Exception:
+        batch = None
+    if not batch:
+        return jsonify({'success': False, 'error': 'Lot introuvable'}), 404
+    return jsonify({'success': True, **serialize_batch(batch)})
 
 # Parse Job
+JOB_DEGRADED_WARNING = ("Service d'analyse momentanément indisponible : offre non analysée (ou reprise d'une "
+                        "analyse précédente), non enregistrée. Relancez l'analyse dans quelques instants.")
+
+def has_job_content(parsed_job) -> bool:
+    """Vrai si l'offre porte de quoi calculer une similarité (titre, compétences ou responsabilités)."""
+    return bool(parsed_job.get('title') or parsed_job.get('required_skills') or parsed_job.get('responsibilities'))
+
+def parse_job_deduplicated(job_text):
+    """
+    parse_job avec réutilisation des offres déjà vues. Renvoie (offre parsée, id de signature, embeddings stockés).
+    Texte normalisé identique : parsing réutilisé. Offre quasi identique : nouveau parsing (les champs peuvent
+    différer), mais ses embeddings stockés sont rechargés dans le cache du modèle de similarité.
+    """
+    try:
+        known = job_dedup.find(job_text)
+    except Exception as e:
+        print(f"⚠️  Déduplication offre indisponible: {e}")
+        known = None
+    if known:
+        if similarity_calculator and known.get('embeddings'):
+            similarity_calculator.preload_embeddings({e['text']: e['vector'] for e in known['embeddings']})
+        if known.get('exact') and known.get('parsed'):
+            print("♻️  Offre déjà parsée réutilisée (texte identique)")
+            return copy.deepcopy(known['parsed']), str(known['_id']), bool(known.get('embeddings'))
+        print(f"♻️  Offre quasi identique (similarité {known['similarity']}) : embeddings réutilisés, nouveau parsing")
+
+    parsed_job = parse_job(job_text)
+    signature_id = None
+    # Une extraction de secours (Gemini indisponible) ou vide n'est pas mémorisée
+    if not is_degraded(parsed_job) and (parsed_job.get('title') or parsed_job.get('required_skills')):
+        try:
+            signature_id = job_dedup.remember(job_text, parsed_job)
+        except Exception as e:
+            print(f"⚠️  Signature offre non enregistrée: {e}")
+    return parsed_job, signature_id, False
+
 @app.route('/api/parse-job', methods=['POST'])
 @jwt_required()
 def parse_job_description():
@@ -574,54 +923,64 @@ def parse_job_description():
     job_text = (data.get('jobText') or '').strip()
     if not job_text: return jsonify({'error': 'Texte job description manquant'}), 400
     try:
-        parsed_job = parse_job(job_text)
+        parsed_job, _, _ = parse_job_deduplicated(job_text)
     except Exception as e:
         return jsonify({'error': f'Erreur parsing job: {e}'}), 500
 
+    if is_degraded(parsed_job):
+        return jsonify({'parsed_job': parsed_job, 'success': True, 'degraded': True, 'warning': JOB_DEGRADED_WARNING})
     save_result_to_db(get_jwt_identity(), "job", parsed_job, {"source": "job_parser", "original_text_length": len(job_text)})
     return jsonify({'parsed_job': parsed_job, 'success': True})
 
 # MATCH
-@app.route('/api/match', methods=['POST'])
-@jwt_required()
-def calculate_matching():
+def run_match(user_id, cv_text, job_text):
+    """Parsing CV/job + similarité + recommandations. Renvoie (réponse JSON, code HTTP)."""
     try:
-        data = request.get_json() or {}
-        cv_text = (data.get('cvText') or '').strip()
-        job_text = (data.get('jobText') or '').strip()
-        if not cv_text or not job_text:
-            return jsonify({'error': 'CV et job description requis'}), 400
         if not (similarity_calculator and getattr(similarity_calculator, 'model', None)):
-            return jsonify({'error': 'Modèle de similarité non disponible'}), 500
+            return {'error': 'Modèle de similarité non disponible'}, 500
 
-        # parse
+        # parse (CV et job en parallèle : latence ≈ le plus lent des deux ; CV rattaché au parsing spéculatif)
+        cv_future = parse_executor.submit(resolve_cv_parse, cv_text, speculative_cv_parse(cv_text))
+        job_future = parse_executor.submit(parse_job_deduplicated, job_text)
         try:
-            parsed_cv = parse_cv_with_gemini(cv_text)
+            parsed_cv = cv_future.result()
             if isinstance(parsed_cv, str):
                 parsed_cv = json.loads(parsed_cv)
         except Exception as e:
-            return jsonify({'error': f'Erreur parsing CV: {e}'}), 500
+            job_future.cancel()
+            return {'error': f'Erreur parsing CV: {e}'}, error_status(e)
 
         try:
-            parsed_job = parse_job(job_text)
+            parsed_job, job_signature_id, job_embeddings_stored = job_future.result()
         except Exception as e:
-            return jsonify({'error': f'Erreur parsing job: {e}'}), 500
+            return {'error': f'Erreur parsing job: {e}'}, error_status(e)
 
-        # autosave last job
-        try:
-            save_result_to_db(get_jwt_identity(), "job", parsed_job,
-                              {"source": "match_endpoint_autosave", "original_text_length": len(job_text)})
-        except Exception as e:
-            app.logger.warning(f"Autosave job failed: {e}")
+        job_degraded = is_degraded(parsed_job)
+        if job_degraded and not has_job_content(parsed_job):
+            # Offre vide (Gemini indisponible, aucune analyse précédente) : pas de score fictif
+            return {'error': JOB_DEGRADED_WARNING, 'degraded': True}, 503
+
+        # autosave last job (pas une analyse de secours)
+        if not job_degraded:
+            try:
+                save_result_to_db(user_id, "job", parsed_job,
+                                  {"source": "match_endpoint_autosave", "original_text_length": len(job_text)})
+            except Exception as e:
+                app.logger.warning(f"Autosave job failed: {e}")
 
         # similarity
         sim = similarity_calculator.calculate_comprehensive_embedding_similarity(parsed_cv, parsed_job)
-
-        # missing keywords
+        if job_signature_id and not job_embeddings_stored:
+            try:
+                job_dedup.store_embeddings(job_signature_id, similarity_calculator.export_embeddings(
+                    similarity_calculator.job_texts(parsed_job)))
+            except Exception as e:
+                app.logger.warning(f"Embeddings offre non stockés: {e}")
+
+        # missing keywords (compétences du CV + texte brut du CV, variantes reconnues par la taxonomie)
         cv_skills = parsed_cv.get('skills', []) if parsed_cv else []
         job_skills = parsed_job.get('required_skills', []) if parsed_job else []
-        cv_skills_lower = [str(s).lower() for s in cv_skills]
-        missing_keywords = [s for s in job_skills if str(s).lower() not in cv_skills_lower]
+        missing_keywords = skill_taxonomy.missing_skills(job_skills, cv_skills, cv_text)
 
         # suggestions
         overall = sim.get('overall_similarity_score', 0)
@@ -650,15 +1009,19 @@ def calculate_matching():
             'parsed_job': parsed_job,
             'success': True
         }
+        if is_degraded(parsed_cv) or job_degraded:
+            matching_data.update(degraded=True, warning=" ".join(
+                w for w, d in ((CV_DEGRADED_WARNING, is_degraded(parsed_cv)), (JOB_DEGRADED_WARNING, job_degraded)) if d))
 
         # ---- Recommandations (basées sur matching + quiz) ----
-        user_id = get_jwt_identity()
         latest_quiz_eval = db.results.find_one({"user": ObjectId(user_id), "type": "quiz_evaluation"}, sort=[("createdAt", -1)])
         quiz_payload = (latest_quiz_eval or {}).get("data")
         recommendations = build_recommendations_from_match_and_quiz(matching_data, quiz_payload)
         matching_data["recommendations"] = recommendations
 
-        # save
+        # save (pas de matching calculé sur une analyse partielle du CV ou de l'offre dans l'historique)
+        if matching_data.get('degraded'):
+            return matching_data, 200
         save_result_to_db(
             user_id=user_id,
             result_type="matching",
@@ -669,9 +1032,23 @@ def calculate_matching():
                   "job_skills_count": len(job_skills),
                   "missing_skills_count": len(missing_keywords)}
         )
-        return jsonify(matching_data)
+        return matching_data, 200
     except Exception as e:
-        return jsonify({'error': f'Erreur matching: {e}'}), 500
+        return {'error': f'Erreur matching: {e}'}, error_status(e)
+
+@app.route('/api/match', methods=['POST'])
+@jwt_required()
+def calculate_matching():
+    data = request.get_json() or {}
+    cv_text = (data.get('cvText') or '').strip()
+    job_text = (data.get('jobText') or '').strip()
+    if not cv_text or not job_text:
+        return jsonify({'error': 'CV et job description requis'}), 400
+
+    if wants_async(data):
+        return enqueue_job_response("match", {"cvText": cv_text, "jobText": job_text}, get_jwt_identity())
+    payload, status = run_match(get_jwt_identity(), cv_text, job_text)
+    return jsonify(payload), status
 
 # Assistant cards
 @app.route('/api/assistant/cards', methods=['GET'])
@@ -751,48 +1128,144 @@ def assistant_recommendations():
         return jsonify({"success": False, "error": f"Endpoint recommandations: {e}"}), 500
 
 # -------------------- CHAT --------------------
+CHAT_MODEL_NAME = "gemini-1.5-flash"
+
+CHAT_DEFAULT_SYSTEM_INSTRUCTION = (
+    "Tu es un assistant utile spécialisé en recrutement. "
+    "Réponds en FRANÇAIS, de façon claire et concise. "
+    "Si la question concerne le candidat, appuie-toi sur le CV et la Job Description si disponibles."
+)
+
+# Sessions de chat : contexte CV/offre mis en cache, fenêtre de tours récents + résumé des anciens
+chat_sessions = ChatSessionStore(db['chat_sessions'], llm_gateway.get_model(CHAT_MODEL_NAME))
+
+def build_chat_context(user_id) -> str:
+    """Bloc de contexte (derniers CV et offre de l'utilisateur) ajouté à l'instruction système."""
+    ctx_lines = []
+    if user_id:
+        obj_id = ObjectId(user_id)
+        latest_cv = db.results.find_one({"user": obj_id, "type": "cv"}, sort=[("createdAt", -1)])
+        latest_job = db.results.find_one({"user": obj_id, "type": "job"}, sort=[("createdAt", -1)])
+        if latest_cv and latest_cv.get("data"):
+            cv_data = latest_cv["data"].get("parsed_cv", latest_cv["data"])
+            cv_card = summarize_cv_for_card(cv_data)
+            ctx_lines.append(f"[CV] {cv_card['title']} — {cv_card['subtitle']}. " + " | ".join(cv_card.get("bullets", [])))
+        if latest_job and latest_job.get("data"):
+            job_card = summarize_job_for_card(latest_job["data"])
+            ctx_lines.append(f"[JOB] {job_card['title']} — {job_card['subtitle']}. " + " | ".join(job_card.get("bullets", [])))
+    return "\n".join(ctx_lines)
+
+def build_chat_request(payload: Dict[str, Any], user_id):
+    """
+    Prépare (modèle avec system_instruction + contexte + résumé, contenu Gemini, session, message) pour le chat.
+    Avec "sessionId", seul le nouveau "message" est attendu ; sinon une session est créée à partir de
+    "messages" (historique complet envoyé par un client sans session). Sessions persistées pour les
+    utilisateurs authentifiés uniquement ; en anonyme, l'historique envoyé à chaque tour fait foi.
+    """
+    incoming = payload.get("messages") or []
+    history = [{"role": m.get("role"), "content": m.get("content") or ""} for m in incoming
+               if m.get("role") in ("user", "assistant")]
+    message = (payload.get("message") or "").strip()
+    if not message and history and history[-1]["role"] == "user":
+        message = history.pop()["content"]
+    message = message or "Bonjour"
+
+    session = chat_sessions.get(payload.get("sessionId"), user_id) if payload.get("sessionId") else None
+    if session is None:
+        system = next((m.get("content") for m in incoming if m.get("role") == "system"), None)
+        session = chat_sessions.create(user_id, system or CHAT_DEFAULT_SYSTEM_INSTRUCTION,
+                                       build_chat_context(user_id), history)
+        metrics.incr("chat.sessions_created")
+    elif payload.get("refreshContext") or chat_sessions.context_stale(session):
+        chat_sessions.refresh_context(session, build_chat_context(user_id))
+
+    chat_model = llm_gateway.get_model(CHAT_MODEL_NAME, system_instruction=chat_sessions.system_instruction(session))
+    return chat_model, chat_sessions.window(session, message), session, message
+
+def session_ref(session) -> Optional[str]:
+    """Id de session renvoyé au client (None en anonyme : le client renvoie alors tout l'historique)."""
+    return str(session["_id"]) if session.get("_id") is not None else None
+
+def record_chat_exchange(session, message: str, answer: str) -> None:
+    """Mémorise l'échange dans la session ; résume les anciens tours en arrière-plan si le budget est dépassé."""
+    if session.get("_id") is None:
+        return  # chat anonyme : rien n'est conservé côté serveur
+    try:
+        updated = chat_sessions.record_exchange(session["_id"], message, answer)
+        if chat_sessions.claim_summary(updated):
+            job_queue.enqueue("chat_summarize", {"sessionId": str(session["_id"])}, session.get("user"))
+    except Exception as e:
+        app.logger.warning(f"Session de chat non mise à jour: {e}")
+
+CHAT_DEGRADED_MESSAGE = ("L'assistant est momentanément indisponible (service IA surchargé). "
+                         "Réessayez dans quelques instants.")
+
+def degraded_chat_payload() -> Dict[str, Any]:
+    """Réponse de repli quand Gemini est indisponible (disjoncteur ouvert, échéance, erreur serveur)."""
+    metrics.incr("llm.degraded.chat")
+    return {"message": {"role": "assistant", "content": CHAT_DEGRADED_MESSAGE}, "success": True, "degraded": True}
+
 @app.route('/api/chat', methods=['POST'])
 @jwt_required(optional=True)
 def chat_with_gemini():
     try:
-        payload = request.get_json() or {}
-        incoming = payload.get("messages", [])
-
-        sys = next((m.get("content") for m in incoming if m.get("role") == "system"), None)
-        system_instruction = sys or (
-            "Tu es un assistant utile spécialisé en recrutement. "
-            "Réponds en FRANÇAIS, de façon claire et concise. "
-            "Si la question concerne le candidat, appuie-toi sur le CV et la Job Description si disponibles."
-        )
-
-        user_id = get_jwt_identity()
-        ctx_lines = []
-        if user_id:
-            obj_id = ObjectId(user_id)
-            latest_cv = db.results.find_one({"user": obj_id, "type": "cv"}, sort=[("createdAt", -1)])
-            latest_job = db.results.find_one({"user": obj_id, "type": "job"}, sort=[("createdAt", -1)])
-            if latest_cv and latest_cv.get("data"):
-                cv_data = latest_cv["data"].get("parsed_cv", latest_cv["data"])
-                cv_card = summarize_cv_for_card(cv_data)
-                ctx_lines.append(f"[CV] {cv_card['title']} — {cv_card['subtitle']}. " + " | ".join(cv_card.get("bullets", [])))
-            if latest_job and latest_job.get("data"):
-                job_card = summarize_job_for_card(latest_job["data"])
-                ctx_lines.append(f"[JOB] {job_card['title']} — {job_card['subtitle']}. " + " | ".join(job_card.get("bullets", [])))
-        context_blob = "\n".join(ctx_lines) if ctx_lines else ""
-
-        history = []
-        for m in incoming:
-            role = m.get("role"); content = m.get("content", "")
-            if role == "user": history.append({"role": "user", "parts": [content]})
-            elif role == "assistant": history.append({"role": "model", "parts": [content]})
-
-        chat_model = genai.GenerativeModel("gemini-1.5-flash",
-                                           system_instruction=system_instruction + ("\n\nContexte:\n" + context_blob if context_blob else ""))
-        resp = chat_model.generate_content(history if history else [{"role": "user", "parts": ["Bonjour"]}])
+        chat_model, contents, session, message = build_chat_request(request.get_json() or {}, get_jwt_identity())
+        resp = llm_gateway.generate(chat_model, contents, operation="chat")
         text = (resp.text or "").strip() or "(Réponse vide)"
-        return jsonify({"message": {"role": "assistant", "content": text}, "success": True})
+        record_chat_exchange(session, message, text)
+        return jsonify({"message": {"role": "assistant", "content": text}, "sessionId": session_ref(session),
+                        "success": True})
+    except Exception as e:
+        if llm_gateway.is_unavailable_error(e):
+            return jsonify(degraded_chat_payload()), 200
+        return jsonify({"error": f"Erreur chat: {e}"}), 500
+
+def sse_event(data: Dict[str, Any], event: str = None) -> str:
+    """Formate un évènement Server-Sent Events."""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+@app.route('/api/chat/stream', methods=['POST'])
+@jwt_required(optional=True)
+def chat_with_gemini_stream():
+    """
+    Variante streaming de /api/chat (SSE) :
+      - évènements "data: {"delta": "..."}" au fil de la génération
+      - "event: done" avec le message complet, ou "event: error"
+    Le temps jusqu'au premier token est mesuré (métrique chat.ttft_ms).
+    """
+    started = time.perf_counter()
+    try:
+        chat_model, contents, session, message = build_chat_request(request.get_json() or {}, get_jwt_identity())
     except Exception as e:
         return jsonify({"error": f"Erreur chat: {e}"}), 500
+    session_id = session_ref(session)
+
+    def events():
+        parts = []
+        try:
+            for text in llm_gateway.generate_stream(chat_model, contents, operation="chat"):
+                if not parts:
+                    ttft_ms = (time.perf_counter() - started) * 1000
+                    metrics.observe("chat.ttft_ms", ttft_ms)
+                    app.logger.info(f"chat stream TTFT: {ttft_ms:.0f} ms")
+                parts.append(text)
+                yield sse_event({"delta": text})
+            content = "".join(parts).strip() or "(Réponse vide)"
+            metrics.observe("chat.stream_total_ms", (time.perf_counter() - started) * 1000)
+            record_chat_exchange(session, message, content)
+            yield sse_event({"message": {"role": "assistant", "content": content}, "sessionId": session_id,
+                             "success": True}, event="done")
+        except Exception as e:
+            metrics.incr("chat.stream_errors")
+            if not parts and llm_gateway.is_unavailable_error(e):
+                yield sse_event(degraded_chat_payload(), event="done")
+            else:
+                yield sse_event({"error": f"Erreur chat: {e}"}, event="error")
+
+    return Response(stream_with_context(events()), mimetype="text/event-stream", headers=SSE_HEADERS)
 
 # -------------------- QUIZ --------------------
 # Helpers additionnels pour extraire proprement les compétences du CV
@@ -831,28 +1304,23 @@ def _pick_focus_skills_from_cv(parsed_cv: Dict[str, Any], max_n: int = 8) -> Lis
     skills = _normalize_skill_list(skills_raw)
     return skills[:max_n]
 
-@app.route('/api/quiz', methods=['POST'])
-@jwt_required()
-def generate_quiz():
+QUIZ_LEVEL_MAP = {'facile': 'débutant', 'moyen': 'intermédiaire', 'difficile': 'avancé'}
+
+def prepare_quiz_context(user_id, level='moyen'):
     """
-    Génére un quiz ciblé SUR LES COMPÉTENCES DU CV.
+    Prépare le contexte d'un quiz ciblé SUR LES COMPÉTENCES DU CV.
+    Renvoie (contexte, None) ou (None, (réponse d'erreur, code HTTP)).
     - Échec si aucun CV n'est trouvé pour l'utilisateur.
-    - Utilise QuizGenerator avec focus_skills = compétences extraites du CV.
     """
-    data = request.get_json() or {}
-    level = data.get('level', 'moyen')
-    count = data.get('count', 5)
-    user_id = get_jwt_identity()
-
     if not quiz_generator:
-        return jsonify({'error': 'Générateur non disponible'}), 500
+        return None, ({'error': 'Générateur non disponible'}, 500)
 
     # 1) Récupère le dernier CV parsé enregistré pour l’utilisateur
     latest_cv_doc = db.results.find_one({"user": ObjectId(user_id), "type": "cv"}, sort=[("createdAt", -1)])
     if not latest_cv_doc or not latest_cv_doc.get("data"):
-        return jsonify({
+        return None, ({
             'error': "Aucun CV trouvé. Veuillez uploader et parser votre CV avant de générer un quiz ciblé."
-        }), 400
+        }, 400)
 
     # Le CV peut être stocké sous data['parsed_cv'] ou directement data
     cv_data = latest_cv_doc["data"]
@@ -871,48 +1339,59 @@ def generate_quiz():
     # 3) Déterminer les compétences ciblées (focus_skills) à partir du CV
     focus_skills = _pick_focus_skills_from_cv(parsed_cv, max_n=8)
     if not focus_skills:
-        return jsonify({
+        return None, ({
             'error': "Votre CV ne contient pas de compétences exploitables. Veuillez vérifier l’extraction de votre CV."
-        }), 400
+        }, 400)
 
     # 4) Niveaux mappés
-    level_map = {'facile': 'débutant', 'moyen': 'intermédiaire', 'difficile': 'avancé'}
-    mapped_level = level_map.get(level, 'intermédiaire')
+    mapped_level = QUIZ_LEVEL_MAP.get(level, 'intermédiaire')
 
-    # 5) Génération du quiz ciblé sur ces compétences
+    # 5) Questions déjà vues par l'utilisateur (exclues de la banque)
     try:
-        quiz = quiz_generator.generate_quiz(
-            user_profile=profile,
-            level=mapped_level,
-            num_questions=count,
-            focus_skills=focus_skills  # ⬅️ ciblage explicite sur les compétences du CV
-        )
-    except TypeError:
-        # Compat rétro si l’implémentation n’a pas encore le param focus_skills
-        quiz = quiz_generator.generate_quiz(
-            user_profile=profile,
-            level=mapped_level,
-            num_questions=count
-        )
+        seen_hashes = question_bank.seen_hashes(user_id)
+    except Exception as e:
+        print(f"⚠️  Historique des questions indisponible: {e}")
+        seen_hashes = set()
+    return {'profile': profile, 'focus_skills': focus_skills, 'mapped_level': mapped_level,
+            'seen_hashes': seen_hashes}, None
+
+def question_to_client(i: int, q: QuizQuestion) -> Dict[str, Any]:
+    """Format client d'une question (suppression des préfixes a), b) ...)."""
+    clean_choices = [(opt.split(') ', 1)[1] if ') ' in opt else opt) for opt in q.options]
+    return {
+        'id': i,
+        'question': q.question,
+        'choices': clean_choices,
+        'answerIndex': q.correct_answer,
+        'explanation': q.explanation,
+        'skillArea': q.skill_area
+    }
 
-    if not quiz:
-        return jsonify({'error': 'Génération échouée'}), 500
-
-    # 6) Normalisation des questions (suppression des préfixes a), b) ...)
-    questions = []
-    for i, q in enumerate(quiz.questions):
-        clean_choices = [(opt.split(') ', 1)[1] if ') ' in opt else opt) for opt in q.options]
-        questions.append({
-            'id': i,
-            'question': q.question,
-            'choices': clean_choices,
-            'answerIndex': q.correct_answer,
-            'explanation': q.explanation,
-            'skillArea': q.skill_area
-        })
+def finalize_quiz(user_id, quiz: Quiz, ctx: Dict[str, Any], level, count) -> Dict[str, Any]:
+    """Construit la réponse client d'un quiz généré et la sauvegarde."""
+    profile, focus_skills = ctx['profile'], ctx['focus_skills']
+    questions = [question_to_client(i, q) for i, q in enumerate(quiz.questions)]
+
+    # Stockage serveur + vérification Gemini unique en arrière-plan
+    quiz_id = None
+    try:
+        quiz_id = quiz_store.save(user_id, quiz, {"level": level, "focus_skills": focus_skills})
+        job_queue.enqueue("quiz_verify", {"quizId": quiz_id}, user_id)
+    except Exception as e:
+        print(f"⚠️  Stockage/vérification du quiz non planifiés: {e}")
+
+    # Questions vues (exclues des prochains quiz) + recharge de la banque si stock bas
+    try:
+        question_bank.mark_seen(user_id, quiz.questions)
+        low = question_bank.low_stock(focus_skills, ctx['mapped_level'])
+        if low:
+            job_queue.enqueue("quiz_bank_refill", {"skills": low, "level": ctx['mapped_level']}, user_id)
+    except Exception as e:
+        print(f"⚠️  Banque de questions non mise à jour: {e}")
 
     quiz_data = {
         'success': True,
+        'quiz_id': quiz_id,
         'questions': questions,
         'quiz_info': {
             'title': quiz.title,
@@ -925,14 +1404,13 @@ def generate_quiz():
         }
     }
 
-    # 7) Sauvegarde
     save_result_to_db(
         user_id,
         "quiz",
         quiz_data,
         meta={
             "level": level,
-            "mapped_level": mapped_level,
+            "mapped_level": ctx['mapped_level'],
             "questions_count": count,
             "generated_questions": len(questions),
             "profile_source": "cv_parsing",
@@ -940,7 +1418,153 @@ def generate_quiz():
             "focus_skills_count": len(focus_skills)
         }
     )
-    return jsonify(quiz_data)
+    return quiz_data
+
+def schedule_quiz_prefetch(user_id, levels=None):
+    """
+    Planifie la pré-génération des quiz ; sans effet si désactivée. Par défaut, seulement pour un
+    utilisateur ayant fait un quiz récemment, et pour les niveaux qu'il a utilisés.
+    """
+    if not QUIZ_PREFETCH_ENABLED or not quiz_generator:
+        return
+    try:
+        if levels is None:
+            levels = quiz_store.recent_levels(user_id)[:quiz_prefetch.max_per_user]
+            if not levels:
+                metrics.incr("quiz.prefetch_skipped_inactive")
+                return
+        job_queue.enqueue("quiz_prefetch", {"levels": levels}, user_id)
+    except Exception as e:
+        print(f"⚠️  Pré-génération des quiz non planifiée: {e}")
+
+def run_prefetch_quizzes(user_id, levels):
+    """Pré-génère et stocke un quiz prêt à servir par niveau (dans la limite du cap et du quota quotidien)."""
+    generated = []
+    for level in levels:
+        ctx, error = prepare_quiz_context(user_id, level)
+        if error:
+            return error
+        key = skills_key(ctx['focus_skills'])
+        quiz_prefetch.discard_stale(user_id, key)
+        if not quiz_prefetch.has_room(user_id, ctx['mapped_level'], key):
+            continue
+        if not quiz_prefetch.consume_quota(user_id):
+            metrics.incr("quiz.prefetch_skipped_quota")
+            break
+        quiz = quiz_generator.generate_quiz(
+            user_profile=ctx['profile'], level=ctx['mapped_level'], num_questions=QUIZ_PREFETCH_COUNT,
+            focus_skills=ctx['focus_skills'], exclude_hashes=ctx['seen_hashes'],
+        )
+        if quiz:
+            quiz_prefetch.put(user_id, ctx['mapped_level'], key, quiz)
+            generated.append(level)
+    return {'levels': generated}, 200
+
+def take_prefetched_quiz(user_id, ctx: Dict[str, Any], level, count):
+    """Quiz pré-généré compatible (niveau, compétences, taille) ou None ; un quiz servi est rechargé."""
+    try:
+        quiz = quiz_prefetch.take(user_id, ctx['mapped_level'], skills_key(ctx['focus_skills']), int(count))
+    except Exception as e:
+        print(f"⚠️  Quiz pré-généré indisponible: {e}")
+        return None
+    metrics.incr("quiz.prefetch_hits" if quiz else "quiz.prefetch_misses")
+    if quiz:
+        schedule_quiz_prefetch(user_id, [level])
+    return quiz
+
+def run_generate_quiz(user_id, level='moyen', count=5):
+    """
+    Génére un quiz ciblé SUR LES COMPÉTENCES DU CV.
+    - Sert un quiz pré-généré s'il y en a un de compatible.
+    - Sinon utilise QuizGenerator avec focus_skills = compétences extraites du CV.
+    """
+    ctx, error = prepare_quiz_context(user_id, level)
+    if error:
+        return error
+
+    prefetched = take_prefetched_quiz(user_id, ctx, level, count)
+    if prefetched:
+        return finalize_quiz(user_id, prefetched, ctx, level, count), 200
+
+    # Génération du quiz ciblé sur ces compétences (banque d'abord, hors questions déjà vues)
+    try:
+        quiz = quiz_generator.generate_quiz(
+            user_profile=ctx['profile'],
+            level=ctx['mapped_level'],
+            num_questions=count,
+            focus_skills=ctx['focus_skills'],  # ⬅️ ciblage explicite sur les compétences du CV
+            exclude_hashes=ctx['seen_hashes'],
+        )
+    except TypeError:
+        # Compat rétro si l’implémentation n’a pas encore le param focus_skills
+        quiz = quiz_generator.generate_quiz(
+            user_profile=ctx['profile'],
+            level=ctx['mapped_level'],
+            num_questions=count
+        )
+
+    if not quiz:
+        return {'error': 'Génération échouée'}, 500
+
+    return finalize_quiz(user_id, quiz, ctx, level, count), 200
+
+@app.route('/api/quiz', methods=['POST'])
+@jwt_required()
+def generate_quiz():
+    data = request.get_json() or {}
+    level = data.get('level', 'moyen')
+    count = data.get('count', 5)
+
+    if wants_async(data):
+        return enqueue_job_response("quiz", {"level": level, "count": count}, get_jwt_identity())
+    payload, status = run_generate_quiz(get_jwt_identity(), level, count)
+    return jsonify(payload), status
+
+@app.route('/api/quiz/stream', methods=['POST'])
+@jwt_required()
+def generate_quiz_stream():
+    """
+    Variante streaming de /api/quiz (SSE) : chaque question est envoyée dès qu'elle est générée
+    ("data: {"question": {...}}"), puis "event: done" avec le quiz complet (même format que /api/quiz).
+    """
+    data = request.get_json() or {}
+    level = data.get('level', 'moyen')
+    count = data.get('count', 5)
+    user_id = get_jwt_identity()
+
+    ctx, error = prepare_quiz_context(user_id, level)
+    if error:
+        payload, status = error
+        return jsonify(payload), status
+
+    prefetched = take_prefetched_quiz(user_id, ctx, level, count)
+
+    def events():
+        started = time.perf_counter()
+        sent = 0
+        try:
+            if prefetched:
+                for i, q in enumerate(prefetched.questions):
+                    yield sse_event({"question": question_to_client(i, q)})
+                yield sse_event(finalize_quiz(user_id, prefetched, ctx, level, count), event="done")
+                return
+            for item in quiz_generator.generate_quiz_stream(
+                user_profile=ctx['profile'], level=ctx['mapped_level'],
+                num_questions=count, focus_skills=ctx['focus_skills'],
+                exclude_hashes=ctx['seen_hashes'],
+            ):
+                if isinstance(item, Quiz):
+                    yield sse_event(finalize_quiz(user_id, item, ctx, level, count), event="done")
+                    return
+                if sent == 0:
+                    metrics.observe("quiz.first_question_ms", (time.perf_counter() - started) * 1000)
+                yield sse_event({"question": question_to_client(sent, item)})
+                sent += 1
+        except Exception as e:
+            metrics.incr("quiz.stream_errors")
+            yield sse_event({"error": f"Génération échouée: {e}"}, event="error")
+
+    return Response(stream_with_context(events()), mimetype="text/event-stream", headers=SSE_HEADERS)
 
 def get_user_profile_from_cv(user_id):
     try:
@@ -991,22 +1615,41 @@ def get_quiz_profile_status():
 @app.route('/api/quiz/evaluate', methods=['POST'])
 @jwt_required()
 def evaluate_quiz():
+    """
+    Évalue un quiz.
+    - Avec 'quizId' : quiz stocké côté serveur (déjà vérifié en arrière-plan) -> comparaison locale.
+    - Sinon (compat) : quiz reconstruit depuis les questions envoyées, puis vérifié par Gemini.
+    - 'withExplanations' : ajoute une explication détaillée par question (générées en lot, mémoïsées).
+    """
     try:
         data = request.get_json() or {}
         answers = data.get('answers', {}); questions_data = data.get('questions', [])
-        if not questions_data: return jsonify({'error': "Questions manquantes"}), 400
-
-        quiz_questions = []
-        for q in questions_data:
-            quiz_questions.append(QuizQuestion(
-                question=q['question'], options=q['choices'], correct_answer=q['answerIndex'],
-                explanation=q.get('explanation', ''), skill_area=q.get('skillArea', 'Général'),
-                difficulty=q.get('difficulty', 'moyen')
-            ))
-        quiz = Quiz(title="Évaluation Candidat", description="Quiz évalué par Gemini",
-                    level="moyen", questions=quiz_questions, estimated_duration=len(quiz_questions)*2)
-        evaluator = QuizEvaluator()
-        results = evaluator.evaluate_answers(quiz, {i: answers.get(str(q.get('id', i)), -1) for i, q in enumerate(questions_data)})
+        quiz_id = data.get('quizId') or data.get('quiz_id')
+        user_id = get_jwt_identity()
+
+        stored = quiz_store.load(quiz_id, user_id) if quiz_id else None
+        if quiz_id and not stored:
+            return jsonify({'error': 'Quiz introuvable'}), 404
+
+        if stored:
+            quiz, quiz_doc = stored
+            verified = bool(quiz_doc.get('verified'))
+            results = QuizEvaluator.evaluate_answers(quiz, {i: answers.get(str(i), -1) for i in range(len(quiz.questions))},
+                                                     verify=False)
+        else:
+            if not questions_data: return jsonify({'error': "Questions manquantes"}), 400
+            quiz_questions = []
+            for q in questions_data:
+                quiz_questions.append(QuizQuestion(
+                    question=q['question'], options=q['choices'], correct_answer=q['answerIndex'],
+                    explanation=q.get('explanation', ''), skill_area=q.get('skillArea', 'Général'),
+                    difficulty=q.get('difficulty', 'moyen')
+                ))
+            quiz = Quiz(title="Évaluation Candidat", description="Quiz évalué par Gemini",
+                        level="moyen", questions=quiz_questions, estimated_duration=len(quiz_questions)*2)
+            results = QuizEvaluator.evaluate_answers(quiz, {i: answers.get(str(q.get('id', i)), -1) for i, q in enumerate(questions_data)},
+                                                     evaluator=quiz_evaluator)
+            verified = True
 
         detailed_results = []
         for i, ua in enumerate(results.user_answers):
@@ -1017,19 +1660,78 @@ def evaluate_quiz():
                                      'user_answer': user_text, 'correct_answer': q.options[q.correct_answer],
                                      'is_correct': ua.is_correct, 'explanation': q.explanation, 'skill_area': q.skill_area})
 
+        if data.get('withExplanations'):
+            explanations = quiz_evaluator.generate_detailed_explanations(quiz.questions, results.user_answers)
+            for dr, text in zip(detailed_results, explanations):
+                dr['detailed_explanation'] = text
+
         percentage = round(results.percentage, 1)
         feedback = generate_feedback(percentage, detailed_results)
         evaluation_data = {'success': True, 'score': results.score, 'total': results.total_questions,
-                           'percentage': percentage, 'detailed_results': detailed_results, 'feedback': feedback}
+                           'percentage': percentage, 'detailed_results': detailed_results, 'feedback': feedback,
+                           'quiz_id': quiz_id, 'verified': verified}
 
-        user_id = get_jwt_identity()
         save_result_to_db(user_id, "quiz_evaluation", evaluation_data,
-                          {"questions_count": len(questions_data), "answers_provided": len([a for a in answers.values() if a >= 0])},
+                          {"questions_count": len(quiz.questions), "answers_provided": len([a for a in answers.values() if a >= 0])},
                           {"score": results.score, "percentage": results.percentage})
         return jsonify(evaluation_data)
     except Exception as e:
         return jsonify({'error': f'Erreur évaluation: {e}'}), 500
 
+# -------------------- JOBS (ASYNC) --------------------
+job_queue.register("parse_cv", lambda p, uid: run_parse_cv(uid, p["cvText"]))
+job_queue.register("match", lambda p, uid: run_match(uid, p["cvText"], p["jobText"]))
+job_queue.register("quiz", lambda p, uid: run_generate_quiz(uid, p.get("level", "moyen"), p.get("count", 5)))
+
+def run_verify_stored_quiz(quiz_id):
+    """Vérifie une fois (Gemini, en lot) un quiz stocké et enregistre les réponses corrigées."""
+    stored = quiz_store.load(quiz_id)
+    if not stored:
+        return {'error': 'Quiz introuvable'}, 404
+    quiz, quiz_doc = stored
+    if quiz_doc.get('verified'):
+        return {'quiz_id': quiz_id, 'verified': True, 'corrections': 0}, 200
+    verifications = quiz_evaluator.verify_questions_batch(quiz.questions)
+    corrections = QuizEvaluator.apply_verifications(quiz.questions, verifications)
+    quiz_store.mark_verified(quiz_id, quiz, corrections)
+    try:
+        question_bank.update_verified(quiz.questions)
+    except Exception as e:
+        print(f"⚠️  Banque de questions non mise à jour: {e}")
+    return {'quiz_id': quiz_id, 'verified': True, 'corrections': corrections}, 200
+
+def run_refill_question_bank(skills, level):
+    """Recharge la banque de questions pour les compétences en rupture de stock."""
+    if not quiz_generator:
+        return {'error': 'Générateur non disponible'}, 500
+    added = quiz_generator.refill_bank(skills, level)
+    return {'skills': skills, 'level': level, 'added': added}, 200
+
+def run_summarize_chat(session_id):
+    """Intègre les tours les plus anciens d'une session de chat à son résumé."""
+    return {'sessionId': session_id, 'summarizedTurns': chat_sessions.summarize(session_id)}, 200
+
+job_queue.register("quiz_verify", lambda p, uid: run_verify_stored_quiz(p["quizId"]))
+job_queue.register("quiz_prefetch", lambda p, uid: run_prefetch_quizzes(uid, p.get("levels", [])), concurrency=1)
+job_queue.register("quiz_bank_refill", lambda p, uid: run_refill_question_bank(p["skills"], p["level"]),
+                   concurrency=1)
+job_queue.register("chat_summarize", lambda p, uid: run_summarize_chat(p["sessionId"]), concurrency=1)
+def start_job_workers():
+    if os.getenv('JOB_WORKERS', '1').lower() in ('1', 'true', 'yes'):
+        job_queue.start()
+
+# Importé par un serveur WSGI : démarrage ici. Lancé directement : voir __main__ (reloader)
+if __name__ != '__main__':
+    start_job_workers()
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_job_status(job_id):
+    job = job_queue.get(job_id)
+    if not job or str(job.get("user")) != get_jwt_identity():
+        return jsonify({'success': False, 'error': 'Tâche introuvable'}), 404
+    return jsonify({'success': True, **serialize_job(job)})
+
 # -------------------- RESULTS API --------------------
 @app.route('/api/results', methods=['POST'])
 @jwt_required()
@@ -1037,7 +1739,8 @@ def save_result():
     data = request.get_json() or {}
     if "type" not in data or "data" not in data: return jsonify({"error": "type & data requis"}), 400
     user_id = get_jwt_identity()
-    result = create_result(user_id, data["type"], data["data"], data.get("meta"), data.get("refs"))
+    result = create_result(user_id, data["type"], data["data"], data.get("meta"), data.get("refs"),
+                           result_filters(data["type"], data["data"]))
     db.results.insert_one(result)
     result["_id"] = str(result["_id"]); result["user"] = str(result["user"])
     return jsonify(result), 201
@@ -1055,14 +1758,83 @@ def get_results():
         r["_id"] = str(r["_id"]); r["user"] = str(r["user"]); results.append(r)
     return jsonify(results), 200
 
+def _float_arg(name):
+    value = request.args.get(name)
+    return float(value) if value not in (None, '') else None
+
+@app.route('/api/results/prefilter', methods=['GET'])
+@jwt_required()
+def prefilter_results():
+    """
+    Résultats CV/offre de l'utilisateur filtrés sur les champs indexés "filters.*" (avant tout embedding).
+    Paramètres : type (cv|job), jobId (résultat "job" dont les exigences servent de filtre), minYears,
+    maxYears, minDegree, contract (liste séparée par des virgules) et location (type job uniquement),
+    batchId, strict, limit.
+    """
+    user_id = get_jwt_identity()
+    result_type = request.args.get("type", "cv")
+    if result_type not in ("cv", "job"):
+        return jsonify({"error": "type doit valoir cv ou job"}), 400
+    # Contrat et lieu ne sont dérivés que pour les offres (cf. cv_filters)
+    if result_type == "cv" and (request.args.get("contract") or request.args.get("location")):
+        return jsonify({"error": "Les filtres contract et location ne s'appliquent qu'au type job"}), 400
+    try:
+        criteria = {
+            "min_years": _float_arg("minYears"),
+            "max_years": _float_arg("maxYears"),
+            "min_degree": int(_float_arg("minDegree")) if request.args.get("minDegree") else None,
+        }
+        limit = min(int(request.args.get("limit", 50)), 500)
+    except ValueError:
+        return jsonify({"error": "Paramètre numérique invalide"}), 400
+    if request.args.get("contract"):
+        criteria["contracts"] = [c.strip() for c in request.args["contract"].split(",") if c.strip()]
+    if request.args.get("location"):
+        criteria["location"] = request.args["location"]
+
+    # Exigences d'une offre déjà parsée -> filtres sur les CV (les paramètres explicites priment)
+    job_id = request.args.get("jobId")
+    if job_id:
+        try:
+            job = db.results.find_one({"_id": ObjectId(job_id), "user": ObjectId(user_id), "type": "job"})
+        except Exception:
+            job = None
+        if not job:
+            return jsonify({"error": "Offre introuvable"}), 404
+        job_f = job.get("filters") or result_filters("job", job.get("data")) or {}
+        if criteria["min_years"] is None:
+            criteria["min_years"] = job_f.get("years_experience")
+        if criteria["min_degree"] is None:
+            criteria["min_degree"] = job_f.get("degree_level")
+
+    query = {"user": ObjectId(user_id), "type": result_type,
+             **prefilter_query(include_unknown=request.args.get("strict", "0") not in ("1", "true", "yes"),
+                               **criteria)}
+    if request.args.get("batchId"):
+        query["meta.batch_id"] = request.args["batchId"]
+
+    results = []
+    for r in db.results.find(query).sort("createdAt", -1).limit(limit):
+        r["_id"] = str(r["_id"]); r["user"] = str(r["user"]); results.append(r)
+    return jsonify({"success": True, "count": len(results),
+                    "criteria": {k: v for k, v in criteria.items() if v is not None}, "results": results}), 200
+
 # -------------------- ERRORS --------------------
 @app.errorhandler(404)
 def not_found(error): return jsonify({'error': 'Endpoint non trouvé'}), 404
 
+@app.errorhandler(413)
+def too_large(error):
+    return jsonify({'error': f'Fichier trop volumineux (max {MAX_UPLOAD_BYTES // (1024 * 1024)} Mo)'}), 413
+
 @app.errorhandler(500)
 def internal_error(error): return jsonify({'error': 'Erreur interne du serveur'}), 500
 
 # -------------------- RUN --------------------
 if __name__ == '__main__':
     print("🚀 Server up on :3001")
+    # En debug, le reloader relance ce module dans un processus enfant (WERKZEUG_RUN_MAIN=true) :
+    # seul ce processus, celui qui sert les requêtes, démarre les workers
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_job_workers()
     app.run(debug=True, host='0.0.0.0', port=3001, threaded=True)
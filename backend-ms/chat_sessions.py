@@ -0,0 +1,224 @@
+# chat_sessions.py - Sessions de chat côté serveur
+# Le client n'envoie plus tout l'historique à chaque tour : la session garde le bloc de contexte
+# CV/offre (rafraîchi périodiquement), une fenêtre glissante des derniers tours et un résumé
+# des tours plus anciens, mis à jour de façon incrémentale en arrière-plan. Seul ce qui tient
+# dans le budget de tokens est envoyé à Gemini.
+
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import ASCENDING, ReturnDocument
+
+import llm_gateway
+
+# Budget (tokens estimés) de l'historique envoyé à Gemini : résumé + tours récents + message courant
+CHAT_HISTORY_TOKEN_BUDGET = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", 2000))
+# Taille visée du résumé des anciens tours
+CHAT_SUMMARY_TOKEN_BUDGET = int(os.getenv("CHAT_SUMMARY_TOKEN_BUDGET", 300))
+# Tours récents toujours conservés tels quels (jamais résumés)
+CHAT_MIN_RECENT_TURNS = int(os.getenv("CHAT_MIN_RECENT_TURNS", 4))
+CHAT_SESSION_TTL_HOURS = float(os.getenv("CHAT_SESSION_TTL_HOURS", 24))
+# Le bloc de contexte CV/offre est reconstruit au plus toutes les CHAT_CONTEXT_TTL_S secondes
+CHAT_CONTEXT_TTL_S = float(os.getenv("CHAT_CONTEXT_TTL_S", 600))
+# Un résumé "en cours" plus ancien que ce délai est considéré comme abandonné
+SUMMARY_LEASE_S = 120
+
+SUMMARY_PROMPT = """Tu tiens le résumé d'une conversation entre un utilisateur et un assistant spécialisé en recrutement.
+Mets à jour le résumé existant avec les nouveaux échanges. Conserve les faits utiles pour la suite
+(profil et objectifs de l'utilisateur, postes visés, conseils déjà donnés, décisions, questions en suspens),
+sans formules de politesse. Réponds en FRANÇAIS, en texte brut, en {max_words} mots maximum.
+
+RÉSUMÉ EXISTANT :
+{summary}
+
+NOUVEAUX ÉCHANGES :
+{turns}
+"""
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimation grossière (~4 caractères par token)."""
+    return len(text or "") // 4 + 1
+
+
+def _turn(role: str, content: str) -> Dict[str, Any]:
+    return {"id": uuid.uuid4().hex, "role": role, "content": content, "tokens": estimate_tokens(content)}
+
+
+class ChatSessionStore:
+    """Sessions de chat (collection "chat_sessions", expiration TTL sur expiresAt)."""
+
+    def __init__(self, collection, summary_model=None):
+        self.collection = collection
+        self.summary_model = summary_model
+        try:
+            self.collection.create_index([("expiresAt", ASCENDING)], expireAfterSeconds=0)
+            self.collection.create_index([("user", ASCENDING)])
+        except Exception as e:
+            print(f"⚠️  Index chat_sessions non créés: {e}")
+
+    # ------------------------------------------------------------------
+    # Cycle de vie
+    # ------------------------------------------------------------------
+    def get(self, session_id, user_id=None) -> Optional[Dict[str, Any]]:
+        """
+        Session de cet utilisateur (None : id invalide, expirée ou appartenant à un autre utilisateur).
+        Pas de session persistée pour un utilisateur anonyme : un id seul ne donne accès à rien.
+        """
+        if not user_id:
+            return None
+        try:
+            query = {"_id": ObjectId(session_id), "user": ObjectId(user_id)}
+        except Exception:
+            return None
+        return self.collection.find_one(query)
+
+    def create(self, user_id, system_instruction: str, context: str,
+               history: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
+        """
+        Nouvelle session ; `history` (tours déjà affichés côté client) amorce la fenêtre.
+        Utilisateur anonyme : session éphémère, non enregistrée (_id None, chat sans état côté serveur).
+        """
+        now = datetime.utcnow()
+        doc = {
+            "user": ObjectId(user_id) if user_id else None,
+            "systemInstruction": system_instruction,
+            "context": context,
+            "contextAt": now,
+            "summary": "",
+            "summaryVersion": 0,
+            "summarizingSince": None,
+            "turns": [_turn(m["role"], m["content"]) for m in history or []],
+            "createdAt": now,
+            "updatedAt": now,
+            "expiresAt": now + timedelta(hours=CHAT_SESSION_TTL_HOURS),
+        }
+        doc["_id"] = self.collection.insert_one(doc).inserted_id if user_id else None
+        return doc
+
+    @staticmethod
+    def context_stale(session: Dict[str, Any]) -> bool:
+        at = session.get("contextAt")
+        return at is None or (datetime.utcnow() - at).total_seconds() > CHAT_CONTEXT_TTL_S
+
+    def refresh_context(self, session: Dict[str, Any], context: str) -> None:
+        now = datetime.utcnow()
+        if session.get("_id") is not None:
+            self.collection.update_one({"_id": session["_id"]}, {"$set": {"context": context, "contextAt": now}})
+        session["context"], session["contextAt"] = context, now
+
+    # ------------------------------------------------------------------
+    # Prompt
+    # ------------------------------------------------------------------
+    @staticmethod
+    def system_instruction(session: Dict[str, Any]) -> str:
+        text = session.get("systemInstruction") or ""
+        if session.get("context"):
+            text += "\n\nContexte:\n" + session["context"]
+        if session.get("summary"):
+            text += "\n\nRésumé de la conversation précédente:\n" + session["summary"]
+        return text
+
+    @staticmethod
+    def window(session: Dict[str, Any], message: str,
+               budget: int = CHAT_HISTORY_TOKEN_BUDGET) -> List[Dict[str, Any]]:
+        """
+        Contenu Gemini : derniers tours (du plus récent au plus ancien) tant que résumé + tours +
+        message courant tiennent dans le budget, puis le message courant.
+        """
+        used = estimate_tokens(session.get("summary", "")) + estimate_tokens(message)
+        kept: List[Dict[str, Any]] = []
+        for turn in reversed(session.get("turns", [])):
+            used += turn.get("tokens") or estimate_tokens(turn["content"])
+            if used > budget:
+                break
+            kept.append(turn)
+        contents = [{"role": "model" if t["role"] == "assistant" else "user", "parts": [t["content"]]}
+                    for t in reversed(kept)]
+        # Gemini attend un historique qui commence par un tour utilisateur
+        while contents and contents[0]["role"] == "model":
+            contents.pop(0)
+        return contents + [{"role": "user", "parts": [message]}]
+
+    # ------------------------------------------------------------------
+    # Historique + résumé incrémental
+    # ------------------------------------------------------------------
+    def record_exchange(self, session_id, user_message: str, assistant_message: str) -> Dict[str, Any]:
+        """Ajoute un échange à la fenêtre ; renvoie la session à jour."""
+        now = datetime.utcnow()
+        return self.collection.find_one_and_update(
+            {"_id": ObjectId(session_id)},
+            {"$push": {"turns": {"$each": [_turn("user", user_message), _turn("assistant", assistant_message)]}},
+             "$set": {"updatedAt": now, "expiresAt": now + timedelta(hours=CHAT_SESSION_TTL_HOURS)}},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    @staticmethod
+    def _to_fold(session: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Tours les plus anciens à intégrer au résumé quand la fenêtre dépasse le budget : on descend
+        à la moitié du budget (pour ne pas résumer à chaque tour), en gardant les tours récents.
+        """
+        turns = session.get("turns", [])
+        total = sum(t.get("tokens", 0) for t in turns) + estimate_tokens(session.get("summary", ""))
+        if total <= CHAT_HISTORY_TOKEN_BUDGET:
+            return []
+        fold: List[Dict[str, Any]] = []
+        for turn in turns[:max(0, len(turns) - CHAT_MIN_RECENT_TURNS)]:
+            if total <= CHAT_HISTORY_TOKEN_BUDGET // 2:
+                break
+            fold.append(turn)
+            total -= turn.get("tokens", 0)
+        return fold
+
+    def claim_summary(self, session: Optional[Dict[str, Any]]) -> bool:
+        """True si un résumé doit être lancé pour cette session (et qu'aucun autre n'est en cours)."""
+        if not session or not self._to_fold(session):
+            return False
+        now = datetime.utcnow()
+        claimed = self.collection.update_one(
+            {"_id": session["_id"],
+             "$or": [{"summarizingSince": None},
+                     {"summarizingSince": {"$lt": now - timedelta(seconds=SUMMARY_LEASE_S)}}]},
+            {"$set": {"summarizingSince": now}},
+        )
+        return claimed.modified_count == 1
+
+    def summarize(self, session_id) -> int:
+        """Intègre les tours les plus anciens au résumé ; renvoie le nombre de tours résumés."""
+        session = self.collection.find_one({"_id": ObjectId(session_id)})
+        fold = self._to_fold(session) if session else []
+        if not fold:
+            if session:
+                self.collection.update_one({"_id": session["_id"]}, {"$set": {"summarizingSince": None}})
+            return 0
+        try:
+            prompt = SUMMARY_PROMPT.format(
+                max_words=int(CHAT_SUMMARY_TOKEN_BUDGET * 0.75),
+                summary=session.get("summary") or "(aucun)",
+                turns="\n".join(f"{'Utilisateur' if t['role'] == 'user' else 'Assistant'} : {t['content']}"
+                                for t in fold),
+            )
+            resp = llm_gateway.generate(self.summary_model, prompt, operation="chat_summary")
+            # Plafond dur : deux fois la taille visée (~4 caractères par token)
+            summary = (resp.text or "").strip()[:CHAT_SUMMARY_TOKEN_BUDGET * 8]
+        except Exception:
+            self.collection.update_one({"_id": session["_id"]}, {"$set": {"summarizingSince": None}})
+            raise
+        # Écriture conditionnelle : un autre résumé concurrent l'emporte, celui-ci est abandonné
+        updated = self.collection.update_one(
+            {"_id": session["_id"], "summaryVersion": session.get("summaryVersion", 0)},
+            {"$set": {"summary": summary, "summarizingSince": None},
+             "$inc": {"summaryVersion": 1},
+             "$pull": {"turns": {"id": {"$in": [t["id"] for t in fold]}}}},
+        )
+        return len(fold) if updated.modified_count else 0
+
+    @staticmethod
+    def stats(session: Dict[str, Any]) -> Dict[str, Any]:
+        turns = session.get("turns", [])
+        return {"turns": len(turns), "windowTokens": sum(t.get("tokens", 0) for t in turns),
+                "summaryTokens": estimate_tokens(session.get("summary", "")) if session.get("summary") else 0}
@@ -1,6 +1,13 @@
+import os
+
 import numpy as np
 from typing import Dict, List
 
+from cache import BoundedCache
+
+# Embeddings déjà calculés (texte -> vecteur) : les offres dupliquées réutilisent ceux stockés
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", 4096))
+
 # Embeddings
 try:
     from sentence_transformers import SentenceTransformer
@@ -36,6 +43,7 @@ class CVJobEmbeddingSimilarity:
         self.model_type = model_type
         self.model = None
         self.tokenizer = None
+        self._embeddings = BoundedCache("embeddings", max_size=EMBEDDING_CACHE_SIZE)
         self._load_model()
         self.weights = {
             'global_similarity': 0.4,
@@ -118,7 +126,7 @@ class CVJobEmbeddingSimilarity:
                 embeddings.append(np.random.randn(1536))
         return np.array(embeddings) if embeddings else np.array([])
 
-    def generate_embeddings(self, texts: List[str]) -> np.ndarray:
+    def _encode(self, texts: List[str]) -> np.ndarray:
         if self.model_type == "sentence_transformer":
             return self.get_sentence_transformer_embeddings(texts)
         if self.model_type == "camembert":
@@ -127,6 +135,41 @@ class CVJobEmbeddingSimilarity:
             return self.get_openai_embeddings(texts)
         raise ValueError(f"Modèle non supporté: {self.model_type}")
 
+    def generate_embeddings(self, texts: List[str]) -> np.ndarray:
+        """Embeddings des textes non vides ; seuls les textes absents du cache passent par l'encodeur."""
+        cleaned_texts = [t.strip() for t in texts if t.strip()]
+        if not cleaned_texts:
+            return np.array([])
+        cached = {t: self._embeddings.get(t) for t in dict.fromkeys(cleaned_texts)}
+        missing = [t for t, v in cached.items() if v is None]
+        if missing:
+            encoded = self._encode(missing)
+            if len(encoded) != len(missing):
+                return np.array([])
+            for t, v in zip(missing, encoded):
+                cached[t] = np.asarray(v)
+                self._embeddings.set(t, cached[t])
+        return np.array([cached[t] for t in cleaned_texts])
+
+    def job_texts(self, job_data: Dict) -> List[str]:
+        """Textes de l'offre passés à l'encodeur (sections + compétences requises)."""
+        skills = job_data.get('required_skills', [])
+        texts = list(self.extract_sections_from_job(job_data).values()) + (skills if isinstance(skills, list) else [])
+        return list(dict.fromkeys(t.strip() for t in texts if isinstance(t, str) and t.strip()))
+
+    def export_embeddings(self, texts: List[str]) -> Dict[str, List[float]]:
+        """Embeddings en cache pour ces textes (listes de floats, stockables en base)."""
+        out = {}
+        for t in texts:
+            v = self._embeddings.get(t)
+            if v is not None:
+                out[t] = [float(x) for x in v]
+        return out
+
+    def preload_embeddings(self, embeddings: Dict[str, List[float]]) -> None:
+        for t, v in embeddings.items():
+            self._embeddings.set(t, np.asarray(v, dtype=np.float32))
+
     def calculate_sectional_similarity(self, cv_data: Dict, job_data: Dict) -> Dict:
         from sklearn.metrics.pairwise import cosine_similarity
         cv_sections = self.extract_sections_from_cv(cv_data)
@@ -0,0 +1,134 @@
+# cv_parsing/bulk_parser.py - Parsing groupé de CV (imports hors ligne)
+# Plusieurs CV courts sont "packés" dans une seule requête Gemini (délimiteurs par document,
+# schéma = liste de CandidateInfo + doc_id), dans la limite d'un budget de tokens par requête.
+# Chaque document absent ou invalide dans la réponse est reparsé individuellement.
+
+import json
+import os
+from typing import Dict, List, Optional
+
+import google.generativeai as genai
+from pydantic import ValidationError
+
+import llm_gateway
+from cv_parsing.gemini_parser import FIELD_RULES, model, parse_cv_with_gemini
+from cv_parsing.compaction import compact_cv_text
+from cv_parsing.models import CandidateInfo
+from cv_parsing.pre_parser import merge_pre_parsed, pre_parse_cv
+
+# Budget de tokens (entrée) par requête packée, et nombre max de CV par requête
+DEFAULT_TOKEN_BUDGET = int(os.getenv("BULK_PACK_TOKEN_BUDGET", 6000))
+DEFAULT_MAX_DOCS = int(os.getenv("BULK_PACK_MAX_DOCS", 8))
+# Réserve approximative de tokens de sortie par CV (le JSON produit)
+OUTPUT_TOKENS_PER_DOC = 700
+
+
+class PackedCandidate(CandidateInfo):
+    doc_id: int
+
+
+PACKED_PROMPT_TEMPLATE = """Extract the information from each candidate CV below and return a JSON array
+with exactly one object per CV, in any order. Each object has the fields:
+{'doc_id':0,'name':'','email':'','phone':'','skills':'','education':'','experience':'','certifications':'','languages':''}
+
+doc_id – the number N of the "<<<CV N>>>" block the object was extracted from
+FIELDS_RULES
+
+Mandatory requirements:
+- Never mix information between two CV blocks
+- If field is missing, return "N/A"
+- Output must be valid JSON ONLY
+
+DOCUMENTS
+"""
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimation grossière (~4 caractères par token)."""
+    return len(text or "") // 4 + 1
+
+
+def pack_documents(texts: List[str], token_budget: int = DEFAULT_TOKEN_BUDGET,
+                   max_docs: int = DEFAULT_MAX_DOCS) -> List[List[int]]:
+    """
+    Regroupe les indices de documents (ordre conservé) en paquets respectant le budget
+    (entrée + sortie estimées). Un document trop gros à lui seul forme un paquet unique.
+    """
+    overhead = estimate_tokens(PACKED_PROMPT_TEMPLATE)
+    groups: List[List[int]] = []
+    current: List[int] = []
+    used = overhead
+    for i, text in enumerate(texts):
+        cost = estimate_tokens(text) + OUTPUT_TOKENS_PER_DOC
+        if current and (used + cost > token_budget or len(current) >= max_docs):
+            groups.append(current)
+            current, used = [], overhead
+        current.append(i)
+        used += cost
+    if current:
+        groups.append(current)
+    return groups
+
+
+def build_packed_prompt(docs: Dict[int, str]) -> str:
+    blocks = "\n\n".join(f"<<<CV {doc_id}>>>\n{text}\n<<<END CV {doc_id}>>>" for doc_id, text in docs.items())
+    rules = "\n".join(FIELD_RULES.values())
+    return PACKED_PROMPT_TEMPLATE.replace("FIELDS_RULES", rules).replace("DOCUMENTS", blocks)
+
+
+def _parse_pack(texts: List[str], group: List[int]) -> Dict[int, dict]:
+    """Un appel Gemini pour le paquet ; renvoie {indice: dict validé} (documents valides uniquement)."""
+    docs = {i: texts[i] for i in group}
+    result = llm_gateway.generate(
+        model,
+        build_packed_prompt(docs),
+        operation="parse_cv_bulk",
+        generation_config=genai.GenerationConfig(
+            temperature=0.2,
+            response_mime_type="application/json",
+            response_schema=list[PackedCandidate],
+        ),
+    )
+    items = json.loads(result.text)
+    parsed: Dict[int, dict] = {}
+    for item in items if isinstance(items, list) else []:
+        try:
+            candidate = PackedCandidate.model_validate(item)
+        except ValidationError:
+            continue
+        if candidate.doc_id in docs and candidate.doc_id not in parsed:
+            data = candidate.model_dump()
+            data.pop("doc_id", None)
+            parsed[candidate.doc_id] = data
+    return parsed
+
+
+def parse_cvs_packed(texts: List[str], token_budget: int = DEFAULT_TOKEN_BUDGET,
+                     max_docs: int = DEFAULT_MAX_DOCS) -> List[Optional[dict]]:
+    """
+    Parse une liste de textes de CV en packant plusieurs CV par requête.
+    Renvoie une liste alignée sur `texts` (None si le document n'a pas pu être parsé).
+    """
+    results: List[Optional[dict]] = [None] * len(texts)
+    # Le packing et les prompts portent sur les textes compactés (en-têtes, espaces, puces retirés)
+    compacted = [compact_cv_text(t)[0] for t in texts]
+    for group in pack_documents(compacted, token_budget, max_docs):
+        parsed: Dict[int, dict] = {}
+        if len(group) > 1:
+            try:
+                parsed = _parse_pack(compacted, group)
+            except Exception as e:
+                print(f"⚠️  Paquet {group} en échec, repli document par document: {e}")
+        for i in group:
+            if i in parsed:
+                # Les champs fiables du pré-parsing local priment sur la sortie packée
+                results[i] = merge_pre_parsed(parsed[i], pre_parse_cv(texts[i]))
+                continue
+            try:
+                results[i] = parse_cv_with_gemini(texts[i])
+            except Exception as e:
+                print(f"❌ CV {i}: parsing individuel en échec: {e}")
+        if len(group) > 1:
+            print(f"📦 Paquet de {len(group)} CV: {len(parsed)} extraits en un appel, "
+                  f"{len(group) - len(parsed)} en repli individuel")
+    return results
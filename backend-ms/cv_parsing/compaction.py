@@ -0,0 +1,127 @@
+# cv_parsing/compaction.py - Compactage du texte extrait avant envoi à Gemini
+# - Normalise les espaces (tabulations, espaces insécables, lignes vides multiples)
+# - Supprime les en-têtes/pieds de page répétés et les numéros de page
+# - Retire le bruit de mise en page (puces décoratives, lignes de séparation)
+# - Applique un plafond dur en tokens et mesure la réduction obtenue
+
+import os
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Set, Tuple
+
+import metrics
+
+# Plafond de tokens du texte CV envoyé dans le prompt (≈ 4 caractères / token)
+DEFAULT_MAX_TOKENS = int(os.getenv("CV_PROMPT_MAX_TOKENS", 6000))
+CHARS_PER_TOKEN = 4
+# Une ligne courte présente à la même place en haut ou en bas d'au moins ce nombre de pages
+# est un en-tête/pied de page
+REPEATED_LINE_MIN = 3
+REPEATED_LINE_MAX_LEN = 80
+# Zone d'en-tête / de pied : premières et dernières lignes non vides de chaque page
+PAGE_EDGE_LINES = 2
+
+_BULLETS = "•●○◦▪▫■□►▶▸➢➤➔→✓✔✗❖◆◇★☆♦"
+_LEADING_BULLET_RE = re.compile(r"^[\s" + re.escape(_BULLETS) + r"\-\*·]+(?=\S)")
+_INLINE_BULLET_RE = re.compile(r"\s*[" + re.escape(_BULLETS) + r"]\s*")
+_SEPARATOR_LINE_RE = re.compile(r"^[\s\-_=~.·*" + re.escape(_BULLETS) + r"]+$")
+_PAGE_NUMBER_RE = re.compile(r"^(page|p\.)?\s*\d{1,3}\s*((/|sur|of)\s*\d{1,3})?$", re.IGNORECASE)
+# Référence de page dans un en-tête/pied ("Jean Dupont - CV - Page 2/3", "... 2 / 3")
+_PAGE_REF_RE = re.compile(r"\b(page|p\.)\s*\d{1,3}(\s*(/|sur|of)\s*\d{1,3})?\b|\b\d{1,3}\s*(/|sur|of)\s*\d{1,3}$",
+                          re.IGNORECASE)
+_SPACES_RE = re.compile("[ \t\u00a0\u2000-\u200b\u202f\u3000]+")
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text or "") // CHARS_PER_TOKEN + 1
+
+
+def _line_signature(line: str) -> str:
+    # Texte littéral ; seuls les numéros de page sont neutralisés ("Page 2/3" et "Page 3/3")
+    return _PAGE_REF_RE.sub("#", line.lower())
+
+
+def _clean_lines(page: str) -> List[str]:
+    lines = []
+    for raw in page.split("\n"):
+        line = _SPACES_RE.sub(" ", raw).strip()
+        line = _LEADING_BULLET_RE.sub("", line)
+        line = _INLINE_BULLET_RE.sub(" | ", line).strip(" |")
+        if line and (_SEPARATOR_LINE_RE.match(line) or _PAGE_NUMBER_RE.match(line)):
+            continue
+        lines.append(line)
+    return lines
+
+
+def _edge_positions(lines: List[str]) -> Dict[int, str]:
+    """Lignes en zone d'en-tête ou de pied de page -> position ("h0" = 1re ligne, "f0" = dernière...)."""
+    filled = [i for i, line in enumerate(lines) if line]
+    positions = {i: f"f{k}" for k, i in enumerate(reversed(filled[-PAGE_EDGE_LINES:]))}
+    positions.update({i: f"h{k}" for k, i in enumerate(filled[:PAGE_EDGE_LINES])})
+    return positions
+
+
+def _repeated_edges(pages: List[List[str]]) -> Set[Tuple[str, str]]:
+    """
+    (position, signature) des lignes courtes répétées à la même place en tête/pied de plusieurs
+    pages (séparées par un saut de page). Une même ligne dans le corps du texte (dates d'expérience,
+    intitulés) n'est jamais concernée.
+    """
+    if len(pages) < 2:
+        return set()
+    counts: Counter = Counter()
+    for lines in pages:
+        counts.update({(pos, _line_signature(lines[i])) for i, pos in _edge_positions(lines).items()
+                       if len(lines[i]) <= REPEATED_LINE_MAX_LEN})
+    threshold = min(REPEATED_LINE_MIN, len(pages))
+    return {key for key, n in counts.items() if n >= threshold}
+
+
+def compact_cv_text(text: str, max_tokens: Optional[int] = DEFAULT_MAX_TOKENS) -> Tuple[str, Dict[str, object]]:
+    """Renvoie (texte compacté, statistiques de réduction)."""
+    original = text or ""
+    pages = [_clean_lines(page) for page in original.replace("\r\n", "\n").replace("\r", "\n").split("\f")]
+
+    # En-têtes/pieds de page répétés : on ne garde que la première occurrence
+    repeated = _repeated_edges(pages)
+    seen = set()
+    kept = []
+    for lines in pages:
+        edges = _edge_positions(lines) if repeated else {}
+        for i, line in enumerate(lines):
+            if i in edges:
+                key = (edges[i], _line_signature(line))
+                if key in repeated:
+                    if key in seen:
+                        continue
+                    seen.add(key)
+            # Une seule ligne vide consécutive
+            if not line and (not kept or not kept[-1]):
+                continue
+            kept.append(line)
+    compacted = "\n".join(kept).strip()
+
+    truncated = False
+    if max_tokens and estimate_tokens(compacted) > max_tokens:
+        limit = max_tokens * CHARS_PER_TOKEN
+        cut = compacted.rfind("\n", 0, limit)
+        compacted = compacted[:cut if cut > limit // 2 else limit].rstrip()
+        truncated = True
+
+    original_bytes = len(original.encode("utf-8"))
+    compacted_bytes = len(compacted.encode("utf-8"))
+    stats = {
+        "original_bytes": original_bytes,
+        "compacted_bytes": compacted_bytes,
+        "original_tokens": estimate_tokens(original),
+        "compacted_tokens": estimate_tokens(compacted),
+        "reduction_pct": round((1 - compacted_bytes / original_bytes) * 100, 1) if original_bytes else 0.0,
+        "repeated_lines_removed": len(repeated),
+        "truncated": truncated,
+    }
+    metrics.incr("cv_compaction.bytes_in", original_bytes)
+    metrics.incr("cv_compaction.bytes_out", compacted_bytes)
+    metrics.incr("cv_compaction.tokens_saved", stats["original_tokens"] - stats["compacted_tokens"])
+    if truncated:
+        metrics.incr("cv_compaction.truncated")
+    return compacted, stats
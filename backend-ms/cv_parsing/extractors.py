@@ -1,23 +1,39 @@
 import os
+from typing import BinaryIO, Optional, Union
+
 import pdfplumber
 from docx import Document
 
-def extract_text_from_pdf(pdf_path: str) -> str:
-    all_text = ""
-    with pdfplumber.open(pdf_path) as pdf:
-        for page in pdf.pages:
-            all_text += page.extract_text() or ""
-    return all_text
+# Source acceptée : chemin sur disque OU objet fichier binaire (BytesIO, flux spoolé, ...)
+Source = Union[str, BinaryIO]
+
+def _rewind(source: Source) -> None:
+    if hasattr(source, "seek"):
+        source.seek(0)
+
+def extract_text_from_pdf(pdf_source: Source) -> str:
+    _rewind(pdf_source)
+    with pdfplumber.open(pdf_source) as pdf:
+        # Saut de ligne + saut de page (\f) entre pages : évite de coller la dernière ligne d'une page
+        # à la première de la suivante, et permet de repérer les en-têtes/pieds répétés page par page
+        return "\n\f".join(page.extract_text() or "" for page in pdf.pages)
 
-def extract_text_from_docx(docx_path: str) -> str:
-    doc = Document(docx_path)
+def extract_text_from_docx(docx_source: Source) -> str:
+    _rewind(docx_source)
+    doc = Document(docx_source)
     return "\n".join([para.text for para in doc.paragraphs])
 
-def extract_text(file_path: str) -> str:
-    ext = os.path.splitext(file_path)[-1].lower()
+def extract_text(source: Source, filename: Optional[str] = None) -> str:
+    """
+    Extrait le texte d'un PDF/DOCX.
+    - source : chemin de fichier ou objet fichier binaire (lecture en mémoire, sans fichier temporaire)
+    - filename : nom d'origine, requis pour déterminer l'extension d'un objet fichier
+    """
+    name = filename or (source if isinstance(source, str) else getattr(source, "name", "")) or ""
+    ext = os.path.splitext(str(name))[-1].lower()
     if ext == ".pdf":
-        return extract_text_from_pdf(file_path)
+        return extract_text_from_pdf(source)
     elif ext == ".docx":
-        return extract_text_from_docx(file_path)
+        return extract_text_from_docx(source)
     else:
-        raise ValueError(f"Format non supporté: {ext}")
\ No newline at end of file
+        raise ValueError(f"Format non supporté: {ext}")
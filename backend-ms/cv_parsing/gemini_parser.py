@@ -1,27 +1,23 @@
-import time
+import json
+from functools import lru_cache
+from typing import FrozenSet, List
+
 import google.generativeai as genai
+from pydantic import create_model
 from cv_parsing.models import CandidateInfo
-import os
-from dotenv import load_dotenv
-load_dotenv()
-
+from cv_parsing.pre_parser import pre_parse_cv, merge_pre_parsed
+from cv_parsing.compaction import compact_cv_text
+import llm_gateway
+import metrics
 
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
 PROMPT_TEMPLATE = """Extract the information from the given text extracted from a candidate CV and return a JSON object:
-{'name':'','email':'','phone':'','skills':'','education':'','experience':'','certifications':'','languages':''}
+FIELDS_JSON
 
 Extraction rules:
-name – full name of the candidate
-email – valid email address
-phone – phone number
-skills – max 15, no duplicates
-education – degree, institution, year
-experience – job title, company, years, description
-certifications – list
-languages – list
+FIELDS_RULES
 
 Mandatory requirements:
-- Ensure each record contains all 8 fields
+- Ensure each record contains all FIELDS_COUNT fields
 - If field is missing, return "N/A"
 - Output must be valid JSON ONLY
 
@@ -29,16 +25,67 @@ Below is the given text extracted:
 PDF_TEXT
 """
 
-model = genai.GenerativeModel("gemini-2.5-flash")
+# Règles d'extraction par champ (ordre = ordre de CandidateInfo)
+FIELD_RULES = {
+    "name": "name – full name of the candidate",
+    "email": "email – valid email address",
+    "phone": "phone – phone number",
+    "skills": "skills – max 15, no duplicates",
+    "education": "education – degree, institution, year",
+    "experience": "experience – job title, company, years, description",
+    "certifications": "certifications – list",
+    "languages": "languages – list",
+}
+
+model = llm_gateway.get_model("gemini-2.5-flash")
 
-def parse_cv_with_gemini(cv_text: str) -> dict:
-    result = model.generate_content(
-        PROMPT_TEMPLATE.replace("PDF_TEXT", cv_text),
-        generation_config=genai.GenerationConfig(
-            temperature=0.7,
-            response_mime_type="application/json",
-            response_schema=CandidateInfo
-        ),
+@lru_cache(maxsize=32)
+def _schema_for_fields(fields: FrozenSet[str]):
+    """Sous-schéma de CandidateInfo restreint aux champs demandés à Gemini."""
+    if fields == frozenset(FIELD_RULES):
+        return CandidateInfo
+    return create_model(
+        "CandidateInfoPartial",
+        **{f: (CandidateInfo.model_fields[f].annotation, ...) for f in FIELD_RULES if f in fields},
     )
-    time.sleep(5)
-    return result.text
\ No newline at end of file
+
+def build_prompt(cv_text: str, fields: List[str]) -> str:
+    fields_json = "{" + ",".join(f"'{f}':''" for f in fields) + "}"
+    return (PROMPT_TEMPLATE
+            .replace("FIELDS_JSON", fields_json)
+            .replace("FIELDS_RULES", "\n".join(FIELD_RULES[f] for f in fields))
+            .replace("FIELDS_COUNT", str(len(fields)))
+            .replace("PDF_TEXT", cv_text))
+
+def parse_cv_with_gemini(cv_text: str, allow_partial: bool = False) -> dict:
+    """
+    Parse un CV : pré-parsing local (email, téléphone, langues, compétences connues),
+    puis Gemini uniquement pour les champs restants, sur le texte compacté.
+    allow_partial : en cas d'échec Gemini, renvoie le résultat partiel local au lieu de lever.
+    Gemini indisponible (circuit ouvert, échéance, erreur serveur) : résultat partiel dans tous les cas.
+    Un résultat partiel porte "degraded": True (à ne pas enregistrer ni mettre en cache).
+    """
+    pre = pre_parse_cv(cv_text)
+    remaining = [f for f in FIELD_RULES if f not in pre.fields]
+    compacted, stats = compact_cv_text(cv_text)
+    print(f"🗜️  Texte CV compacté: {stats['original_tokens']} -> {stats['compacted_tokens']} tokens "
+          f"(-{stats['reduction_pct']}%{', tronqué' if stats['truncated'] else ''})")
+    try:
+        result = llm_gateway.generate(
+            model,
+            build_prompt(compacted, remaining),
+            operation="parse_cv",
+            generation_config=genai.GenerationConfig(
+                temperature=0.7,
+                response_mime_type="application/json",
+                response_schema=_schema_for_fields(frozenset(remaining))
+            ),
+        )
+        llm_data = json.loads(result.text)
+    except Exception as e:
+        if not (allow_partial or llm_gateway.is_unavailable_error(e)):
+            raise
+        print(f"⚠️  Gemini indisponible, résultat partiel (pré-parsing local): {e}")
+        metrics.incr("llm.degraded.parse_cv")
+        return {**pre.as_candidate(), "degraded": True}
+    return merge_pre_parsed(llm_data, pre)
@@ -1,13 +1,17 @@
+import copy
+import hashlib
 import json
 import os
-import google.generativeai as genai
-from dotenv import load_dotenv
 
-# Charger les variables d'environnement
-load_dotenv()
+import llm_gateway
+import metrics
+from cache import BoundedCache
 
-# Configuration de l'API Gemini
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+# Modèle partagé (configuration Gemini centralisée dans llm_gateway)
+JOB_MODEL_NAME = 'gemini-2.5-flash'
+
+# Derniers résultats valides par texte d'offre : servis si Gemini est indisponible
+_last_good = BoundedCache("job_parse_fallback", max_size=int(os.getenv("JOB_PARSE_FALLBACK_SIZE", 256)))
 
 def parse_job(job_text: str) -> dict:
     """
@@ -17,7 +21,8 @@ def parse_job(job_text: str) -> dict:
         job_text (str): Le texte brut de l'offre d'emploi
         
     Returns:
-        dict: Un dictionnaire contenant les informations extraites de l'offre
+        dict: Un dictionnaire contenant les informations extraites de l'offre.
+        Un résultat de secours (Gemini indisponible) porte "degraded": True (à ne pas enregistrer ni mémoriser).
     """
     
     prompt = f"""
@@ -46,12 +51,13 @@ def parse_job(job_text: str) -> dict:
     - Normalise le type de contrat en majuscules
     """
     
+    cache_key = hashlib.sha256(job_text.strip().encode("utf-8")).hexdigest()
     try:
-        # Initialiser le modèle Gemini
-        model = genai.GenerativeModel('gemini-2.5-flash')
+        # Modèle Gemini partagé (instance réutilisée entre les appels)
+        model = llm_gateway.get_model(JOB_MODEL_NAME)
         
         # Générer la réponse
-        response = model.generate_content(prompt)
+        response = llm_gateway.generate(model, prompt, operation="parse_job")
         
         # Nettoyer la réponse pour enlever ```json ou ```
         raw_text = response.text.strip()
@@ -81,11 +87,19 @@ def parse_job(job_text: str) -> dict:
             "education_required": result.get("education_required"),
             "responsibilities": result.get("responsibilities", []) if isinstance(result.get("responsibilities"), list) else []
         }
+        if result:
+            _last_good.set(cache_key, copy.deepcopy(cleaned_result))
         
         return cleaned_result
         
     except Exception as e:
         print(f"Erreur lors de l'appel à l'API Gemini : {e}")
+        cached = _last_good.get(cache_key)
+        if cached is not None:
+            # Résultat dégradé : dernière extraction réussie de la même offre
+            metrics.incr("llm.degraded.parse_job")
+            return {**copy.deepcopy(cached), "degraded": True}
+        metrics.incr("llm.degraded.parse_job")
         return {
             "title": None,
             "company": None,
@@ -94,7 +108,8 @@ def parse_job(job_text: str) -> dict:
             "required_skills": [],
             "experience_required": None,
             "education_required": None,
-            "responsibilities": []
+            "responsibilities": [],
+            "degraded": True
         }
 
 
@@ -0,0 +1,254 @@
+# cv_parsing/normalization.py - Champs de préfiltrage typés (CV et offres)
+# Les sorties de parsing sont du texte libre ("3 ans minimum", "2019 - présent", "Paris (75)",
+# "Bac+5 informatique"...). On en dérive des champs typés, stockés avec le résultat sous
+# "filters" et indexés : une recherche réduit l'ensemble de candidats par requête Mongo
+# avant tout calcul d'embeddings.
+
+import re
+import unicodedata
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class ContractType(str, Enum):
+    CDI = "cdi"
+    CDD = "cdd"
+    STAGE = "stage"
+    ALTERNANCE = "alternance"
+    FREELANCE = "freelance"
+    INTERIM = "interim"
+
+
+_CONTRACT_PATTERNS = [
+    (ContractType.ALTERNANCE, r"alternance|apprenti\w*|contrat pro\w*|work[- ]study"),
+    (ContractType.STAGE, r"\bstage\w*|internship|intern\b|stagiaire"),
+    (ContractType.FREELANCE, r"freelance|independant|portage|contractor|consultant externe"),
+    (ContractType.INTERIM, r"interim\w*|temporary agency"),
+    (ContractType.CDD, r"\bcdd\b|contrat a duree determinee|fixed[- ]term|temporary"),
+    (ContractType.CDI, r"\bcdi\b|contrat a duree indeterminee|permanent|full[- ]time|temps plein"),
+]
+
+# Niveau de diplôme en années après le bac (le plus élevé d'abord)
+_DEGREE_PATTERNS = [
+    (8, r"doctorat|doctorate|ph\.? ?d|these"),
+    (5, r"master|mba|msc|m\.sc|mastere|ingenieur|engineer(ing)? degree|dess|dea|\bm2\b"),
+    (4, r"maitrise|\bm1\b"),
+    (3, r"licence|bachelor|bsc|b\.sc"),
+    (2, r"bts|dut|deug|associate degree|\bdeust\b"),
+    (0, r"baccalaureat|\bbac\b|high school"),
+]
+# BUT (Bachelor Universitaire de Technologie) : sigle en majuscules uniquement, "but" est un mot courant
+_BUT_RE = re.compile(r"\bBUT\b")
+
+_MONTHS = {
+    "jan": 1, "janv": 1, "janvier": 1, "january": 1, "feb": 2, "fev": 2, "fevr": 2, "fevrier": 2, "february": 2,
+    "mar": 3, "mars": 3, "march": 3, "apr": 4, "avr": 4, "avril": 4, "april": 4, "mai": 5, "may": 5,
+    "jun": 6, "juin": 6, "june": 6, "jul": 7, "juil": 7, "juillet": 7, "july": 7, "aug": 8, "aou": 8, "aout": 8,
+    "august": 8, "sep": 9, "sept": 9, "septembre": 9, "september": 9, "oct": 10, "octobre": 10, "october": 10,
+    "nov": 11, "novembre": 11, "november": 11, "dec": 12, "decembre": 12, "december": 12,
+}
+_PRESENT_RE = re.compile(r"present|aujourd|actuel|current|now|en cours|ce jour|today")
+_DATE_RE = re.compile(r"(?:\b(?P<month_num>\d{1,2})\s*[/.-]\s*|\b(?P<month_name>[a-z]{3,9})\.?\s+)?"
+                      r"\b(?P<year>(?:19|20)\d{2})\b")
+_DURATION_RE = re.compile(r"(?P<n>\d+(?:[.,]\d+)?)\s*\+?\s*(?P<unit>ans?|annees?|years?|yrs?|mois|months?)\b")
+_REMOTE_RE = re.compile(r"full remote|remote|teletravail|a distance")
+
+
+def _ascii(text: Any) -> str:
+    if not isinstance(text, str):
+        return ""
+    return unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii").lower()
+
+
+# ----------------------------------------------------------------------
+# Années d'expérience
+# ----------------------------------------------------------------------
+def parse_required_years(text: Any) -> Optional[float]:
+    """
+    Expérience minimale demandée par une offre ("3 ans", "2 à 5 years", "6 mois") ; None si absente.
+    La première durée citée est la durée demandée ("10 ans, dont 2 ans en management" -> 10) ;
+    le minimum n'est retenu que pour une fourchette explicite.
+    """
+    s = _ascii(text)
+    if not s:
+        return None
+    # "2-5 ans" / "2 à 5 years" : seul le dernier nombre porte l'unité, le minimum est le premier
+    ranged = re.search(r"(\d+)\s*(?:-|a|to)\s*\d+\s*(?:ans?|annees?|years?)", s)
+    first = _DURATION_RE.search(s)
+    if ranged and (first is None or ranged.start() <= first.start()):
+        return float(ranged.group(1))
+    if first:
+        n = float(first.group("n").replace(",", "."))
+        return round(n / 12 if first.group("unit").startswith(("mois", "month")) else n, 1)
+    if re.search(r"debutant|jeune diplome|sans experience|no experience|entry level", s):
+        return 0.0
+    return None
+
+
+def _month_index(year: int, month: int) -> int:
+    return year * 12 + (month - 1)
+
+
+def _period_months(text: Any, now: datetime) -> Tuple[Optional[Tuple[int, int]], float]:
+    """Un "years_worked" -> (intervalle en mois, ou None) + durée explicite en années (sans dates)."""
+    s = _ascii(text)
+    dates = []
+    for m in _DATE_RE.finditer(s):
+        month = 1
+        if m.group("month_num") and 1 <= int(m.group("month_num")) <= 12:
+            month = int(m.group("month_num"))
+        elif m.group("month_name") in _MONTHS:
+            month = _MONTHS[m.group("month_name")]
+        dates.append(_month_index(int(m.group("year")), month))
+    if dates:
+        start = min(dates)
+        if _PRESENT_RE.search(s):
+            end = _month_index(now.year, now.month)
+        elif len(dates) > 1:
+            end = max(dates)
+        else:
+            end = start + 11          # une seule année citée : compte pour un an
+        return (start, max(end, start)), 0.0
+    years = parse_required_years(s) if _DURATION_RE.search(s) else None
+    return None, years or 0.0
+
+
+def years_of_experience(experience: Any, now: Optional[datetime] = None) -> Optional[float]:
+    """Total d'années d'expérience d'un CV (périodes fusionnées : pas de double comptage des chevauchements)."""
+    if not isinstance(experience, list) or not experience:
+        return None
+    now = now or datetime.utcnow()
+    intervals: List[Tuple[int, int]] = []
+    extra = 0.0
+    for item in experience:
+        period = item.get("years_worked") if isinstance(item, dict) else item
+        interval, years = _period_months(period, now)
+        if interval:
+            intervals.append(interval)
+        extra += years
+    if not intervals and not extra:
+        return None
+    months = 0
+    current: Optional[List[int]] = None
+    for start, end in sorted(intervals):
+        if current and start <= current[1] + 1:
+            current[1] = max(current[1], end)
+            continue
+        if current:
+            months += current[1] - current[0] + 1
+        current = [start, end]
+    if current:
+        months += current[1] - current[0] + 1
+    return round(months / 12.0 + extra, 1)
+
+
+# ----------------------------------------------------------------------
+# Contrat, lieu, diplôme
+# ----------------------------------------------------------------------
+def normalize_contract(*texts: Any) -> Optional[str]:
+    """Type de contrat cité le plus tôt dans les textes fournis (champ contract, puis titre...)."""
+    for text in texts:
+        s = _ascii(text)
+        found = [(m.start(), contract) for contract, pattern in _CONTRACT_PATTERNS
+                 for m in [re.search(pattern, s)] if m]
+        if found:
+            return min(found, key=lambda f: f[0])[1].value
+    return None
+
+
+def normalize_location(text: Any) -> Optional[str]:
+    """Ville en minuscules sans accents ("Paris (75) - Hybride" -> "paris") ; "remote" si 100 % distanciel."""
+    s = _ascii(text)
+    if not s or s in ("n/a", "none", "null"):
+        return None
+    remote = bool(_REMOTE_RE.search(s))
+    s = _REMOTE_RE.sub(" ", s)
+    s = re.sub(r"\(.*?\)|\bhybrid[e]?\b|\bcedex\b|\b\d+\s*(?:er|e|eme)?\b", " ", s)
+    city = re.split(r"[,/;|]| - ", s)[0]
+    city = re.sub(r"[^a-z' -]", " ", city)
+    city = re.sub(r"\s+", " ", city).strip(" -'")
+    return city or ("remote" if remote else None)
+
+
+def degree_level(*texts: Any) -> Optional[int]:
+    """Niveau de diplôme (années après le bac : 0, 2, 3, 4, 5, 8) le plus élevé trouvé dans les textes."""
+    levels = []
+    for text in texts:
+        s = _ascii(text)
+        if not s:
+            continue
+        bac_plus = re.search(r"bac\s*\+\s*(\d)", s)
+        if bac_plus:
+            levels.append(int(bac_plus.group(1)))
+            continue
+        found = next((level for level, pattern in _DEGREE_PATTERNS if re.search(pattern, s)), None)
+        if _BUT_RE.search(text) and (found is None or found < 3):
+            found = 3
+        if found is not None:
+            levels.append(found)
+    return max(levels) if levels else None
+
+
+# ----------------------------------------------------------------------
+# Champs "filters" des résultats
+# ----------------------------------------------------------------------
+def job_filters(job: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "years_experience": parse_required_years(job.get("experience_required")),
+        "contract": normalize_contract(job.get("contract"), job.get("title")),
+        "location": normalize_location(job.get("location")),
+        "degree_level": degree_level(job.get("education_required")),
+    }
+
+
+def cv_filters(cv: Dict[str, Any]) -> Dict[str, Any]:
+    education = cv.get("education") if isinstance(cv.get("education"), list) else []
+    return {
+        "years_experience": years_of_experience(cv.get("experience")),
+        "degree_level": degree_level(*[e.get("degree") for e in education if isinstance(e, dict)]),
+    }
+
+
+def derive_filters(result_type: str, data: Any) -> Optional[Dict[str, Any]]:
+    """Champs de préfiltrage d'un résultat "cv" ou "job" (None pour les autres types)."""
+    if not isinstance(data, dict):
+        return None
+    if result_type == "job":
+        return job_filters(data)
+    if result_type == "cv":
+        return cv_filters(data)
+    return None
+
+
+def prefilter_query(min_years: Optional[float] = None, max_years: Optional[float] = None,
+                    min_degree: Optional[int] = None, contracts: Optional[List[str]] = None,
+                    location: Optional[str] = None, include_unknown: bool = True) -> Dict[str, Any]:
+    """
+    Conditions Mongo sur les champs "filters.*". Avec include_unknown, un résultat dont le champ
+    n'a pas pu être dérivé (null/absent) n'est pas écarté.
+    """
+    conditions = []
+
+    def add(field: str, cond: Any) -> None:
+        if include_unknown:
+            conditions.append({"$or": [{field: cond}, {field: None}]})
+        else:
+            conditions.append({field: cond})
+
+    years = {}
+    if min_years is not None:
+        years["$gte"] = min_years
+    if max_years is not None:
+        years["$lte"] = max_years
+    if years:
+        add("filters.years_experience", years)
+    if min_degree is not None:
+        add("filters.degree_level", {"$gte": min_degree})
+    if contracts:
+        add("filters.contract", {"$in": [c.lower() for c in contracts]})
+    if location:
+        add("filters.location", normalize_location(location))
+    if not conditions:
+        return {}
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
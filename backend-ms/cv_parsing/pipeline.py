@@ -3,13 +3,17 @@ import ast
 from tqdm import tqdm
 from cv_parsing.extractors import extract_text
 from cv_parsing.gemini_parser import parse_cv_with_gemini
+from cv_parsing.bulk_parser import parse_cvs_packed
 
-def run_cv_parsing(file_paths: list, output_json_path: str):
+def run_cv_parsing(file_paths: list, output_json_path: str, packed: bool = False):
     # Extraction texte
     extracted_list = [extract_text(file) for file in tqdm(file_paths)]
 
-    # Parsing via Gemini
-    all_results = [parse_cv_with_gemini(text) for text in tqdm(extracted_list)]
+    # Parsing via Gemini (packed=True : plusieurs CV courts par requête, repli individuel si besoin)
+    if packed:
+        all_results = parse_cvs_packed(extracted_list)
+    else:
+        all_results = [parse_cv_with_gemini(text) for text in tqdm(extracted_list)]
 
     # Sauvegarde JSON
     result_df = pd.DataFrame({
@@ -19,4 +23,4 @@ def run_cv_parsing(file_paths: list, output_json_path: str):
     })
     result_df.to_json(output_json_path, orient="records", indent=4)
 
-    return result_df
\ No newline at end of file
+    return result_df
@@ -0,0 +1,146 @@
+# cv_parsing/pre_parser.py - Pré-parsing déterministe (regex + dictionnaires)
+# Remplit localement, en quelques millisecondes, les champs "faciles" du CandidateInfo
+# (email, téléphone, langues) quand la détection est fiable, et repère les compétences
+# connues (taxonomie data/skill_taxonomy.json). Le reste est délégué à Gemini.
+
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from skill_taxonomy import taxonomy
+
+EMAIL_RE = re.compile(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b")
+# +33 6 12 34 56 78 / 06.12.34.56.78 / (+212) 612-345-678 ...
+PHONE_RE = re.compile(r"(?<![\w+])(?:\(?\+\d{1,3}\)?[\s.\-]?)?(?:\(?\d{1,4}\)?[\s.\-]?){2,6}\d{2,4}(?!\w)")
+
+# En-têtes de section "Langues"
+LANG_SECTION_RE = re.compile(r"^\s*(langues?|languages?|compétences linguistiques|idiomas)\s*:?\s*(.*)$",
+                             re.IGNORECASE)
+# En-têtes de sections usuelles, pour délimiter la section "Langues"
+SECTION_HEADER_RE = re.compile(
+    r"^\s*(compétences|competences|skills|expériences?|experiences?|formations?|education|éducation|"
+    r"certifications?|projets?|projects?|centres d'intérêt|intérêts|interests|loisirs|hobbies|"
+    r"profil|profile|résumé|summary|références|references)\b",
+    re.IGNORECASE,
+)
+
+# Variante rencontrée -> forme canonique
+KNOWN_LANGUAGES = {
+    "français": "Français", "francais": "Français", "french": "French",
+    "anglais": "Anglais", "english": "English",
+    "arabe": "Arabe", "arabic": "Arabic",
+    "espagnol": "Espagnol", "spanish": "Spanish",
+    "allemand": "Allemand", "german": "German",
+    "italien": "Italien", "italian": "Italian",
+    "portugais": "Portugais", "portuguese": "Portuguese",
+    "néerlandais": "Néerlandais", "dutch": "Dutch",
+    "chinois": "Chinois", "chinese": "Chinese", "mandarin": "Mandarin",
+    "japonais": "Japonais", "japanese": "Japanese",
+    "russe": "Russe", "russian": "Russian",
+    "turc": "Turc", "turkish": "Turkish",
+    "amazigh": "Amazigh", "berbère": "Berbère", "tamazight": "Tamazight",
+}
+
+MAX_SKILLS = 15
+
+
+@dataclass
+class PreParsedCV:
+    """Résultat du pré-parsing : champs fiables + compétences repérées."""
+    fields: Dict[str, object] = field(default_factory=dict)   # champs CandidateInfo remplis avec certitude
+    skills: List[str] = field(default_factory=list)           # compétences connues détectées (à fusionner)
+
+    def as_candidate(self) -> dict:
+        """Résultat partiel au format CandidateInfo (champs inconnus -> N/A / listes vides)."""
+        return {
+            "name": self.fields.get("name", "N/A"),
+            "email": self.fields.get("email", "N/A"),
+            "phone": self.fields.get("phone", "N/A"),
+            "skills": list(self.skills[:MAX_SKILLS]),
+            "education": [],
+            "experience": [],
+            "certifications": [],
+            "languages": list(self.fields.get("languages", [])),
+        }
+
+
+def extract_email(text: str) -> Optional[str]:
+    emails = list(dict.fromkeys(m.group(0).strip(".") for m in EMAIL_RE.finditer(text)))
+    # Un seul email distinct => fiable
+    return emails[0] if len(emails) == 1 else None
+
+def _looks_like_phone(raw: str) -> bool:
+    digits = re.sub(r"\D", "", raw)
+    if not 9 <= len(digits) <= 15:
+        return False
+    # Indicatif international (+33, (+212)) ou numéro national commençant par 0
+    if not re.match(r"\(?(\+|0)", raw):
+        return False
+    # Aucun groupe "année" : évite les périodes ("2018 - 2019 - 2021", "06/2019 - 2021")
+    return not any(re.fullmatch(r"(19|20)\d{2}", g) for g in re.findall(r"\d+", raw))
+
+def extract_phone(text: str) -> Optional[str]:
+    phones = list(dict.fromkeys(m.group(0).strip() for m in PHONE_RE.finditer(text)
+                                if _looks_like_phone(m.group(0).strip())))
+    # Un seul numéro plausible => fiable ; sinon Gemini tranche
+    return phones[0] if len(phones) == 1 else None
+
+def extract_languages(text: str) -> List[str]:
+    """Langues listées dans une section 'Langues' explicite (sinon liste vide = non fiable)."""
+    lines = text.splitlines()
+    found: List[str] = []
+    for i, line in enumerate(lines):
+        m = LANG_SECTION_RE.match(line)
+        if not m:
+            continue
+        section = [m.group(2)]
+        for nxt in lines[i + 1:i + 8]:
+            if SECTION_HEADER_RE.match(nxt) or LANG_SECTION_RE.match(nxt):
+                break
+            section.append(nxt)
+        for word in re.findall(r"[A-Za-zÀ-ÿ]+", " ".join(section)):
+            canon = KNOWN_LANGUAGES.get(word.lower())
+            if canon and canon not in found:
+                found.append(canon)
+    return found
+
+def extract_known_skills(text: str) -> List[str]:
+    """Compétences de la taxonomie (skill_taxonomy) citées dans le texte, formes canoniques."""
+    return taxonomy.extract(text)
+
+def pre_parse_cv(cv_text: str) -> PreParsedCV:
+    """Pré-parse un texte de CV. Seuls les champs à haute confiance sont remplis."""
+    result = PreParsedCV()
+    text = cv_text or ""
+
+    email = extract_email(text)
+    if email:
+        result.fields["email"] = email
+    phone = extract_phone(text)
+    if phone:
+        result.fields["phone"] = phone
+    languages = extract_languages(text)
+    if languages:
+        result.fields["languages"] = languages
+    result.skills = extract_known_skills(text)
+    return result
+
+def merge_pre_parsed(llm_data: dict, pre: PreParsedCV) -> dict:
+    """Fusionne la sortie Gemini (champs restants) avec les champs pré-parsés."""
+    merged = pre.as_candidate()
+    for key, value in (llm_data or {}).items():
+        if key not in pre.fields:
+            merged[key] = value
+
+    # Compétences : celles de Gemini d'abord, complétées par le dictionnaire local
+    llm_skills = merged.get("skills") if isinstance(merged.get("skills"), list) else []
+    seen = {str(s).strip().lower() for s in llm_skills}
+    # Variantes déjà citées par Gemini ("Postgres" couvre "PostgreSQL")
+    seen |= {c.lower() for c in map(taxonomy.canonical, map(str, llm_skills)) if c}
+    skills = list(llm_skills)
+    for s in pre.skills:
+        if s.lower() not in seen:
+            skills.append(s)
+            seen.add(s.lower())
+    merged["skills"] = skills[:MAX_SKILLS]
+    return merged
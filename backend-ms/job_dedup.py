@@ -0,0 +1,152 @@
+# job_dedup.py - Détection des offres d'emploi quasi identiques (MinHash + LSH)
+# Beaucoup d'utilisateurs collent la même offre à quelques espaces ou liens de tracking près :
+# une offre au texte normalisé identique à une offre déjà vue réutilise son parsing Gemini ;
+# une offre quasi identique (Jaccard estimé >= seuil) est re-parsée (un détail comme le salaire
+# ou le lieu peut différer) mais réutilise les embeddings stockés, indexés par texte.
+
+import hashlib
+import os
+import random
+import re
+import unicodedata
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+from bson import ObjectId
+from pymongo import ASCENDING
+
+import metrics
+
+NUM_PERM = 128
+BANDS = 16                      # 16 bandes x 8 lignes : candidat dès ~70 % de similarité
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 4                # n-grammes de mots
+DEFAULT_THRESHOLD = float(os.getenv("JOB_DEDUP_THRESHOLD", 0.85))
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# Permutations fixes (identiques entre processus et redémarrages : signatures stockées comparables)
+_rnd = random.Random(20240601)
+_PERMS = [(_rnd.randrange(1, _PRIME), _rnd.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+_URL_RE = re.compile(r"(https?://|www\.)\S+")
+_TRACKING_RE = re.compile(r"\b(utm_\w+|ref|trk|src)=\S+")
+_NON_WORD_RE = re.compile(r"[^a-z0-9+#]+")
+
+
+def normalize_job_text(text: str) -> str:
+    """Minuscules, sans accents ni liens/paramètres de tracking, ponctuation et espaces réduits."""
+    s = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode("ascii").lower()
+    s = _URL_RE.sub(" ", s)
+    s = _TRACKING_RE.sub(" ", s)
+    return _NON_WORD_RE.sub(" ", s).strip()
+
+
+def shingles(normalized: str, size: int = SHINGLE_SIZE) -> Set[str]:
+    words = normalized.split()
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def minhash(items: Set[str]) -> List[int]:
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big") & _MAX_HASH
+              for s in items]
+    if not hashes:
+        return [_MAX_HASH] * NUM_PERM
+    return [min((a * h + b) % _PRIME for h in hashes) & _MAX_HASH for a, b in _PERMS]
+
+
+def band_keys(signature: List[int]) -> List[str]:
+    return [
+        f"{i}:" + hashlib.blake2b(repr(signature[i * ROWS:(i + 1) * ROWS]).encode("ascii"), digest_size=8).hexdigest()
+        for i in range(BANDS)
+    ]
+
+
+def estimated_jaccard(a: List[int], b: List[int]) -> float:
+    return sum(1 for x, y in zip(a, b) if x == y) / float(NUM_PERM)
+
+
+class JobDeduplicator:
+    """Signatures MinHash des offres déjà parsées (collection "job_signatures"), indexées par bande LSH."""
+
+    def __init__(self, collection, threshold: float = DEFAULT_THRESHOLD):
+        self.collection = collection
+        self.threshold = threshold
+        try:
+            self.collection.create_index([("bands", ASCENDING)])
+            self.collection.create_index([("textHash", ASCENDING)])
+        except Exception as e:
+            print(f"⚠️  Index job_signatures non créés: {e}")
+
+    def find(self, job_text: str) -> Optional[Dict[str, Any]]:
+        """
+        Offre déjà vue identique (document complet, "exact": True) ou quasi identique ("exact": False,
+        sans 'parsed' : seuls les embeddings sont réutilisables), sinon None.
+        """
+        metrics.incr("job_dedup.lookups")
+        normalized = normalize_job_text(job_text)
+        if not normalized:
+            return None
+        text_hash = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+        doc = self.collection.find_one({"textHash": text_hash})
+        if doc:
+            metrics.incr("job_dedup.hits")
+            metrics.incr("job_dedup.exact_hits")
+            return self._touch(doc, 1.0, exact=True)
+
+        signature = minhash(shingles(normalized))
+        best, best_score = None, 0.0
+        for candidate in self.collection.find({"bands": {"$in": band_keys(signature)}},
+                                              {"minhash": 1, "embeddings": 1}).limit(50):
+            score = estimated_jaccard(signature, candidate.get("minhash", []))
+            if score > best_score:
+                best, best_score = candidate, score
+        if best is None or best_score < self.threshold:
+            return None
+        metrics.incr("job_dedup.hits")
+        metrics.incr("job_dedup.near_hits")
+        return self._touch(best, best_score, exact=False)
+
+    def _touch(self, doc: Dict[str, Any], score: float, exact: bool) -> Dict[str, Any]:
+        self.collection.update_one({"_id": doc["_id"]}, {"$inc": {"hits": 1},
+                                                         "$set": {"lastHitAt": datetime.utcnow()}})
+        doc["similarity"] = round(score, 3)
+        doc["exact"] = exact
+        return doc
+
+    def remember(self, job_text: str, parsed: Dict[str, Any]) -> Optional[str]:
+        """Enregistre la signature et le parsing d'une nouvelle offre ; renvoie l'id de signature."""
+        normalized = normalize_job_text(job_text)
+        if not normalized:
+            return None
+        signature = minhash(shingles(normalized))
+        doc = {
+            "textHash": hashlib.sha256(normalized.encode("utf-8")).hexdigest(),
+            "minhash": signature,
+            "bands": band_keys(signature),
+            "parsed": parsed,
+            "embeddings": [],
+            "hits": 0,
+            "createdAt": datetime.utcnow(),
+        }
+        return str(self.collection.insert_one(doc).inserted_id)
+
+    def store_embeddings(self, signature_id: str, embeddings: Dict[str, List[float]]) -> None:
+        """Mémorise les embeddings des textes de l'offre (liste de paires : les textes ne sont pas des clés Mongo)."""
+        if not embeddings:
+            return
+        self.collection.update_one(
+            {"_id": ObjectId(signature_id)},
+            {"$set": {"embeddings": [{"text": t, "vector": v} for t, v in embeddings.items()]}},
+        )
+
+    @staticmethod
+    def stats() -> Dict[str, Any]:
+        counters = metrics.snapshot()["counters"]
+        lookups = counters.get("job_dedup.lookups", 0)
+        hits = counters.get("job_dedup.hits", 0)
+        return {"lookups": lookups, "hits": hits, "exact_hits": counters.get("job_dedup.exact_hits", 0),
+                "near_hits": counters.get("job_dedup.near_hits", 0),
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0}
@@ -0,0 +1,245 @@
+# job_queue.py - Tâches asynchrones (parse, match, quiz...)
+# - Mongo sert de file durable (collection "jobs") : une tâche survit à un redémarrage
+# - Pool de workers local, concurrence configurable par type de tâche
+# - Réservation atomique (find_one_and_update) + bail (lease) : une tâche bloquée est
+#   remise en file après expiration du bail, jusqu'à max_attempts tentatives
+# - Seules les erreurs transitoires (délai dépassé, service indisponible) sont retentées :
+#   une erreur déterministe échouerait à l'identique à chaque tentative
+
+import os
+import threading
+import traceback
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import ASCENDING, ReturnDocument
+
+# Handler: (payload, user_id) -> (réponse JSON, code HTTP)
+JobHandler = Callable[[Dict[str, Any], Optional[str]], Tuple[Dict[str, Any], int]]
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+# Codes HTTP renvoyés par un handler pour lesquels une nouvelle tentative a un sens
+RETRYABLE_STATUSES = {429, 502, 503, 504}
+
+_current = threading.local()
+
+
+def current_job_id() -> Optional[str]:
+    """Id de la tâche exécutée par le thread courant (None hors worker) : clé d'idempotence des effets de bord."""
+    return getattr(_current, "job_id", None)
+
+
+def _default_transient(error: BaseException) -> bool:
+    return isinstance(error, (TimeoutError, ConnectionError))
+
+
+def parse_concurrency(spec: str) -> Dict[str, int]:
+    """'parse_cv=2,match=2,quiz=1' -> {'parse_cv': 2, 'match': 2, 'quiz': 1}"""
+    out: Dict[str, int] = {}
+    for part in (spec or "").split(","):
+        if "=" in part:
+            name, n = part.split("=", 1)
+            try:
+                out[name.strip()] = max(1, int(n))
+            except ValueError:
+                continue
+    return out
+
+
+class JobQueue:
+    """File de tâches durable (Mongo) exécutée par des threads workers locaux."""
+
+    def __init__(
+        self,
+        collection,
+        concurrency: Optional[Dict[str, int]] = None,
+        lease_seconds: float = float(os.getenv("JOB_LEASE_SECONDS", 300)),
+        max_attempts: int = int(os.getenv("JOB_MAX_ATTEMPTS", 3)),
+        poll_interval: float = float(os.getenv("JOB_POLL_INTERVAL", 2.0)),
+        is_transient: Optional[Callable[[BaseException], bool]] = None,
+    ):
+        self.collection = collection
+        self.concurrency = concurrency if concurrency is not None else parse_concurrency(os.getenv("JOB_CONCURRENCY", ""))
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.is_transient = is_transient or _default_transient
+        self.worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._handlers: Dict[str, JobHandler] = {}
+        self._wakeups: Dict[str, threading.Event] = {}
+        self._threads = []
+        self._started = False
+        self._stop = threading.Event()
+        try:
+            self.collection.create_index([("type", ASCENDING), ("status", ASCENDING), ("runAt", ASCENDING)])
+            self.collection.create_index([("status", ASCENDING), ("leaseUntil", ASCENDING)])
+        except Exception as e:
+            print(f"⚠️  Index jobs non créés: {e}")
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+    def register(self, job_type: str, handler: JobHandler, concurrency: Optional[int] = None) -> None:
+        self._handlers[job_type] = handler
+        self._wakeups.setdefault(job_type, threading.Event())
+        if concurrency is not None:
+            self.concurrency.setdefault(job_type, concurrency)
+
+    def enqueue(self, job_type: str, payload: Dict[str, Any], user_id: Optional[str] = None) -> str:
+        if job_type not in self._handlers:
+            raise ValueError(f"Type de tâche inconnu: {job_type}")
+        now = datetime.utcnow()
+        doc = {
+            "type": job_type,
+            "user": ObjectId(user_id) if user_id else None,
+            "payload": payload,
+            "status": QUEUED,
+            "attempts": 0,
+            "runAt": now,
+            "createdAt": now,
+            "updatedAt": now,
+        }
+        job_id = self.collection.insert_one(doc).inserted_id
+        self._wakeups[job_type].set()
+        return str(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            return self.collection.find_one({"_id": ObjectId(job_id)})
+        except Exception:
+            return None
+
+    def start(self) -> None:
+        """Démarre les workers (une fois par processus) et le ré-enfileur de tâches bloquées."""
+        if self._started:
+            return
+        self._started = True
+        for job_type in self._handlers:
+            for i in range(self.concurrency.get(job_type, 1)):
+                t = threading.Thread(target=self._worker_loop, args=(job_type,),
+                                     name=f"job-{job_type}-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+        reaper = threading.Thread(target=self._reaper_loop, name="job-reaper", daemon=True)
+        reaper.start()
+        self._threads.append(reaper)
+        print(f"✅ Workers de tâches démarrés: "
+              f"{ {t: self.concurrency.get(t, 1) for t in self._handlers} }")
+
+    def stop(self) -> None:
+        self._stop.set()
+        for ev in self._wakeups.values():
+            ev.set()
+
+    # ------------------------------------------------------------------
+    # Workers
+    # ------------------------------------------------------------------
+    def _claim(self, job_type: str) -> Optional[Dict[str, Any]]:
+        now = datetime.utcnow()
+        return self.collection.find_one_and_update(
+            {"type": job_type, "status": QUEUED, "runAt": {"$lte": now}},
+            {"$set": {"status": RUNNING, "startedAt": now, "updatedAt": now, "worker": self.worker_id,
+                      "claim": uuid.uuid4().hex,
+                      "leaseUntil": now + timedelta(seconds=self.lease_seconds)},
+             "$inc": {"attempts": 1}},
+            sort=[("runAt", ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def _worker_loop(self, job_type: str) -> None:
+        wakeup = self._wakeups[job_type]
+        while not self._stop.is_set():
+            try:
+                job = self._claim(job_type)
+            except Exception as e:
+                print(f"⚠️  Réservation tâche {job_type} impossible: {e}")
+                job = None
+            if job is None:
+                wakeup.wait(self.poll_interval)
+                wakeup.clear()
+                continue
+            self._run(job)
+
+    def _run(self, job: Dict[str, Any]) -> None:
+        handler = self._handlers[job["type"]]
+        user_id = str(job["user"]) if job.get("user") else None
+        _current.job_id = str(job["_id"])
+        try:
+            result, status = handler(job.get("payload") or {}, user_id)
+        except Exception as e:
+            traceback.print_exc()
+            error = f"{type(e).__name__}: {e}"
+            if self.is_transient(e):
+                self._retry_or_fail(job, error)
+            else:
+                self._finish(job, FAILED, {"error": error}, 500, error)
+            return
+        finally:
+            _current.job_id = None
+        if status in RETRYABLE_STATUSES:
+            # Indisponibilité passagère (Gemini, quota...) : nouvelle tentative avec backoff
+            self._retry_or_fail(job, str((result or {}).get("error", f"HTTP {status}")), result)
+            return
+        self._finish(job, DONE if status < 400 else FAILED, result, status)
+
+    def _finish(self, job: Dict[str, Any], status: str, result: Optional[Dict[str, Any]], http_status: int,
+                error: Optional[str] = None) -> None:
+        now = datetime.utcnow()
+        update = {"status": status, "result": result, "httpStatus": http_status,
+                  "finishedAt": now, "updatedAt": now}
+        if error:
+            update["error"] = error
+        self.collection.update_one(
+            # Le jeton de réservation évite d'écraser une tâche reprise entre-temps par un autre worker
+            {"_id": job["_id"], "claim": job.get("claim")},
+            {"$set": update, "$unset": {"leaseUntil": ""}},
+        )
+
+    def _retry_or_fail(self, job: Dict[str, Any], error: str, result: Optional[Dict[str, Any]] = None) -> None:
+        now = datetime.utcnow()
+        if job.get("attempts", 0) < self.max_attempts:
+            # Backoff simple: 2^n secondes
+            run_at = now + timedelta(seconds=2 ** job.get("attempts", 0))
+            update = {"$set": {"status": QUEUED, "runAt": run_at, "error": error, "updatedAt": now},
+                      "$unset": {"leaseUntil": "", "worker": "", "claim": ""}}
+        else:
+            update = {"$set": {"status": FAILED, "error": error, "httpStatus": 500,
+                               "result": result or {"error": error}, "finishedAt": now, "updatedAt": now},
+                      "$unset": {"leaseUntil": ""}}
+        self.collection.update_one({"_id": job["_id"], "status": RUNNING, "claim": job.get("claim")}, update)
+
+    def _reaper_loop(self) -> None:
+        """Remet en file les tâches dont le bail a expiré (worker mort ou bloqué)."""
+        interval = max(5.0, min(60.0, self.lease_seconds / 2))
+        while not self._stop.wait(interval):
+            try:
+                now = datetime.utcnow()
+                for job in self.collection.find({"status": RUNNING, "leaseUntil": {"$lt": now}}):
+                    print(f"⏱️  Tâche {job['_id']} ({job['type']}) bloquée, nouvelle tentative")
+                    self._retry_or_fail(job, "Bail expiré (tâche bloquée)")
+                    if job["type"] in self._wakeups:
+                        self._wakeups[job["type"]].set()
+            except Exception as e:
+                print(f"⚠️  Reaper tâches: {e}")
+
+
+def serialize_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Vue JSON d'une tâche pour le polling client."""
+    out = {
+        "jobId": str(job["_id"]),
+        "type": job.get("type"),
+        "status": job.get("status"),
+        "attempts": job.get("attempts", 0),
+    }
+    for key in ("createdAt", "startedAt", "finishedAt"):
+        if isinstance(job.get(key), datetime):
+            out[key] = job[key].isoformat() + "Z"
+    if job.get("status") in (DONE, FAILED):
+        out["httpStatus"] = job.get("httpStatus")
+        out["result"] = job.get("result")
+    if job.get("error"):
+        out["error"] = job["error"]
+    return out
@@ -0,0 +1,523 @@
+# llm_gateway.py - Point d'entrée unique vers Gemini
+# - Configuration (clé API) faite une seule fois pour tout le processus
+# - Réutilisation des instances GenerativeModel, clé = (modèle, system_instruction, generation_config)
+# - Timeout par appel (par opération, surchargeable via GEMINI_TIMEOUT_<OPERATION>)
+# - Concurrence max et espacement minimal entre appels, réglables en un seul endroit
+# - Single-flight : les appels identiques simultanés (même modèle, même prompt, même config)
+#   partagent un seul appel Gemini ; optionnellement entre processus via Mongo
+# - Échéance par opération, requête de couverture (hedging) après le pXX de latence observé,
+#   disjoncteur (circuit breaker) : échec immédiat tant que Gemini est en panne
+# - Endpoint/transport configurables (GEMINI_API_ENDPOINT, GEMINI_TRANSPORT) : serveur LLM factice en local
+
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+
+import google.generativeai as genai
+from dotenv import load_dotenv
+from google.api_core import exceptions as google_exceptions
+from pymongo.errors import DuplicateKeyError
+
+import metrics
+from cache import BoundedCache
+
+load_dotenv()
+
+DEFAULT_TIMEOUT_S = float(os.getenv("GEMINI_TIMEOUT_S", 60))
+MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", 8))
+# Espacement minimal entre deux départs d'appels (remplace les time.sleep ad hoc)
+MIN_INTERVAL_S = float(os.getenv("GEMINI_MIN_INTERVAL_S", 0))
+
+_configured = False
+_config_lock = threading.Lock()
+_semaphore = threading.BoundedSemaphore(MAX_CONCURRENCY)
+# Appels abandonnés (échéance dépassée, requête de couverture gagnante) : leur requête HTTP court
+# jusqu'à son timeout ; ils passent sur ce budget séparé et libèrent leur créneau principal
+ORPHAN_MAX_CONCURRENCY = int(os.getenv("GEMINI_ORPHAN_MAX_CONCURRENCY", MAX_CONCURRENCY))
+_orphan_semaphore = threading.BoundedSemaphore(ORPHAN_MAX_CONCURRENCY)
+_pace_lock = threading.Lock()
+_last_call_at = 0.0
+
+# Single-flight (désactivable) ; en mode partagé, un résultat reste servi quelques secondes
+# aux requêtes identiques (tempêtes de retries) puis expire
+SINGLE_FLIGHT = os.getenv("LLM_SINGLE_FLIGHT", "1").lower() in ("1", "true", "yes")
+SHARED_RESULT_TTL_S = float(os.getenv("LLM_SINGLE_FLIGHT_TTL_S", 30))
+SHARED_POLL_S = 0.2
+
+# Échéances par défaut par opération (surchargées par GEMINI_TIMEOUT_<OPERATION>)
+OPERATION_TIMEOUTS_S = {
+    "chat": 30,
+    "parse_job": 45,
+    "parse_cv": 60,
+    "quiz_explain": 30,
+}
+
+# Hedging : 2e requête si la 1re dépasse le percentile GEMINI_HEDGE_PERCENTILE des latences récentes
+# de l'opération (0 = désactivé), uniquement pour les opérations listées
+HEDGE_PERCENTILE = float(os.getenv("GEMINI_HEDGE_PERCENTILE", 0))
+HEDGE_MIN_SAMPLES = int(os.getenv("GEMINI_HEDGE_MIN_SAMPLES", 20))
+HEDGE_OPERATIONS = {op.strip() for op in os.getenv("GEMINI_HEDGE_OPERATIONS", "parse_cv,parse_job,chat").split(",")
+                    if op.strip()}
+
+# Disjoncteur : ouvert après N échecs consécutifs (erreurs serveur, quotas, timeouts), réessai après un délai
+BREAKER_FAILURES = int(os.getenv("GEMINI_BREAKER_FAILURES", 5))
+BREAKER_RESET_S = float(os.getenv("GEMINI_BREAKER_RESET_S", 30))
+_TRANSIENT_ERRORS = (
+    google_exceptions.ServerError,
+    google_exceptions.TooManyRequests,
+    google_exceptions.RetryError,
+    TimeoutError,
+    ConnectionError,
+)
+
+# Les system_instruction du chat contiennent le contexte utilisateur : cache borné
+_models = BoundedCache("llm_models", max_size=int(os.getenv("GEMINI_MODEL_CACHE_SIZE", 64)))
+
+
+class CircuitOpenError(RuntimeError):
+    """Gemini est considéré indisponible : l'appel est refusé sans être tenté."""
+
+
+class DeadlineExceededError(TimeoutError):
+    """L'échéance de l'opération est dépassée (requêtes de couverture comprises)."""
+
+
+class CircuitBreaker:
+    """
+    Disjoncteur : fermé -> ouvert après failure_threshold échecs consécutifs ; ouvert -> semi-ouvert
+    après reset_timeout (un seul appel d'essai) ; l'essai referme ou rouvre le circuit.
+    """
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURES, reset_timeout: float = BREAKER_RESET_S):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self.state == "open":
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    metrics.incr("llm.breaker.rejected")
+                    raise CircuitOpenError("Gemini indisponible (circuit ouvert)")
+                self.state = "half_open"
+            if self.state == "half_open":
+                if self._probe_in_flight:
+                    metrics.incr("llm.breaker.rejected")
+                    raise CircuitOpenError("Gemini indisponible (appel d'essai en cours)")
+                self._probe_in_flight = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state, self.failures, self._probe_in_flight = "closed", 0, False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    metrics.incr("llm.breaker.opened")
+                    print(f"🔌 Circuit Gemini ouvert ({self.failures} échec(s) consécutif(s))")
+                self.state, self.opened_at = "open", time.monotonic()
+
+    def release_probe(self) -> None:
+        """Erreur non liée à la disponibilité (ex: requête invalide) : ni succès ni échec."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"state": self.state, "consecutive_failures": self.failures}
+
+
+breaker = CircuitBreaker()
+_hedge_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENCY * 2, thread_name_prefix="llm-hedge")
+
+
+def configure() -> None:
+    """Configure le SDK Gemini (idempotent, thread-safe)."""
+    global _configured
+    if _configured:
+        return
+    with _config_lock:
+        if not _configured:
+            kwargs: Dict[str, Any] = {"api_key": os.getenv("GOOGLE_API_KEY")}
+            endpoint = os.getenv("GEMINI_API_ENDPOINT")
+            if endpoint:
+                # Ex: http://localhost:8089 (serveur factice, cf. tools/) ; le transport REST accepte http://
+                kwargs["client_options"] = {"api_endpoint": endpoint}
+            if os.getenv("GEMINI_TRANSPORT"):
+                kwargs["transport"] = os.getenv("GEMINI_TRANSPORT")
+            genai.configure(**kwargs)
+            _configured = True
+
+
+def is_unavailable_error(error: BaseException) -> bool:
+    """Vrai pour les erreurs de disponibilité (circuit ouvert, échéance, erreurs serveur/quota)."""
+    return isinstance(error, (CircuitOpenError,) + _TRANSIENT_ERRORS)
+
+
+def health() -> Dict[str, Any]:
+    return {"breaker": breaker.stats(), "hedge_percentile": HEDGE_PERCENTILE or None}
+
+
+def _freeze(obj: Any) -> Optional[str]:
+    if obj is None:
+        return None
+    return json.dumps(obj, sort_keys=True, default=repr)
+
+
+def get_model(
+    model_name: str,
+    system_instruction: Optional[str] = None,
+    generation_config: Optional[Dict[str, Any]] = None,
+) -> genai.GenerativeModel:
+    """Renvoie une instance GenerativeModel partagée pour cette configuration."""
+    configure()
+    key = (model_name, system_instruction, _freeze(generation_config))
+    model = _models.get(key)
+    if model is None:
+        kwargs: Dict[str, Any] = {}
+        if system_instruction:
+            kwargs["system_instruction"] = system_instruction
+        if generation_config:
+            kwargs["generation_config"] = generation_config
+        model = genai.GenerativeModel(model_name, **kwargs)
+        _models.set(key, model)
+    return model
+
+
+def timeout_for(operation: Optional[str]) -> float:
+    """Échéance de l'opération : GEMINI_TIMEOUT_<OP>, sinon défaut de l'opération, sinon GEMINI_TIMEOUT_S."""
+    if operation:
+        env = os.getenv(f"GEMINI_TIMEOUT_{operation.upper()}")
+        if env:
+            return float(env)
+        if operation in OPERATION_TIMEOUTS_S:
+            return min(float(OPERATION_TIMEOUTS_S[operation]), DEFAULT_TIMEOUT_S)
+    return DEFAULT_TIMEOUT_S
+
+
+def hedge_delay(operation: Optional[str]) -> Optional[float]:
+    """Délai (s) avant la requête de couverture, ou None (désactivé / pas assez de mesures)."""
+    if HEDGE_PERCENTILE <= 0 or operation not in HEDGE_OPERATIONS:
+        return None
+    p = metrics.timing_percentile(f"llm.{operation}_ms", HEDGE_PERCENTILE, HEDGE_MIN_SAMPLES)
+    return p / 1000.0 if p is not None else None
+
+
+def _pace() -> None:
+    global _last_call_at
+    if MIN_INTERVAL_S <= 0:
+        return
+    with _pace_lock:
+        wait = _last_call_at + MIN_INTERVAL_S - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        _last_call_at = time.monotonic()
+
+
+class _Flight:
+    """Appel en cours partagé entre les requêtes identiques d'un même processus."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SharedResponse:
+    """Réponse relue depuis Mongo (single-flight inter-processus) : seul .text est disponible."""
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+_flights: Dict[str, _Flight] = {}
+_flights_lock = threading.Lock()
+_shared_flights = None
+
+
+def enable_shared_single_flight(collection) -> None:
+    """Active le single-flight inter-processus (collection Mongo dédiée, purge par TTL)."""
+    global _shared_flights
+    try:
+        collection.create_index("expiresAt", expireAfterSeconds=0)
+    except Exception as e:
+        print(f"⚠️  Index single-flight non créé: {e}")
+    _shared_flights = collection
+
+
+def request_key(model: genai.GenerativeModel, contents: Any, generation_config: Any = None) -> str:
+    """Empreinte d'un appel : modèle, system_instruction, configs et contenu du prompt."""
+    payload = [
+        getattr(model, "model_name", repr(model)),
+        repr(getattr(model, "_system_instruction", None)),
+        _freeze(getattr(model, "_generation_config", None)),
+        _freeze(generation_config),
+        _freeze(contents),
+    ]
+    return hashlib.sha256(json.dumps(payload).encode("utf-8")).hexdigest()
+
+
+def _wait_shared(key: str, timeout: float) -> Optional[str]:
+    """Attend le résultat d'un autre processus ; None s'il échoue, expire ou disparaît."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        doc = _shared_flights.find_one({"_id": key})
+        if not doc or doc.get("status") == "failed" or doc.get("expiresAt", datetime.utcnow()) < datetime.utcnow():
+            return None
+        if doc.get("status") == "done":
+            return doc.get("text")
+        time.sleep(SHARED_POLL_S)
+    return None
+
+
+def _shared_call(key: str, operation: Optional[str], call: Callable[[], Any], timeout: float) -> Any:
+    now = datetime.utcnow()
+    try:
+        _shared_flights.insert_one({"_id": key, "status": "running", "operation": operation,
+                                    "expiresAt": now + timedelta(seconds=timeout + SHARED_RESULT_TTL_S)})
+    except DuplicateKeyError:
+        text = _wait_shared(key, timeout)
+        if text is not None:
+            metrics.incr("llm.single_flight.shared_hits")
+            return SharedResponse(text)
+        return call()
+    except Exception as e:
+        print(f"⚠️  Single-flight partagé indisponible: {e}")
+        return call()
+
+    try:
+        response = call()
+    except Exception:
+        _shared_flights.update_one({"_id": key}, {"$set": {"status": "failed"}})
+        raise
+    try:
+        text = response.text
+    except ValueError:
+        text = None
+    if text is None:
+        _shared_flights.delete_one({"_id": key})
+    else:
+        _shared_flights.update_one({"_id": key}, {"$set": {
+            "status": "done", "text": text,
+            "expiresAt": datetime.utcnow() + timedelta(seconds=SHARED_RESULT_TTL_S)}})
+    return response
+
+
+def _single_flight(key: str, operation: Optional[str], call: Callable[[], Any], timeout: float) -> Any:
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+    if not leader:
+        metrics.incr("llm.single_flight.coalesced")
+        metrics.incr(f"llm.single_flight.coalesced.{operation or 'other'}")
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    try:
+        flight.result = _shared_call(key, operation, call, timeout) if _shared_flights is not None else call()
+        return flight.result
+    except BaseException as e:
+        flight.error = e
+        raise
+    finally:
+        with _flights_lock:
+            _flights.pop(key, None)
+        flight.done.set()
+
+
+class _Slot:
+    """
+    Créneau de concurrence d'un appel. Un appel abandonné bascule sur le budget des orphelins
+    (son créneau principal est rendu aux appels suivants) ; s'il n'a pas encore démarré, il n'est
+    jamais envoyé.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._held = None
+        self.abandoned = False
+
+    def acquire(self, deadline: float) -> None:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0 or not _semaphore.acquire(timeout=remaining):
+            raise DeadlineExceededError("Aucun créneau Gemini libre avant l'échéance")
+        with self._lock:
+            if self.abandoned:
+                _semaphore.release()
+                raise DeadlineExceededError("Appel abandonné avant son envoi")
+            self._held = _semaphore
+
+    def release(self) -> None:
+        with self._lock:
+            if self._held is not None:
+                self._held.release()
+                self._held = None
+
+    def abandon(self) -> None:
+        with self._lock:
+            self.abandoned = True
+            if self._held is _semaphore and _orphan_semaphore.acquire(blocking=False):
+                _semaphore.release()
+                self._held = _orphan_semaphore
+                metrics.incr("llm.orphaned")
+
+
+def _hedged(call: Callable[[float, _Slot], Any], operation: Optional[str], timeout: float) -> Any:
+    """
+    Exécute call(échéance, créneau) ; si la 1re requête dépasse le délai de couverture, une 2e
+    identique est lancée et la première réponse valide l'emporte. Les requêtes perdantes ou
+    encore en cours à l'échéance sont abandonnées (cf. _Slot).
+    """
+    deadline = time.monotonic() + timeout
+    delay = hedge_delay(operation)
+    if delay is None or delay >= timeout:
+        return call(deadline, _Slot())
+
+    slots = {}
+
+    def submit():
+        slot = _Slot()
+        future = _hedge_executor.submit(call, deadline, slot)
+        slots[future] = slot
+        return future
+
+    first = submit()
+    if not wait([first], timeout=delay).done:
+        metrics.incr("llm.hedge.fired")
+        submit()
+    pending = set(slots)
+    error: Optional[BaseException] = None
+    try:
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is not first:
+                        metrics.incr("llm.hedge.won")
+                    return future.result()
+                error = future.exception()
+    finally:
+        for future in pending:
+            slots[future].abandon()
+    if error is not None and not pending:
+        raise error
+    raise DeadlineExceededError(f"Échéance dépassée ({timeout:.0f}s) pour {operation or 'appel Gemini'}")
+
+
+def generate(
+    model: genai.GenerativeModel,
+    contents: Any,
+    *,
+    operation: Optional[str] = None,
+    timeout: Optional[float] = None,
+    generation_config: Any = None,
+    single_flight: bool = True,
+):
+    """
+    Appelle model.generate_content avec échéance, limite de concurrence, hedging et disjoncteur.
+    operation : nom logique de l'appel ("parse_cv", "parse_job", "quiz", "chat"...)
+    single_flight : les appels identiques simultanés partagent le même appel et son résultat
+    Lève CircuitOpenError sans appeler Gemini tant que le circuit est ouvert.
+    """
+    configure()
+    timeout = timeout if timeout is not None else timeout_for(operation)
+
+    def attempt(deadline: float, slot: _Slot):
+        slot.acquire(deadline)
+        try:
+            _pace()
+            # Timeout de la requête = temps restant avant l'échéance (attente du créneau déduite)
+            kwargs: Dict[str, Any] = {"request_options": {"timeout": max(0.1, deadline - time.monotonic())}}
+            if generation_config is not None:
+                kwargs["generation_config"] = generation_config
+            started = time.perf_counter()
+            response = model.generate_content(contents, **kwargs)
+        finally:
+            slot.release()
+        metrics.observe(f"llm.{operation or 'other'}_ms", (time.perf_counter() - started) * 1000)
+        return response
+
+    def call():
+        breaker.before_call()
+        try:
+            response = _hedged(attempt, operation, timeout)
+        except BaseException as e:
+            if is_unavailable_error(e):
+                breaker.record_failure()
+            else:
+                breaker.release_probe()
+            raise
+        breaker.record_success()
+        return response
+
+    if not (SINGLE_FLIGHT and single_flight):
+        return call()
+    return _single_flight(request_key(model, contents, generation_config), operation, call, timeout)
+
+
+def generate_stream(
+    model: genai.GenerativeModel,
+    contents: Any,
+    *,
+    operation: Optional[str] = None,
+    timeout: Optional[float] = None,
+    generation_config: Any = None,
+):
+    """
+    Variante streaming de generate() : itère sur les morceaux de texte au fil de la génération.
+    Le créneau de concurrence est conservé jusqu'à la fin (ou l'abandon) du flux ; sans créneau
+    libre avant l'échéance, lève DeadlineExceededError comme generate().
+    """
+    configure()
+    deadline = time.monotonic() + (timeout if timeout is not None else timeout_for(operation))
+    kwargs: Dict[str, Any] = {"stream": True}
+    if generation_config is not None:
+        kwargs["generation_config"] = generation_config
+    breaker.before_call()
+    slot = _Slot()
+    try:
+        slot.acquire(deadline)
+        try:
+            _pace()
+            # Timeout de la requête = temps restant avant l'échéance (attente du créneau déduite)
+            kwargs["request_options"] = {"timeout": max(0.1, deadline - time.monotonic())}
+            response = model.generate_content(contents, **kwargs)
+            for chunk in response:
+                try:
+                    text = chunk.text
+                except ValueError:
+                    # Morceau sans partie texte (ex: métadonnées / blocage de sécurité)
+                    continue
+                if text:
+                    yield text
+        finally:
+            slot.release()
+    except GeneratorExit:
+        breaker.release_probe()
+        raise
+    except BaseException as e:
+        if is_unavailable_error(e):
+            breaker.record_failure()
+        else:
+            breaker.release_probe()
+        raise
+    breaker.record_success()
@@ -0,0 +1,59 @@
+# metrics.py - Métriques applicatives en mémoire (compteurs + distributions de latence)
+# Exposées par /api/metrics avec les statistiques des caches.
+
+import threading
+from collections import deque
+from typing import Any, Dict
+
+_SAMPLE_SIZE = 1000
+
+_lock = threading.Lock()
+_counters: Dict[str, float] = {}
+_timings: Dict[str, deque] = {}
+
+
+def incr(name: str, value: float = 1) -> None:
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def observe(name: str, value_ms: float) -> None:
+    """Enregistre une mesure (ms) ; seules les _SAMPLE_SIZE dernières sont conservées."""
+    with _lock:
+        _timings.setdefault(name, deque(maxlen=_SAMPLE_SIZE)).append(float(value_ms))
+
+
+def percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[k]
+
+
+def timing_percentile(name: str, pct: float, min_samples: int = 1):
+    """Percentile des mesures récentes, ou None s'il n'y a pas assez d'échantillons."""
+    with _lock:
+        samples = list(_timings.get(name, ()))
+    if len(samples) < max(1, min_samples):
+        return None
+    return percentile(samples, pct)
+
+
+def snapshot() -> Dict[str, Any]:
+    with _lock:
+        counters = dict(_counters)
+        timings = {k: list(v) for k, v in _timings.items()}
+    return {
+        "counters": counters,
+        "timings_ms": {
+            name: {
+                "count": len(vals),
+                "avg": round(sum(vals) / len(vals), 2) if vals else 0.0,
+                "p50": round(percentile(vals, 50), 2),
+                "p95": round(percentile(vals, 95), 2),
+                "p99": round(percentile(vals, 99), 2),
+            }
+            for name, vals in timings.items()
+        },
+    }
@@ -2,8 +2,8 @@
 from datetime import datetime
 from bson import ObjectId
 
-def create_result(user_id, type, data, meta=None, refs=None):
-    return {
+def create_result(user_id, type, data, meta=None, refs=None, filters=None):
+    result = {
         "user": ObjectId(user_id),
         "type": type,  # "cv", "job", "matching", "quiz"
         "data": data,
@@ -11,3 +11,6 @@ def create_result(user_id, type, data, meta=None, refs=None):
         "refs": refs or {},
         "createdAt": datetime.utcnow()
     }
+    if filters is not None:
+        result["filters"] = filters  # champs typés indexés (cv_parsing/normalization.py)
+    return result
@@ -0,0 +1,155 @@
+# question_bank.py - Banque de questions de quiz réutilisables
+# Les questions validées sont stockées une fois (clé = hash du texte normalisé), indexées par
+# compétence canonique (skill_key, via la taxonomie : "k8s" et "Kubernetes" partagent leur stock)
+# et niveau : un quiz est d'abord assemblé depuis la banque (questions vérifiées en priorité),
+# Gemini ne sert qu'à compléter. Les questions récemment vues par un utilisateur sont exclues.
+
+import os
+from dataclasses import asdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+
+from quiz_module import QuizQuestion, is_placeholder_question, normalize_skill_area, question_hash
+from skill_taxonomy import taxonomy
+
+# En dessous de ce stock (par compétence et niveau), une recharge en arrière-plan est demandée
+MIN_STOCK = int(os.getenv("QUIZ_BANK_MIN_STOCK", 10))
+# Nombre de questions vues (les plus récentes) exclues des tirages : borne la taille du $nin
+SEEN_WINDOW = int(os.getenv("QUIZ_SEEN_WINDOW", 500))
+
+
+def skill_key(skill: str) -> str:
+    """Clé de stock d'une compétence : forme canonique de la taxonomie si connue, puis normalisée."""
+    return normalize_skill_area(taxonomy.canonical(str(skill or "")) or skill)
+
+
+class QuestionBank:
+    """Questions validées (collection "question_bank") + historique des questions vues par utilisateur."""
+
+    def __init__(self, collection, seen_collection):
+        self.collection = collection
+        self.seen = seen_collection
+        try:
+            self.collection.create_index([("hash", ASCENDING)], unique=True)
+            self.collection.create_index([("skill_key", ASCENDING), ("difficulty", ASCENDING)])
+            self.seen.create_index([("user", ASCENDING), ("hash", ASCENDING)], unique=True)
+            self.seen.create_index([("user", ASCENDING), ("seenAt", DESCENDING)])
+        except Exception as e:
+            print(f"⚠️  Index banque de questions non créés: {e}")
+
+    def add(self, questions: Iterable[QuizQuestion], level: str) -> int:
+        """Ajoute les questions absentes de la banque ; renvoie le nombre de nouvelles questions."""
+        now = datetime.utcnow()
+        ops = [
+            UpdateOne(
+                {"hash": question_hash(q)},
+                {"$setOnInsert": {
+                    "hash": question_hash(q),
+                    "skill_key": skill_key(q.skill_area),
+                    "difficulty": level,
+                    "question": asdict(q),
+                    "verified": False,
+                    "createdAt": now,
+                }},
+                upsert=True,
+            )
+            for q in questions
+            if not is_placeholder_question(q)
+        ]
+        if not ops:
+            return 0
+        return self.collection.bulk_write(ops, ordered=False).upserted_count
+
+    def update_verified(self, questions: Iterable[QuizQuestion]) -> None:
+        """Reporte les réponses/explications vérifiées (quiz_verify) sur les questions de la banque."""
+        ops = [
+            UpdateOne(
+                {"hash": question_hash(q)},
+                {"$set": {"question.correct_answer": q.correct_answer,
+                          "question.explanation": q.explanation,
+                          "verified": True}},
+            )
+            for q in questions
+        ]
+        if ops:
+            self.collection.bulk_write(ops, ordered=False)
+
+    def draw(self, skills: List[str], level: str, count: int,
+             exclude_hashes: Optional[Set[str]] = None) -> List[QuizQuestion]:
+        """
+        Tire jusqu'à `count` questions du niveau demandé, réparties à tour de rôle entre les
+        compétences (dans l'ordre de `skills`), en excluant les hash déjà vus. Les questions
+        vérifiées (quiz_verify) passent avant les autres.
+        """
+        exclude = list(exclude_hashes or [])
+        pools: List[List[dict]] = []
+        for key in _unique_keys(skills):
+            verified = self._sample(key, level, exclude, count, True)
+            others = self._sample(key, level, exclude, count - len(verified), False) if len(verified) < count else []
+            # Les pools sont consommés par la fin : vérifiées en dernier dans la liste
+            pools.append(others + verified)
+
+        drawn: List[QuizQuestion] = []
+        taken: Set[str] = set()
+        while len(drawn) < count and any(pools):
+            for pool in pools:
+                while pool:
+                    doc = pool.pop()
+                    if doc["hash"] in taken:
+                        continue
+                    taken.add(doc["hash"])
+                    question = QuizQuestion(**doc["question"])
+                    # Placeholders stockés avant leur filtrage à l'ajout
+                    if not is_placeholder_question(question):
+                        drawn.append(question)
+                        break
+                if len(drawn) >= count:
+                    break
+        return drawn
+
+    def _sample(self, key: str, level: str, exclude: List[str], size: int, verified: bool) -> List[dict]:
+        return list(self.collection.aggregate([
+            {"$match": {"skill_key": key, "difficulty": level, "hash": {"$nin": exclude},
+                        "verified": True if verified else {"$ne": True}}},
+            {"$sample": {"size": size}},
+        ]))
+
+    def low_stock(self, skills: List[str], level: str, min_stock: int = MIN_STOCK) -> List[str]:
+        """Compétences (clés normalisées) dont le stock au niveau donné est inférieur à min_stock."""
+        return [
+            key for key in _unique_keys(skills)
+            if self.collection.count_documents({"skill_key": key, "difficulty": level}, limit=min_stock) < min_stock
+        ]
+
+    def seen_hashes(self, user_id, limit: int = SEEN_WINDOW) -> Set[str]:
+        """Hash des `limit` questions vues le plus récemment (les plus anciennes peuvent revenir)."""
+        cursor = self.seen.find({"user": ObjectId(user_id)}, {"hash": 1}).sort("seenAt", DESCENDING).limit(limit)
+        return {d["hash"] for d in cursor}
+
+    def mark_seen(self, user_id, questions: Iterable[QuizQuestion]) -> None:
+        now = datetime.utcnow()
+        ops = [
+            UpdateOne({"user": ObjectId(user_id), "hash": question_hash(q)},
+                      {"$set": {"seenAt": now}}, upsert=True)
+            for q in questions
+        ]
+        if ops:
+            self.seen.bulk_write(ops, ordered=False)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "questions": self.collection.estimated_document_count(),
+            "verified": self.collection.count_documents({"verified": True}),
+        }
+
+
+def _unique_keys(skills: List[str]) -> List[str]:
+    keys: List[str] = []
+    for s in skills or []:
+        key = skill_key(s)
+        if key and key not in keys:
+            keys.append(key)
+    return keys
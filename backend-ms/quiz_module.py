@@ -10,18 +10,21 @@ from __future__ import annotations
 import os
 import re
 import json
+import hashlib
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Dict, List, Literal, Optional, Any
+from typing import Dict, Iterator, List, Literal, Optional, Any, Union
 
 import google.generativeai as genai
-from dotenv import load_dotenv
+
+import llm_gateway
+from cache import BoundedCache
 
 # ======================================================================
-# Configuration Gemini
+# Configuration Gemini (centralisée dans llm_gateway)
 # ======================================================================
-load_dotenv()
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
 
 DEFAULT_GENERATION_CONFIG = {
     "temperature": 0.6,
@@ -30,8 +33,31 @@ DEFAULT_GENERATION_CONFIG = {
     "max_output_tokens": 2048,
 }
 
+# Vérification groupée : nb de questions par appel (borné par max_output_tokens) et appels parallèles max
+VERIFY_BATCH_SIZE = int(os.getenv("QUIZ_VERIFY_BATCH_SIZE", 8))
+VERIFY_MAX_PARALLEL = int(os.getenv("QUIZ_VERIFY_MAX_PARALLEL", 3))
+# Explications détaillées : nb de questions par appel, appels parallèles max et cache (question, réponse donnée, correct ?)
+EXPLAIN_BATCH_SIZE = int(os.getenv("QUIZ_EXPLAIN_BATCH_SIZE", 8))
+EXPLAIN_MAX_PARALLEL = int(os.getenv("QUIZ_EXPLAIN_MAX_PARALLEL", 3))
+_explanations = BoundedCache("quiz_explanations", max_size=int(os.getenv("QUIZ_EXPLAIN_CACHE_SIZE", 2048)))
+# Gros quiz : découpage par compétence ciblée (évite la troncature à max_output_tokens)
+CHUNK_THRESHOLD = int(os.getenv("QUIZ_CHUNK_THRESHOLD", 10))
+CHUNK_SIZE = int(os.getenv("QUIZ_CHUNK_SIZE", 6))
+CHUNK_MAX_PARALLEL = int(os.getenv("QUIZ_CHUNK_MAX_PARALLEL", 4))
+# Tours de complément si les lots fusionnés (doublons retirés) ne suffisent pas
+CHUNK_TOPUP_ROUNDS = int(os.getenv("QUIZ_CHUNK_TOPUP_ROUNDS", 2))
+# Angle propre à chaque lot : des lots de même compétence ne reçoivent pas le même prompt
+_CHUNK_ANGLES = [
+    "concepts fondamentaux et définitions",
+    "mise en pratique sur des cas concrets",
+    "bonnes pratiques et erreurs courantes",
+    "outils, bibliothèques et écosystème",
+    "débogage, performance et optimisation",
+    "sécurité, tests et qualité",
+]
+
 # Modèle par défaut (utilisé si aucun modèle n'est injecté)
-_default_model = genai.GenerativeModel(
+_default_model = llm_gateway.get_model(
     "gemini-1.5-flash",
     generation_config=DEFAULT_GENERATION_CONFIG,
 )
@@ -106,6 +132,24 @@ def _unique_preserve_order(seq: List[str]) -> List[str]:
             seen.add(x)
     return out
 
+def normalize_skill_area(skill: str) -> str:
+    """Clé de compétence : minuscules, sans accents, espaces réduits ("  Docker " -> "docker")."""
+    s = unicodedata.normalize("NFKD", str(skill or "")).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"\s+", " ", s).strip().lower()
+
+def question_hash(q: QuizQuestion) -> str:
+    """Identifiant stable d'une question (texte normalisé), indépendant de l'ordre de génération."""
+    text = re.sub(r"\W+", " ", normalize_skill_area(q.question)).strip()
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+_PADDED_OPTION_RE = re.compile(r"^Option \d$")
+
+def is_placeholder_question(q: QuizQuestion) -> bool:
+    """Question complétée par défaut (texte absent, placeholder, options manquantes) : à ne pas réutiliser."""
+    text = (q.question or "").strip()
+    return (text in ("", "Question") or text.startswith("Placeholder")
+            or any(_PADDED_OPTION_RE.match(str(o)) for o in q.options))
+
 def _safe_json_extract(text: str) -> dict:
     """
     Tente d'extraire un JSON valide à partir d'un texte (gère les fences, le blabla autour).
@@ -220,14 +264,83 @@ def _build_quiz_from_json(quiz_data: Dict[str, Any], level: str) -> Quiz:
         estimated_duration=est,
     )
 
+class _QuestionStreamParser:
+    """
+    Parseur JSON incrémental : détecte chaque élément complet du tableau "questions"
+    au fil des morceaux d'une réponse Gemini en streaming (fences et texte parasite tolérés).
+    """
+
+    def __init__(self):
+        self.text = ""
+        self._pos = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_key: Optional[str] = None
+        self._array_depth: Optional[int] = None   # profondeur du tableau "questions" une fois ouvert
+        self._array_done = False
+        self._item_start: Optional[int] = None
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Ajoute un morceau de texte et renvoie les questions (dict) complétées par ce morceau."""
+        self.text += chunk
+        t = self.text
+        found: List[Dict[str, Any]] = []
+        for i in range(self._pos, len(t)):
+            c = t[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if len(self._stack) == 1:
+                        self._last_key = t[self._string_start + 1:i]
+                continue
+            if c == '"':
+                self._in_string = True
+                self._string_start = i
+            elif c == "[":
+                if (self._array_depth is None and not self._array_done
+                        and self._stack == ["{"] and self._last_key == "questions"):
+                    self._array_depth = 2
+                self._stack.append(c)
+            elif c == "{":
+                if self._array_depth is not None and len(self._stack) == self._array_depth:
+                    self._item_start = i
+                self._stack.append(c)
+            elif c in "}]":
+                if self._stack:
+                    self._stack.pop()
+                if self._array_depth is None:
+                    continue
+                if c == "}" and self._item_start is not None and len(self._stack) == self._array_depth:
+                    try:
+                        found.append(json.loads(t[self._item_start:i + 1]))
+                    except json.JSONDecodeError:
+                        pass
+                    self._item_start = None
+                elif c == "]" and len(self._stack) == self._array_depth - 1:
+                    self._array_depth = None
+                    self._array_done = True
+        self._pos = len(t)
+        return found
+
 # ======================================================================
 # Générateur de quiz
 # ======================================================================
 class QuizGenerator:
-    """Générateur de quiz basé sur profil JSON (CV parsé) et compétences ciblées."""
+    """
+    Générateur de quiz basé sur profil JSON (CV parsé) et compétences ciblées.
+    question_bank (optionnel, cf. question_bank.QuestionBank) : les questions sont d'abord
+    tirées de la banque, Gemini ne génère que les questions manquantes (ajoutées ensuite à la banque).
+    """
 
-    def __init__(self, model: Optional[genai.GenerativeModel] = None):
+    def __init__(self, model: Optional[genai.GenerativeModel] = None, question_bank=None):
         self.model = model or _default_model
+        self.question_bank = question_bank
 
     def create_prompt_from_profile(
         self,
@@ -311,14 +424,196 @@ FORMAT JSON EXACT À PRODUIRE (ne mets aucun commentaire):
         """Extrait le JSON de la réponse (robuste)."""
         return _safe_json_extract(response_text)
 
+    def _bank_skills(self, user_profile: Dict[str, Any], focus_skills: Optional[List[str]]) -> List[str]:
+        skills = list(focus_skills or []) + list(user_profile.get("skills", []) or [])
+        return [s for s in skills if isinstance(s, str) and s.strip()]
+
+    def _draw_from_bank(
+        self,
+        user_profile: Dict[str, Any],
+        level: str,
+        num_questions: int,
+        focus_skills: Optional[List[str]],
+        exclude_hashes: Optional[set],
+    ) -> List[QuizQuestion]:
+        if not self.question_bank:
+            return []
+        try:
+            drawn = self.question_bank.draw(self._bank_skills(user_profile, focus_skills), level,
+                                            num_questions, exclude_hashes)
+            print(f"🏦 Banque de questions: {len(drawn)}/{num_questions} question(s) disponibles")
+            return drawn
+        except Exception as e:
+            print(f"⚠️  Banque de questions indisponible: {e}")
+            return []
+
+    def _store_in_bank(self, questions: List[QuizQuestion], level: str) -> None:
+        # Les placeholders (réponse Gemini incomplète) ne doivent jamais être resservis
+        questions = [q for q in questions or [] if not is_placeholder_question(q)]
+        if not self.question_bank or not questions:
+            return
+        try:
+            self.question_bank.add(questions, level)
+        except Exception as e:
+            print(f"⚠️  Ajout à la banque de questions impossible: {e}")
+
+    def _assemble_quiz(self, user_profile: Dict[str, Any], level: str, questions: List[QuizQuestion]) -> Quiz:
+        return Quiz(
+            title=f"Quiz {level.title()} - Évaluation Technique",
+            description=f"Quiz adapté au profil de {user_profile.get('name', 'Candidat')}",
+            level=level,
+            questions=questions,
+            estimated_duration=int(len(questions) * 1.5),
+        )
+
     def generate_quiz(
         self,
         user_profile: Dict[str, Any],
         level: Literal["débutant", "intermédiaire", "avancé"],
         num_questions: int = 10,
         focus_skills: Optional[List[str]] = None,
+        exclude_hashes: Optional[set] = None,
+        chunked: Optional[bool] = None,
     ) -> Optional[Quiz]:
-        """Génère un quiz depuis le profil JSON + focus_skills éventuels."""
+        """
+        Génère un quiz depuis le profil JSON + focus_skills éventuels.
+        Banque de questions d'abord (hors exclude_hashes : questions déjà vues), Gemini pour compléter
+        (par lots parallèles au-delà de CHUNK_THRESHOLD questions, ou si chunked=True).
+        """
+        level = _norm_level(level)
+        banked = self._draw_from_bank(user_profile, level, num_questions, focus_skills, exclude_hashes)
+        if len(banked) >= num_questions:
+            return self._assemble_quiz(user_profile, level, banked[:num_questions])
+
+        quiz = self._generate_with_llm(user_profile, level, num_questions - len(banked), focus_skills, chunked)
+        if not quiz:
+            # Gemini indisponible : quiz dégradé avec les seules questions de la banque
+            return self._assemble_quiz(user_profile, level, banked) if banked else None
+        self._store_in_bank(quiz.questions, level)
+        known = {question_hash(q) for q in banked}
+        quiz.questions = banked + [q for q in quiz.questions if question_hash(q) not in known]
+        quiz.estimated_duration = max(quiz.estimated_duration, int(len(quiz.questions) * 1.5))
+        return quiz
+
+    def refill_bank(self, skills: List[str], level: str, per_skill: int = 5) -> int:
+        """Recharge la banque (tâche de fond) : génère per_skill questions par compétence en rupture."""
+        if not self.question_bank:
+            return 0
+        level = _norm_level(level)
+        added = 0
+        for skill in self.question_bank.low_stock(skills, level):
+            quiz = self._generate_with_llm({"name": "Candidat", "skills": [skill]}, level, per_skill, [skill])
+            if quiz:
+                added += self.question_bank.add(quiz.questions, level)
+        print(f"🏦 Recharge de la banque ({level}): {added} nouvelle(s) question(s)")
+        return added
+
+    @staticmethod
+    def _plan_chunks(num_questions: int, focus_skills: Optional[List[str]]) -> List[tuple]:
+        """
+        Découpe N questions en lots (compétences, nb) de CHUNK_SIZE max : répartition à tour de rôle
+        entre les compétences ciblées, une compétence par lot ; sans compétence, lots sans focus.
+        """
+        def split(n: int) -> List[int]:
+            parts = -(-n // CHUNK_SIZE)
+            return [n // parts + (1 if i < n % parts else 0) for i in range(parts)] if n > 0 else []
+
+        skills = [s for s in (focus_skills or []) if isinstance(s, str) and s.strip()]
+        if not skills:
+            return [(None, n) for n in split(num_questions)]
+        chunks = []
+        for i, skill in enumerate(skills):
+            n = num_questions // len(skills) + (1 if i < num_questions % len(skills) else 0)
+            chunks.extend(([skill], size) for size in split(n))
+        return chunks
+
+    def _chunk_prompt(self, user_profile: Dict[str, Any], level: str, num_questions: int,
+                      focus_skills: Optional[List[str]], index: int, total: int,
+                      avoid: Optional[List[str]] = None) -> str:
+        """Prompt d'un lot : numéro de lot, angle propre et questions déjà obtenues à ne pas répéter."""
+        prompt = self.create_prompt_from_profile(user_profile, level, num_questions, focus_skills)
+        block = (f"\n\nLOT {index + 1}/{total} — ANGLE IMPOSÉ : {_CHUNK_ANGLES[index % len(_CHUNK_ANGLES)]}."
+                 f"\nLes autres lots couvrent d'autres angles : ne t'en écarte pas.")
+        if avoid:
+            block += "\nQUESTIONS DÉJÀ POSÉES (n'en reprends aucune, même reformulée) :\n" + "\n".join(
+                f"- {q}" for q in avoid[-30:])
+        return prompt + block
+
+    def _generate_chunk(self, prompt: str, level: str, num_questions: int,
+                        focus_skills: Optional[List[str]]) -> List[QuizQuestion]:
+        """Un appel Gemini pour un lot ; renvoie les questions validées (liste vide en cas d'échec)."""
+        try:
+            # Chaque lot est un appel distinct : pas de partage de résultat entre lots (single-flight)
+            response = llm_gateway.generate(self.model, prompt, operation="quiz", single_flight=False)
+            quiz_data = self.extract_json_from_response((response.text or "").strip())
+        except Exception as e:
+            print(f"⚠️  Lot de quiz {focus_skills or ''} en échec: {e}")
+            return []
+        return [_validate_and_fix_question(q, level) for q in (quiz_data.get("questions") or [])[:num_questions]]
+
+    def _run_chunks(self, user_profile: Dict[str, Any], level: str, chunks: List[tuple], first_index: int,
+                    total: int, avoid: List[str]) -> List[List[QuizQuestion]]:
+        prompts = [self._chunk_prompt(user_profile, level, n, skills, first_index + i, total, avoid)
+                   for i, (skills, n) in enumerate(chunks)]
+        with ThreadPoolExecutor(max_workers=min(CHUNK_MAX_PARALLEL, len(chunks))) as pool:
+            return list(pool.map(lambda c: self._generate_chunk(c[0], level, c[1][1], c[1][0]),
+                                 zip(prompts, chunks)))
+
+    def _generate_chunked(self, user_profile: Dict[str, Any], level: str, num_questions: int,
+                          focus_skills: Optional[List[str]]) -> Optional[Quiz]:
+        """
+        Gros quiz : lots générés en parallèle (CHUNK_MAX_PARALLEL max), fusionnés à tour de rôle,
+        dédoublonnés par texte de question normalisé et tronqués à num_questions. S'il manque des
+        questions après dédoublonnage, des lots de complément sont demandés (CHUNK_TOPUP_ROUNDS max).
+        """
+        chunks = self._plan_chunks(num_questions, focus_skills)
+        print(f"📡 Génération du quiz ({num_questions} q) niveau {level} en {len(chunks)} lot(s) parallèles"
+              f" pour {user_profile.get('name', 'Candidat')}...")
+        questions: List[QuizQuestion] = []
+        seen = set()
+        index = 0
+        for round_ in range(CHUNK_TOPUP_ROUNDS + 1):
+            if round_:
+                chunks = self._plan_chunks(num_questions - len(questions), focus_skills)
+                print(f"🔁 Complément du quiz: {num_questions - len(questions)} question(s) manquante(s)")
+            results = self._run_chunks(user_profile, level, chunks, index, index + len(chunks),
+                                       [q.question for q in questions])
+            index += len(chunks)
+
+            # Fusion à tour de rôle entre lots (alternance des compétences), sans doublons
+            before = len(questions)
+            for rank in range(max(len(r) for r in results)):
+                for chunk_questions in results:
+                    if rank < len(chunk_questions):
+                        h = question_hash(chunk_questions[rank])
+                        if h not in seen:
+                            seen.add(h)
+                            questions.append(chunk_questions[rank])
+            if len(questions) >= num_questions or len(questions) == before:
+                break
+        if not questions:
+            print("❌ Erreur génération quiz: aucun lot n'a abouti")
+            return None
+        quiz = self._assemble_quiz(user_profile, level, questions[:num_questions])
+        print(f"✅ Quiz créé: {len(quiz.questions)} question(s) ({index} lot(s))")
+        return quiz
+
+    def _generate_with_llm(
+        self,
+        user_profile: Dict[str, Any],
+        level: str,
+        num_questions: int,
+        focus_skills: Optional[List[str]] = None,
+        chunked: Optional[bool] = None,
+    ) -> Optional[Quiz]:
+        """
+        Génère toutes les questions avec Gemini (sans banque).
+        chunked : génération par lots parallèles (par défaut au-delà de CHUNK_THRESHOLD questions).
+        """
+        if chunked is None:
+            chunked = num_questions > CHUNK_THRESHOLD
+        if chunked:
+            return self._generate_chunked(user_profile, _norm_level(level), num_questions, focus_skills)
         try:
             level = _norm_level(level)
             prompt = self.create_prompt_from_profile(
@@ -332,7 +627,7 @@ FORMAT JSON EXACT À PRODUIRE (ne mets aucun commentaire):
                   f"{' | focus=' + ','.join(focus_skills) if focus_skills else ''}"
                   f" pour {user_profile.get('name', 'Candidat')}...")
 
-            response = self.model.generate_content(prompt)
+            response = llm_gateway.generate(self.model, prompt, operation="quiz")
             raw_text = (response.text or "").strip()
             quiz_data = self.extract_json_from_response(raw_text)
             quiz = _build_quiz_from_json(quiz_data, level)
@@ -343,6 +638,84 @@ FORMAT JSON EXACT À PRODUIRE (ne mets aucun commentaire):
             print(f"❌ Erreur génération quiz: {str(e)}")
             return None
 
+    def generate_quiz_stream(
+        self,
+        user_profile: Dict[str, Any],
+        level: Literal["débutant", "intermédiaire", "avancé"],
+        num_questions: int = 10,
+        focus_skills: Optional[List[str]] = None,
+        exclude_hashes: Optional[set] = None,
+    ) -> Iterator[Union[QuizQuestion, Quiz]]:
+        """
+        Génération en streaming : produit d'abord les questions disponibles en banque, puis chaque
+        QuizQuestion validée dès que Gemini l'a écrite, et, en dernier élément, le Quiz complet
+        (titre, description, durée, questions).
+        Lève une exception si la génération échoue avant la moindre question.
+        """
+        level = _norm_level(level)
+        banked = self._draw_from_bank(user_profile, level, num_questions, focus_skills, exclude_hashes)
+        for q in banked[:num_questions]:
+            yield q
+        if len(banked) >= num_questions:
+            yield self._assemble_quiz(user_profile, level, banked[:num_questions])
+            return
+
+        missing = num_questions - len(banked)
+        prompt = self.create_prompt_from_profile(
+            user_profile=user_profile,
+            level=level,
+            num_questions=missing,
+            focus_skills=focus_skills,
+        )
+        print(f"📡 Génération streaming du quiz ({missing} q) niveau {level}"
+              f" pour {user_profile.get('name', 'Candidat')}...")
+
+        parser = _QuestionStreamParser()
+        questions: List[QuizQuestion] = []
+        # Questions déjà envoyées (banque comprise) : un doublon écrit par Gemini est ignoré avant l'envoi
+        known = {question_hash(q) for q in banked}
+        try:
+            for chunk in llm_gateway.generate_stream(self.model, prompt, operation="quiz"):
+                for raw in parser.feed(chunk):
+                    if len(questions) >= missing:
+                        break
+                    q = _validate_and_fix_question(raw, level)
+                    if question_hash(q) in known:
+                        continue
+                    known.add(question_hash(q))
+                    questions.append(q)
+                    yield q
+        except Exception as e:
+            # Gemini indisponible : quiz dégradé avec les seules questions déjà obtenues (banque)
+            if not (banked or questions) or not llm_gateway.is_unavailable_error(e):
+                raise
+            print(f"⚠️  Gemini indisponible, quiz partiel ({len(banked) + len(questions)} question(s)): {e}")
+            self._store_in_bank(questions, level)
+            yield self._assemble_quiz(user_profile, level, banked + questions)
+            return
+
+        # Métadonnées (et rattrapage si le découpage incrémental n'a rien trouvé)
+        try:
+            quiz_data = self.extract_json_from_response(parser.text)
+        except Exception:
+            quiz_data = {}
+        if not questions:
+            for raw in quiz_data.get("questions") or []:
+                if len(questions) >= missing:
+                    break
+                q = _validate_and_fix_question(raw, level)
+                if question_hash(q) in known:
+                    continue
+                known.add(question_hash(q))
+                questions.append(q)
+                yield q
+        self._store_in_bank(questions, level)
+        quiz = _build_quiz_from_json({**quiz_data, "questions": []}, level)
+        quiz.questions = (banked + questions) or quiz.questions
+        quiz.estimated_duration = max(quiz.estimated_duration, int(len(quiz.questions) * 1.5))
+        print(f"✅ Quiz (streaming) créé: {len(quiz.questions)} question(s)")
+        yield quiz
+
 # ======================================================================
 # Évaluateur de quiz
 # ======================================================================
@@ -352,10 +725,9 @@ class QuizEvaluator:
     def __init__(self, model: Optional[genai.GenerativeModel] = None):
         self.model = model or _default_model
 
-    def _verify_question_json(self, txt: str) -> dict:
-        """Extrait un JSON pour la vérification de réponse."""
-        data = _safe_json_extract(txt)
-        # Normalisation minimale des champs attendus
+    @staticmethod
+    def _normalize_verification(data: dict) -> dict:
+        """Normalisation minimale des champs attendus d'une vérification."""
         return {
             "is_correct_answer_valid": bool(data.get("is_correct_answer_valid", True)),
             "correct_answer_index": int(data.get("correct_answer_index", 0)),
@@ -365,6 +737,23 @@ class QuizEvaluator:
             "verification_details": str(data.get("verification_details", "")),
         }
 
+    @staticmethod
+    def _fallback_verification(question: QuizQuestion, details: str) -> dict:
+        """Vérification neutre : on conserve la question telle quelle."""
+        return {
+            "is_correct_answer_valid": True,
+            "correct_answer_index": question.correct_answer,
+            "correct_option_text": question.options[question.correct_answer]
+            if 0 <= question.correct_answer < len(question.options) else "",
+            "explanation_is_valid": True,
+            "corrected_explanation": question.explanation,
+            "verification_details": details,
+        }
+
+    def _verify_question_json(self, txt: str) -> dict:
+        """Extrait un JSON pour la vérification de réponse."""
+        return self._normalize_verification(_safe_json_extract(txt))
+
     def verify_question_with_gemini(self, question: QuizQuestion) -> dict:
         """Vérifie une question (cohérence de la réponse & explication)."""
         prompt = f"""
@@ -393,23 +782,183 @@ FORMAT JSON:
 """.strip()
 
         try:
-            resp = self.model.generate_content(prompt)
+            resp = llm_gateway.generate(self.model, prompt, operation="quiz_verify")
             return self._verify_question_json(resp.text or "")
         except Exception as e:
             print(f"⚠️  Erreur vérification Gemini: {e}")
             # Fallback: on conserve la question telle quelle
-            return {
-                "is_correct_answer_valid": True,
-                "correct_answer_index": question.correct_answer,
-                "correct_option_text": question.options[question.correct_answer]
-                if 0 <= question.correct_answer < len(question.options) else "",
-                "explanation_is_valid": True,
-                "corrected_explanation": question.explanation,
-                "verification_details": "Vérification échouée, valeurs originales conservées",
-            }
+            return self._fallback_verification(question, "Vérification échouée, valeurs originales conservées")
+
+    def _verify_chunk(self, questions: List[QuizQuestion], offset: int) -> Dict[int, dict]:
+        """Un seul appel Gemini pour un lot de questions ; renvoie {index global: vérification}."""
+        blocks = []
+        for i, q in enumerate(questions):
+            marked = q.options[q.correct_answer] if 0 <= q.correct_answer < len(q.options) else ""
+            blocks.append(
+                f"[{offset + i}] Question: {q.question}\n"
+                f"    Options: {q.options}\n"
+                f"    Index marqué correct: {q.correct_answer} ({marked})\n"
+                f"    Explication: {q.explanation}"
+            )
+        prompt = f"""
+Vérifie la cohérence de chacune de ces questions de quiz (réponds UNIQUEMENT en JSON valide):
+
+{chr(10).join(blocks)}
+
+INSTRUCTIONS DE VÉRIFICATION (pour CHAQUE question, identifiée par son index [n]):
+- Calcule la vraie réponse correcte (index 0..3).
+- Compare avec l'index fourni.
+- Indique si l'explication est cohérente, sinon propose une version corrigée et concise.
+
+FORMAT JSON (un élément par question, dans l'ordre):
+{{
+  "verifications": [
+    {{
+      "index": {offset},
+      "is_correct_answer_valid": true,
+      "correct_answer_index": 0,
+      "correct_option_text": "texte de la bonne réponse",
+      "explanation_is_valid": true,
+      "corrected_explanation": "explication corrigée si nécessaire",
+      "verification_details": "brefs détails de vérification"
+    }}
+  ]
+}}
+""".strip()
+        resp = llm_gateway.generate(self.model, prompt, operation="quiz_verify")
+        data = _safe_json_extract(resp.text or "")
+        out: Dict[int, dict] = {}
+        for entry in data.get("verifications", []) or []:
+            try:
+                idx = int(entry.get("index"))
+                if offset <= idx < offset + len(questions) and idx not in out:
+                    out[idx] = self._normalize_verification(entry)
+            except Exception:
+                continue
+        return out
+
+    def verify_questions_batch(self, questions: List[QuizQuestion]) -> List[dict]:
+        """
+        Vérifie toutes les questions en un minimum d'appels : lots de VERIFY_BATCH_SIZE questions,
+        exécutés en parallèle (VERIFY_MAX_PARALLEL max). Toute entrée manquante ou invalide
+        retombe sur la réponse d'origine.
+        """
+        if not questions:
+            return []
+        chunks = [(questions[i:i + VERIFY_BATCH_SIZE], i) for i in range(0, len(questions), VERIFY_BATCH_SIZE)]
+
+        def run(chunk):
+            try:
+                return self._verify_chunk(*chunk)
+            except Exception as e:
+                print(f"⚠️  Erreur vérification groupée Gemini: {e}")
+                return {}
+
+        if len(chunks) == 1:
+            results = [run(chunks[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=min(VERIFY_MAX_PARALLEL, len(chunks))) as pool:
+                results = list(pool.map(run, chunks))
+        verified: Dict[int, dict] = {}
+        for r in results:
+            verified.update(r)
+        return [
+            verified.get(i) or self._fallback_verification(q, "Vérification absente, valeurs originales conservées")
+            for i, q in enumerate(questions)
+        ]
+
+    @staticmethod
+    def _explanation_key(question: QuizQuestion, user_answer_index: int, is_correct: bool) -> tuple:
+        return (question_hash(question), int(user_answer_index), bool(is_correct))
+
+    def _explain_chunk(self, items: List[tuple], offset: int) -> Dict[int, str]:
+        """Un seul appel Gemini pour un lot (question, réponse, correct ?) ; renvoie {index global: explication}."""
+        blocks = []
+        for i, (q, user_index, is_correct) in enumerate(items):
+            user_answer = q.options[user_index] if 0 <= user_index < len(q.options) else "Aucune réponse"
+            blocks.append(
+                f"[{offset + i}] Question: {q.question}\n"
+                f"    Réponse de l'utilisateur: {user_answer}\n"
+                f"    Réponse correcte: {q.options[q.correct_answer]}\n"
+                f"    Résultat: {'Correct' if is_correct else 'Incorrect'}"
+            )
+        prompt = f"""
+Génère une explication pédagogique en FRANÇAIS pour CHACUNE de ces questions (réponds UNIQUEMENT en JSON valide).
+- Courte (2-4 phrases), bienveillante, actionable.
+
+{chr(10).join(blocks)}
+
+FORMAT JSON (un élément par question, identifiée par son index [n]):
+{{
+  "explanations": [
+    {{"index": {offset}, "explanation": "explication en texte brut"}}
+  ]
+}}
+""".strip()
+        resp = llm_gateway.generate(self.model, prompt, operation="quiz_explain")
+        data = _safe_json_extract(resp.text or "")
+        out: Dict[int, str] = {}
+        for entry in data.get("explanations", []) or []:
+            try:
+                idx = int(entry.get("index"))
+                text = str(entry.get("explanation", "")).strip()
+                if offset <= idx < offset + len(items) and text and idx not in out:
+                    out[idx] = text
+            except Exception:
+                continue
+        return out
+
+    def generate_detailed_explanations(self, questions: List[QuizQuestion], answers: List[UserAnswer]) -> List[str]:
+        """
+        Explications détaillées de toutes les questions en un minimum d'appels.
+        Mémoïsées par (hash de la question, réponse donnée, correct ?) : seules les combinaisons
+        jamais vues partent vers Gemini, par lots de EXPLAIN_BATCH_SIZE exécutés en parallèle
+        (EXPLAIN_MAX_PARALLEL max).
+        Une explication absente retombe sur l'explication d'origine de la question.
+        """
+        items = [(q, a.selected_option, a.is_correct) for q, a in zip(questions, answers)]
+        explanations: List[Optional[str]] = [_explanations.get(self._explanation_key(*it)) for it in items]
+        # Une seule demande par combinaison distincte non cachée
+        pending: Dict[tuple, List[int]] = {}
+        for i, it in enumerate(items):
+            if explanations[i] is None:
+                pending.setdefault(self._explanation_key(*it), []).append(i)
+
+        if pending:
+            keys = list(pending)
+            todo = [items[pending[k][0]] for k in keys]
+            chunks = [(todo[i:i + EXPLAIN_BATCH_SIZE], i) for i in range(0, len(todo), EXPLAIN_BATCH_SIZE)]
+
+            def run(chunk):
+                try:
+                    return self._explain_chunk(*chunk)
+                except Exception as e:
+                    print(f"⚠️  Erreur explications groupées Gemini: {e}")
+                    return {}
+
+            if len(chunks) == 1:
+                results = [run(chunks[0])]
+            else:
+                with ThreadPoolExecutor(max_workers=min(EXPLAIN_MAX_PARALLEL, len(chunks))) as pool:
+                    results = list(pool.map(run, chunks))
+            generated: Dict[int, str] = {}
+            for r in results:
+                generated.update(r)
+            for j, key in enumerate(keys):
+                text = generated.get(j)
+                if text:
+                    _explanations.set(key, text)
+                for i in pending[key]:
+                    explanations[i] = text
+
+        return [text or q.explanation for text, q in zip(explanations, questions)]
 
     def generate_detailed_explanation(self, question: QuizQuestion, user_answer_index: int, is_correct: bool) -> str:
-        """Génère une explication pédagogique simple."""
+        """Génère une explication pédagogique simple (mémoïsée, cf. generate_detailed_explanations)."""
+        key = self._explanation_key(question, user_answer_index, is_correct)
+        cached = _explanations.get(key)
+        if cached is not None:
+            return cached
         user_answer = (
             question.options[user_answer_index] if 0 <= user_answer_index < len(question.options) else "Aucune réponse"
         )
@@ -428,24 +977,20 @@ Format de sortie: une explication en texte brut (pas de JSON).
 """.strip()
 
         try:
-            resp = self.model.generate_content(prompt)
-            return (resp.text or "").strip() or question.explanation
+            resp = llm_gateway.generate(self.model, prompt, operation="quiz_explain")
+            text = (resp.text or "").strip()
         except Exception:
             return question.explanation
+        if not text:
+            return question.explanation
+        _explanations.set(key, text)
+        return text
 
     @staticmethod
-    def evaluate_answers(quiz: Quiz, user_answers: Dict[int, int]) -> QuizResults:
-        """Évalue les réponses de l'utilisateur, avec vérification/correction automatique."""
-        evaluator = QuizEvaluator()
-        results: List[UserAnswer] = []
-        score = 0
+    def apply_verifications(questions: List[QuizQuestion], verifications: List[dict]) -> int:
+        """Applique les corrections (bonne réponse / explication) ; renvoie le nombre de réponses corrigées."""
         corrections_made = 0
-
-        print("🔎 Vérification des questions avec Gemini...")
-
-        for i, question in enumerate(quiz.questions):
-            # Vérification/correction
-            verification = evaluator.verify_question_with_gemini(question)
+        for i, (question, verification) in enumerate(zip(questions, verifications)):
             if not verification.get("is_correct_answer_valid", True):
                 new_idx = int(verification.get("correct_answer_index", question.correct_answer))
                 if 0 <= new_idx < len(question.options):
@@ -457,7 +1002,31 @@ Format de sortie: une explication en texte brut (pas de JSON).
                     corrected = verification.get("corrected_explanation", "").strip()
                     if corrected:
                         question.explanation = corrected
+        return corrections_made
+
+    @staticmethod
+    def evaluate_answers(
+        quiz: Quiz,
+        user_answers: Dict[int, int],
+        evaluator: Optional["QuizEvaluator"] = None,
+        verify: bool = True,
+    ) -> QuizResults:
+        """
+        Évalue les réponses de l'utilisateur.
+        verify=True : vérification/correction automatique préalable (questions vérifiées en lot,
+        cf. verify_questions_batch). verify=False : comparaison locale pure (quiz déjà vérifié).
+        """
+        results: List[UserAnswer] = []
+        score = 0
+        corrections_made = 0
 
+        if verify:
+            evaluator = evaluator or _get_default_evaluator()
+            print("🔎 Vérification des questions avec Gemini...")
+            verifications = evaluator.verify_questions_batch(quiz.questions)
+            corrections_made = QuizEvaluator.apply_verifications(quiz.questions, verifications)
+
+        for i, question in enumerate(quiz.questions):
             # Évaluation de la réponse utilisateur
             user_answer_index = int(user_answers.get(i, -1))
             is_correct = (user_answer_index == question.correct_answer)
@@ -488,6 +1057,7 @@ Format de sortie: une explication en texte brut (pas de JSON).
         print(f"Score: {results.score}/{results.total_questions} ({results.percentage:.1f}%)")
         print("=" * 80)
 
+        explanations = self.generate_detailed_explanations(quiz.questions, results.user_answers)
         for i, (question, result) in enumerate(zip(quiz.questions, results.user_answers)):
             print(f"\n Question {i+1}: {question.question}")
             for j, option in enumerate(question.options):
@@ -505,10 +1075,18 @@ Format de sortie: une explication en texte brut (pas de JSON).
                 print(f"❌ Votre réponse: {ua}")
                 print(f"✅ Réponse correcte: {question.options[question.correct_answer]}")
 
-            detailed = self.generate_detailed_explanation(question, result.selected_option, result.is_correct)
-            print(detailed)
+            print(explanations[i])
             print("-" * 60)
 
+_default_evaluator: Optional[QuizEvaluator] = None
+
+def _get_default_evaluator() -> QuizEvaluator:
+    """Évaluateur partagé (modèle par défaut), créé une seule fois."""
+    global _default_evaluator
+    if _default_evaluator is None:
+        _default_evaluator = QuizEvaluator()
+    return _default_evaluator
+
 # ======================================================================
 # Utilitaires d'affichage/sauvegarde (facultatifs pour votre backend)
 # ======================================================================
@@ -533,17 +1111,13 @@ def display_quiz(quiz: Optional[Quiz]):
         print(f"💡 {question.explanation}")
         print("-" * 40)
 
-def save_quiz_to_json(quiz: Optional[Quiz], filename: str) -> bool:
-    """Sauvegarde un quiz au format JSON (utilitaire)."""
-    if not quiz:
-        return False
-
-    quiz_dict = {
+def quiz_to_dict(quiz: Quiz) -> Dict[str, Any]:
+    """Sérialise un quiz (format JSON/Mongo)."""
+    return {
         "title": quiz.title,
         "description": quiz.description,
         "level": quiz.level,
         "estimated_duration": quiz.estimated_duration,
-        "generated_at": datetime.now().isoformat(),
         "questions": [
             {
                 "question": q.question,
@@ -557,6 +1131,23 @@ def save_quiz_to_json(quiz: Optional[Quiz], filename: str) -> bool:
         ],
     }
 
+def quiz_from_dict(data: Dict[str, Any]) -> Quiz:
+    """Reconstruit un quiz sérialisé par quiz_to_dict (questions déjà validées)."""
+    return Quiz(
+        title=data.get("title", ""),
+        description=data.get("description", ""),
+        level=data.get("level", "intermédiaire"),
+        estimated_duration=int(data.get("estimated_duration", 15)),
+        questions=[QuizQuestion(**q) for q in data.get("questions", [])],
+    )
+
+def save_quiz_to_json(quiz: Optional[Quiz], filename: str) -> bool:
+    """Sauvegarde un quiz au format JSON (utilitaire)."""
+    if not quiz:
+        return False
+
+    quiz_dict = {**quiz_to_dict(quiz), "generated_at": datetime.now().isoformat()}
+
     with open(filename, "w", encoding="utf-8") as f:
         json.dump(quiz_dict, f, ensure_ascii=False, indent=2)
     return True
@@ -0,0 +1,152 @@
+# quiz_store.py - Stockage serveur des quiz générés
+# Un quiz est enregistré avec un id dès sa génération ; la vérification Gemini des réponses
+# est faite une seule fois en arrière-plan, et l'évaluation devient une comparaison locale.
+# Les quiz pré-générés (prefetch après parsing du CV) sont prêts à servir, un par niveau récemment
+# utilisé, pour les seuls utilisateurs actifs et dans la limite d'un quota quotidien.
+
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import DuplicateKeyError
+
+from quiz_module import Quiz, normalize_skill_area, quiz_from_dict, quiz_to_dict
+
+# Quiz pré-générés : nombre max prêts par utilisateur (inférieur aux 3 niveaux) et durée de validité
+PREFETCH_MAX_PER_USER = int(os.getenv("QUIZ_PREFETCH_MAX_PER_USER", 2))
+PREFETCH_TTL_HOURS = float(os.getenv("QUIZ_PREFETCH_TTL_HOURS", 24))
+# Quiz pré-générés par utilisateur et par jour (appels Gemini spéculatifs)
+PREFETCH_DAILY_QUOTA = int(os.getenv("QUIZ_PREFETCH_DAILY_QUOTA", 3))
+# Seuls les utilisateurs ayant fait un quiz dans cette fenêtre bénéficient du prefetch
+PREFETCH_ACTIVE_DAYS = float(os.getenv("QUIZ_PREFETCH_ACTIVE_DAYS", 14))
+
+
+class QuizStore:
+    """Quiz persistés dans Mongo (collection "quizzes")."""
+
+    def __init__(self, collection):
+        self.collection = collection
+        try:
+            self.collection.create_index([("user", ASCENDING), ("createdAt", DESCENDING)])
+        except Exception as e:
+            print(f"⚠️  Index quizzes non créé: {e}")
+
+    def save(self, user_id, quiz: Quiz, meta: Optional[Dict[str, Any]] = None) -> str:
+        now = datetime.utcnow()
+        doc = {
+            "user": ObjectId(user_id),
+            "quiz": quiz_to_dict(quiz),
+            "verified": False,
+            "verification": {"status": "pending"},
+            "meta": meta or {},
+            "createdAt": now,
+            "updatedAt": now,
+        }
+        return str(self.collection.insert_one(doc).inserted_id)
+
+    def recent_levels(self, user_id, days: float = PREFETCH_ACTIVE_DAYS) -> List[str]:
+        """Niveaux des quiz faits ces `days` derniers jours, du plus récent au plus ancien (vide : inactif)."""
+        since = datetime.utcnow() - timedelta(days=days)
+        cursor = self.collection.find({"user": ObjectId(user_id), "createdAt": {"$gte": since}},
+                                      {"meta.level": 1}).sort("createdAt", DESCENDING).limit(50)
+        return list(dict.fromkeys(d["meta"]["level"] for d in cursor if (d.get("meta") or {}).get("level")))
+
+    def load(self, quiz_id, user_id=None) -> Optional[Tuple[Quiz, Dict[str, Any]]]:
+        """Renvoie (Quiz, document) ou None (id invalide, inconnu ou appartenant à un autre utilisateur)."""
+        try:
+            query: Dict[str, Any] = {"_id": ObjectId(quiz_id)}
+            if user_id:
+                query["user"] = ObjectId(user_id)
+        except Exception:
+            return None
+        doc = self.collection.find_one(query)
+        if not doc:
+            return None
+        return quiz_from_dict(doc["quiz"]), doc
+
+    def mark_verified(self, quiz_id, quiz: Quiz, corrections: int) -> None:
+        """Enregistre les réponses/explications corrigées après vérification."""
+        now = datetime.utcnow()
+        self.collection.update_one(
+            {"_id": ObjectId(quiz_id)},
+            {"$set": {"quiz": quiz_to_dict(quiz), "verified": True, "updatedAt": now,
+                      "verification": {"status": "done", "corrections": corrections, "verifiedAt": now}}},
+        )
+
+
+def skills_key(focus_skills: List[str]) -> str:
+    """Empreinte des compétences ciblées : un quiz pré-généré n'est servi que pour le même CV/profil."""
+    return "|".join(sorted({normalize_skill_area(s) for s in focus_skills or [] if s}))
+
+
+class QuizPrefetchStore:
+    """
+    Quiz pré-générés prêts à servir (collection "quiz_prefetch"), au plus un par (utilisateur, niveau)
+    et PREFETCH_MAX_PER_USER par utilisateur. Un quiz servi est retiré (consommation atomique).
+    Les générations sont décomptées par jour (collection "quiz_prefetch_quota").
+    """
+
+    def __init__(self, collection, quota_collection, max_per_user: int = PREFETCH_MAX_PER_USER,
+                 daily_quota: int = PREFETCH_DAILY_QUOTA):
+        self.collection = collection
+        self.quota = quota_collection
+        self.max_per_user = max_per_user
+        self.daily_quota = daily_quota
+        try:
+            self.collection.create_index([("user", ASCENDING), ("level", ASCENDING)], unique=True)
+            self.collection.create_index("expiresAt", expireAfterSeconds=0)
+            self.quota.create_index([("user", ASCENDING), ("day", ASCENDING)], unique=True)
+            self.quota.create_index("expiresAt", expireAfterSeconds=0)
+        except Exception as e:
+            print(f"⚠️  Index quiz_prefetch non créés: {e}")
+
+    def has_room(self, user_id, level: str, key: str) -> bool:
+        """Vrai si un quiz peut être pré-généré pour ce niveau (absent ou périmé, et cap non atteint)."""
+        uid = ObjectId(user_id)
+        if self.collection.count_documents({"user": uid, "level": level, "skillsKey": key}, limit=1):
+            return False
+        others = self.collection.count_documents({"user": uid, "level": {"$ne": level}})
+        return others < self.max_per_user
+
+    def consume_quota(self, user_id) -> bool:
+        """Réserve une génération sur le quota du jour ; False si le quota est épuisé."""
+        if self.daily_quota <= 0:
+            return False
+        now = datetime.utcnow()
+        try:
+            self.quota.update_one(
+                {"user": ObjectId(user_id), "day": now.strftime("%Y-%m-%d"), "count": {"$lt": self.daily_quota}},
+                {"$inc": {"count": 1}, "$setOnInsert": {"expiresAt": now + timedelta(days=2)}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            # Document du jour déjà au quota : l'upsert tente une insertion en doublon
+            return False
+        return True
+
+    def discard_stale(self, user_id, key: str) -> int:
+        """Supprime les quiz pré-générés sur d'autres compétences (nouveau CV)."""
+        return self.collection.delete_many({"user": ObjectId(user_id), "skillsKey": {"$ne": key}}).deleted_count
+
+    def put(self, user_id, level: str, key: str, quiz: Quiz) -> None:
+        now = datetime.utcnow()
+        self.collection.update_one(
+            {"user": ObjectId(user_id), "level": level},
+            {"$set": {"skillsKey": key, "count": len(quiz.questions), "quiz": quiz_to_dict(quiz),
+                      "createdAt": now, "expiresAt": now + timedelta(hours=PREFETCH_TTL_HOURS)}},
+            upsert=True,
+        )
+
+    def take(self, user_id, level: str, key: str, count: int) -> Optional[Quiz]:
+        """Retire et renvoie un quiz pré-généré compatible (au moins `count` questions), tronqué à `count`."""
+        doc = self.collection.find_one_and_delete(
+            {"user": ObjectId(user_id), "level": level, "skillsKey": key, "count": {"$gte": count}}
+        )
+        if not doc:
+            return None
+        quiz = quiz_from_dict(doc["quiz"])
+        quiz.questions = quiz.questions[:count]
+        quiz.estimated_duration = int(len(quiz.questions) * 1.5)
+        return quiz
@@ -0,0 +1,184 @@
+# skill_taxonomy.py - Taxonomie des compétences + automate Aho-Corasick
+# Les compétences (forme canonique + variantes) sont chargées depuis data/skill_taxonomy.json et
+# compilées une fois en automate : un texte brut de CV/offre ou une liste de compétences est
+# analysé en un seul passage linéaire, quel que soit le nombre de variantes. Sert au pré-parsing
+# local des CV, aux mots-clés manquants du matching et aux recommandations (certifications, projets).
+
+import bisect
+import json
+import os
+import re
+import unicodedata
+from collections import deque
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_PATH = os.getenv("SKILL_TAXONOMY_PATH",
+                         os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "skill_taxonomy.json"))
+
+_SPACES_RE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=4096)
+def _fold_char(c: str) -> str:
+    """Minuscule sans accent, toujours un seul caractère (les positions restent alignées)."""
+    low = c.lower()[:1] or c
+    base = unicodedata.normalize("NFKD", low)[:1]
+    return base if base.isascii() else low
+
+
+def fold(text: str) -> str:
+    """Forme de comparaison : minuscules, sans accents, blancs consécutifs réduits à un espace."""
+    return _SPACES_RE.sub(" ", "".join(_fold_char(c) for c in text or "")).strip()
+
+
+def _is_word(c: str) -> bool:
+    return c.isalnum() or c == "_"
+
+
+class _Automaton:
+    """Automate Aho-Corasick (transitions, liens d'échec, sorties = (longueur, compétence))."""
+
+    def __init__(self, patterns: Dict[str, str]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.out: List[List[Tuple[int, str]]] = [[]]
+        for pattern, skill in patterns.items():
+            state = 0
+            for c in pattern:
+                nxt = self.goto[state].get(c)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][c] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                state = nxt
+            self.out[state].append((len(pattern), skill))
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for c, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and c not in self.goto[f]:
+                    f = self.fail[f]
+                target = self.goto[f].get(c, 0)
+                self.fail[nxt] = target if target != nxt else 0
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def scan(self, text: str) -> Iterable[Tuple[int, int, str]]:
+        """Toutes les occurrences (début, fin, compétence), y compris chevauchantes."""
+        state = 0
+        goto, fail, out = self.goto, self.fail, self.out
+        for i, c in enumerate(text):
+            while state and c not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(c, 0)
+            for length, skill in out[state]:
+                yield i - length + 1, i + 1, skill
+
+
+class SkillTaxonomy:
+    """Compétences canoniques, variantes, catégories et recommandations associées."""
+
+    def __init__(self, entries: List[Dict[str, Any]]):
+        self.skills: Dict[str, Dict[str, Any]] = {}
+        self._aliases: Dict[str, str] = {}
+        for entry in entries:
+            name = entry["name"]
+            self.skills[name] = entry
+            for variant in [name] + list(entry.get("aliases", [])):
+                key = fold(variant)
+                if key:
+                    self._aliases.setdefault(key, name)
+        self._automaton = _Automaton(self._aliases)
+
+    @classmethod
+    def from_file(cls, path: str = DEFAULT_PATH) -> "SkillTaxonomy":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f)["skills"])
+
+    # ------------------------------------------------------------------
+    # Recherche
+    # ------------------------------------------------------------------
+    def _matches(self, folded: str) -> List[Tuple[int, int, str]]:
+        """
+        Occurrences délimitées (pas de lettre/chiffre autour ; ni "." / "+" / "#" avant, ni "+" / "#"
+        après, pour C++, C#, .NET), en gardant la plus longue à gauche ("Spring Boot" plutôt que "Spring").
+        """
+        hits = []
+        for start, end, skill in self._automaton.scan(folded):
+            before = folded[start - 1] if start > 0 else " "
+            after = folded[end] if end < len(folded) else " "
+            if _is_word(before) or before in ".+#" or _is_word(after) or after in "+#":
+                continue
+            hits.append((start, end, skill))
+        hits.sort(key=lambda h: (h[0], h[0] - h[1]))
+        kept, last_end = [], 0
+        for start, end, skill in hits:
+            if start >= last_end:
+                kept.append((start, end, skill))
+                last_end = end
+        return kept
+
+    def extract(self, text: str) -> List[str]:
+        """Compétences canoniques citées dans un texte libre (ordre d'apparition, sans doublon)."""
+        return list(dict.fromkeys(skill for _, _, skill in self._matches(fold(text))))
+
+    def extract_each(self, items: List[Any]) -> List[List[str]]:
+        """Compétences canoniques de chaque élément d'une liste, en un seul passage sur la liste jointe."""
+        folded = [fold(str(item)) for item in items]
+        starts, pos = [], 0
+        for f in folded:
+            starts.append(pos)
+            pos += len(f) + 1
+        found: List[List[str]] = [[] for _ in items]
+        for start, _, skill in self._matches("\n".join(folded)):
+            i = bisect.bisect_right(starts, start) - 1
+            if skill not in found[i]:
+                found[i].append(skill)
+        return found
+
+    def canonical(self, name: str) -> Optional[str]:
+        """Forme canonique d'un nom de compétence exact ("k8s" -> "Kubernetes"), sinon None."""
+        return self._aliases.get(fold(name))
+
+    # ------------------------------------------------------------------
+    # Données associées
+    # ------------------------------------------------------------------
+    def _inherited(self, skill: str, key: str) -> Any:
+        seen = set()
+        while skill and skill not in seen:
+            seen.add(skill)
+            entry = self.skills.get(skill) or {}
+            if entry.get(key):
+                return entry[key]
+            skill = entry.get("parent")
+        return None
+
+    def certifications(self, skill: str) -> List[Dict[str, str]]:
+        return list(self._inherited(skill, "certifications") or [])
+
+    def project(self, skill: str) -> Optional[str]:
+        return self._inherited(skill, "project")
+
+    def missing_skills(self, required: List[Any], have: List[Any], have_text: str = "") -> List[Any]:
+        """
+        Compétences requises absentes des compétences disponibles (et du texte brut `have_text`,
+        par exemple le CV complet). Une compétence hors taxonomie est comparée telle quelle.
+        """
+        have_canon = {s for found in self.extract_each(have) for s in found} | set(self.extract(have_text))
+        have_raw = {fold(str(s)) for s in have}
+        missing = []
+        for skill, found in zip(required, self.extract_each(required)):
+            if found:
+                if not any(s in have_canon for s in found):
+                    missing.append(skill)
+            elif fold(str(skill)) not in have_raw:
+                missing.append(skill)
+        return missing
+
+
+taxonomy = SkillTaxonomy.from_file()
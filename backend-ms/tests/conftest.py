@@ -0,0 +1,5 @@
+# Les modules du backend sont importés à plat (comme depuis apps.py)
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
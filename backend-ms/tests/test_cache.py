@@ -0,0 +1,40 @@
+import time
+
+from cache import BoundedCache, all_cache_stats
+
+
+def test_lru_eviction_keeps_recently_used():
+    cache = BoundedCache("test_lru", max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1          # "a" devient la plus récente
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_expiry():
+    cache = BoundedCache("test_ttl", max_size=4, ttl_seconds=0.05)
+    cache.set("k", "v")
+    assert cache.get("k") == "v"
+    time.sleep(0.06)
+    assert cache.get("k", "absent") == "absent"
+    assert len(cache) == 0
+
+
+def test_get_or_compute_and_stats():
+    cache = BoundedCache("test_compute", max_size=4)
+    calls = []
+    compute = lambda: calls.append(1) or "valeur"
+    assert cache.get_or_compute("k", compute) == cache.get_or_compute("k", compute) == "valeur"
+    assert len(calls) == 1
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+    assert any(s["name"] == "test_compute" for s in all_cache_stats())
+
+
+def test_cached_none_is_a_hit():
+    cache = BoundedCache("test_none", max_size=4)
+    cache.set("k", None)
+    assert cache.get_or_compute("k", lambda: "recalculé") is None
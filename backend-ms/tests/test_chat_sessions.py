@@ -0,0 +1,37 @@
+import pytest
+
+pytest.importorskip("google.generativeai")
+pytest.importorskip("pymongo")
+
+from chat_sessions import ChatSessionStore
+
+
+class FakeCollection:
+    def __init__(self):
+        self.inserted = []
+
+    def create_index(self, *args, **kwargs):
+        pass
+
+    def insert_one(self, doc):
+        self.inserted.append(doc)
+        return type("Result", (), {"inserted_id": "id"})()
+
+    def find_one(self, query):
+        raise AssertionError("aucune lecture attendue")
+
+
+def test_anonymous_sessions_are_not_persisted_nor_readable():
+    store = ChatSessionStore(FakeCollection())
+    session = store.create(None, "Instruction", "", [{"role": "user", "content": "Bonjour"}])
+    assert session["_id"] is None and store.collection.inserted == []
+    assert store.get("65f000000000000000000000", None) is None
+
+
+def test_window_keeps_latest_turns_within_budget():
+    store = ChatSessionStore(FakeCollection())
+    history = [{"role": r, "content": "x" * 400} for r in ("user", "assistant") * 10]
+    session = store.create(None, "Instruction", "", history)
+    contents = store.window(session, "Question ?", budget=500)
+    assert contents[0]["role"] == "user" and contents[-1]["parts"] == ["Question ?"]
+    assert len(contents) < len(history)
@@ -0,0 +1,45 @@
+from cv_parsing.compaction import compact_cv_text
+
+
+def pages(*texts):
+    return "\n\f".join(texts)
+
+
+def test_repeated_header_and_page_footer_removed():
+    text = pages(
+        "Jean Dupont - Développeur\nExpérience\nDéveloppeur chez A\nJean Dupont - CV - Page 1/3",
+        "Jean Dupont - Développeur\nDéveloppeur chez B\nMissions variées\nJean Dupont - CV - Page 2/3",
+        "Jean Dupont - Développeur\nFormation\nMaster informatique\nJean Dupont - CV - Page 3/3",
+    )
+    compacted, stats = compact_cv_text(text)
+    assert compacted.count("Jean Dupont - Développeur") == 1
+    assert compacted.count("Jean Dupont - CV") == 1
+    assert "Développeur chez B" in compacted and "Master informatique" in compacted
+    assert stats["repeated_lines_removed"] == 2
+
+
+def test_repeated_dates_in_body_are_kept():
+    text = pages(
+        "Jean Dupont\nDéveloppeur chez A\n2019 - 2021\nDéveloppeur chez B\n2019 - 2021\nLyon",
+        "Jean Dupont\nChef de projet chez C\n2019 - 2021\nRéférences\nParis",
+        "Jean Dupont\nFormation\n2019 - 2021\nMaster\nMarseille",
+    )
+    compacted, _ = compact_cv_text(text)
+    assert compacted.count("2019 - 2021") == 4
+    assert compacted.count("Jean Dupont") == 1
+
+
+def test_no_page_breaks_keeps_every_line():
+    text = "\n".join(["Développeur", "2018 - 2020", "Développeur", "2018 - 2020", "Développeur", "2018 - 2020"])
+    compacted, _ = compact_cv_text(text)
+    assert compacted.count("2018 - 2020") == 3
+
+
+def test_page_numbers_separators_and_blank_lines():
+    compacted, _ = compact_cv_text("Profil\n\n\n\n-----\nPage 1 sur 2\n• Python  •  SQL\n")
+    assert compacted == "Profil\n\nPython | SQL"
+
+
+def test_hard_token_cap():
+    compacted, stats = compact_cv_text("ligne de texte\n" * 200, max_tokens=50)
+    assert len(compacted) <= 200 and stats["truncated"]
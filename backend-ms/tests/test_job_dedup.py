@@ -0,0 +1,34 @@
+import pytest
+
+pytest.importorskip("pymongo")
+
+from job_dedup import estimated_jaccard, minhash, normalize_job_text, shingles
+
+JOB = ("Nous recherchons un développeur Python senior pour rejoindre notre équipe data à Lyon. "
+       "Vous concevrez des pipelines ETL, des API Flask et participerez aux revues de code. "
+       "Expérience de 5 ans minimum, maîtrise de SQL, Docker et Kubernetes appréciée. CDI, télétravail partiel.")
+
+
+def signature(text):
+    return minhash(shingles(normalize_job_text(text)))
+
+
+def test_normalize_strips_accents_links_and_tracking():
+    text = "Développeur  PYTHON (H/F) — https://jobs.example.com/123?utm_source=x ref=abc C++ & C#"
+    assert normalize_job_text(text) == "developpeur python h f c++ c#"
+
+
+def test_near_duplicate_scores_high():
+    variant = JOB.replace("  ", " ") + " Postulez sur https://example.com/apply?utm_campaign=1"
+    assert estimated_jaccard(signature(JOB), signature(variant)) >= 0.8
+
+
+def test_unrelated_jobs_score_low():
+    other = ("Cabinet comptable recrute un assistant administratif pour la gestion des factures fournisseurs, "
+             "le classement et l'accueil téléphonique. Maîtrise d'Excel requise, poste à Bordeaux.")
+    assert estimated_jaccard(signature(JOB), signature(other)) < 0.2
+
+
+def test_minhash_is_deterministic_and_handles_empty_text():
+    assert signature(JOB) == signature(JOB)
+    assert estimated_jaccard(signature(""), signature("")) == 1.0
@@ -0,0 +1,26 @@
+import pytest
+
+pytest.importorskip("google.generativeai")
+pytest.importorskip("pymongo")
+
+import llm_gateway
+from cv_parsing import job_parsing
+
+
+def unavailable(*args, **kwargs):
+    raise TimeoutError("deadline")
+
+
+def test_fallbacks_are_marked_degraded(monkeypatch):
+    monkeypatch.setattr(llm_gateway, "get_model", lambda name: None)
+    monkeypatch.setattr(llm_gateway, "generate", unavailable)
+    job_parsing._last_good.clear()
+
+    empty = job_parsing.parse_job("Offre jamais analysée")
+    assert empty["degraded"] and empty["title"] is None
+
+    job_parsing._last_good.set(job_parsing.hashlib.sha256(b"Offre connue").hexdigest(),
+                               {"title": "Data Engineer", "required_skills": ["Python"]})
+    stale = job_parsing.parse_job("Offre connue")
+    assert stale == {"title": "Data Engineer", "required_skills": ["Python"], "degraded": True}
+    assert "degraded" not in job_parsing._last_good.get(job_parsing.hashlib.sha256(b"Offre connue").hexdigest())
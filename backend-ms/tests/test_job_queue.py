@@ -0,0 +1,57 @@
+import pytest
+
+pytest.importorskip("pymongo")
+
+from job_queue import DONE, FAILED, QUEUED, RUNNING, JobQueue, current_job_id
+
+
+class FakeCollection:
+    """Collection minimale : enregistre les update_one appliqués à la tâche."""
+
+    def __init__(self):
+        self.updates = []
+
+    def create_index(self, *args, **kwargs):
+        pass
+
+    def update_one(self, query, update):
+        self.updates.append(update)
+
+
+def make_queue(handler):
+    queue = JobQueue(FakeCollection(), concurrency={}, max_attempts=3)
+    queue.register("t", handler)
+    return queue
+
+
+def run(queue):
+    queue._run({"_id": "job1", "type": "t", "status": RUNNING, "attempts": 1, "claim": "c"})
+    return queue.collection.updates[-1]["$set"]
+
+
+def test_deterministic_error_fails_without_retry():
+    queue = make_queue(lambda p, uid: ({"error": "Modèle de similarité non disponible"}, 500))
+    assert run(queue)["status"] == FAILED
+
+
+def test_unavailable_status_is_retried():
+    queue = make_queue(lambda p, uid: ({"error": "Gemini indisponible"}, 503))
+    assert run(queue)["status"] == QUEUED
+
+
+def test_exceptions_retried_only_when_transient():
+    def timeout(p, uid):
+        raise TimeoutError("deadline")
+
+    def bug(p, uid):
+        raise KeyError("cvText")
+
+    assert run(make_queue(timeout))["status"] == QUEUED
+    assert run(make_queue(bug))["status"] == FAILED
+
+
+def test_current_job_id_set_during_handler():
+    seen = []
+    queue = make_queue(lambda p, uid: (seen.append(current_job_id()) or {"ok": True}, 200))
+    assert run(queue)["status"] == DONE
+    assert seen == ["job1"] and current_job_id() is None
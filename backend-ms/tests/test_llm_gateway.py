@@ -0,0 +1,48 @@
+import time
+
+import pytest
+
+pytest.importorskip("google.generativeai")
+pytest.importorskip("pymongo")
+
+import llm_gateway
+
+
+def slow_call(seconds):
+    def call(deadline, slot):
+        slot.acquire(deadline)
+        try:
+            time.sleep(seconds)
+            return "ok"
+        finally:
+            slot.release()
+    return call
+
+
+def test_abandoned_calls_release_their_main_slot(monkeypatch):
+    monkeypatch.setattr(llm_gateway, "hedge_delay", lambda op: 0.05)
+    free_before = llm_gateway._semaphore._value
+    with pytest.raises(llm_gateway.DeadlineExceededError):
+        llm_gateway._hedged(slow_call(0.5), "parse_cv", 0.2)
+    # Requête initiale + couverture toujours en vol, mais sur le budget des orphelins
+    assert llm_gateway._semaphore._value == free_before
+    time.sleep(0.5)
+    assert llm_gateway._orphan_semaphore._value == llm_gateway.ORPHAN_MAX_CONCURRENCY
+
+
+def test_call_not_started_before_deadline_is_never_sent():
+    slot = llm_gateway._Slot()
+    slot.abandon()
+    with pytest.raises(llm_gateway.DeadlineExceededError):
+        slot.acquire(time.monotonic() + 1)
+
+
+def test_stream_without_free_slot_times_out(monkeypatch):
+    monkeypatch.setattr(llm_gateway, "configure", lambda: None)
+    monkeypatch.setattr(llm_gateway, "_semaphore", llm_gateway.threading.BoundedSemaphore(1))
+    monkeypatch.setattr(llm_gateway, "breaker", llm_gateway.CircuitBreaker())
+    llm_gateway._semaphore.acquire()
+    with pytest.raises(llm_gateway.DeadlineExceededError) as exc:
+        list(llm_gateway.generate_stream(None, "prompt", operation="chat", timeout=0.1))
+    assert llm_gateway.is_unavailable_error(exc.value)
+    assert not llm_gateway.breaker._probe_in_flight
@@ -0,0 +1,47 @@
+from datetime import datetime
+
+from cv_parsing.normalization import (degree_level, job_filters, normalize_contract, normalize_location,
+                                      parse_required_years, prefilter_query, years_of_experience)
+
+
+def test_required_years_uses_headline_duration():
+    assert parse_required_years("Expérience de 10 ans, dont 2 ans en management") == 10
+    assert parse_required_years("Minimum 3 ans (dont 1 an en Python)") == 3
+    assert parse_required_years("6 mois") == 0.5
+    assert parse_required_years("Débutant accepté") == 0
+    assert parse_required_years(None) is None
+
+
+def test_required_years_range_takes_minimum():
+    assert parse_required_years("2 à 5 ans") == 2
+    assert parse_required_years("3-5 years of experience") == 3
+
+
+def test_degree_level():
+    assert degree_level("Bac+5 informatique") == 5
+    assert degree_level("BUT Informatique") == 3
+    assert degree_level("High school diploma, but no degree") == 0
+    assert degree_level("Doctorat", "Licence") == 8
+    assert degree_level(None) is None
+
+
+def test_years_of_experience_merges_overlaps():
+    now = datetime(2024, 6, 1)
+    experience = [{"years_worked": "01/2019 - 12/2020"}, {"years_worked": "06/2020 - 12/2021"}]
+    assert years_of_experience(experience, now) == 3.0
+    assert years_of_experience([{"years_worked": "2022 - présent"}], now) == 2.5
+
+
+def test_contract_and_location():
+    assert normalize_contract("Stage de fin d'études (possibilité de CDI)") == "stage"
+    assert normalize_contract(None, "Développeur Python - CDI") == "cdi"
+    assert normalize_location("Paris (75) - Hybride") == "paris"
+    assert normalize_location("Full remote") == "remote"
+
+
+def test_job_filters_and_query():
+    filters = job_filters({"experience_required": "3 ans", "contract": "CDD", "location": "Lyon",
+                           "education_required": "Master"})
+    assert filters == {"years_experience": 3, "contract": "cdd", "location": "lyon", "degree_level": 5}
+    assert prefilter_query(min_years=2, include_unknown=False) == {"filters.years_experience": {"$gte": 2}}
+    assert prefilter_query() == {}
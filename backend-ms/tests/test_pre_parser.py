@@ -0,0 +1,19 @@
+from cv_parsing.pre_parser import extract_phone
+
+
+def test_extract_phone_international_and_national():
+    assert extract_phone("Tél : +33 6 12 34 56 78") == "+33 6 12 34 56 78"
+    assert extract_phone("Mobile 06.12.34.56.78 - Lyon") == "06.12.34.56.78"
+
+
+def test_extract_phone_ignores_year_runs():
+    assert extract_phone("Développeur 2018 - 2019 - 2021") is None
+    assert extract_phone("Stage 06/2019 - 2021 chez ACME") is None
+
+
+def test_extract_phone_requires_phone_prefix():
+    assert extract_phone("Réf. 12 34 56 78 90") is None
+
+
+def test_extract_phone_ambiguous_goes_to_gemini():
+    assert extract_phone("Perso : 06 12 34 56 78 / Pro : 01 23 45 67 89") is None
@@ -0,0 +1,23 @@
+import pytest
+
+pytest.importorskip("google.generativeai")
+pytest.importorskip("pymongo")
+
+from question_bank import skill_key
+from quiz_module import QuizQuestion, _build_quiz_from_json, is_placeholder_question
+
+
+def question(text="Que fait `docker ps` ?", options=("A", "B", "C", "D")):
+    return QuizQuestion(question=text, options=list(options), correct_answer=0,
+                        explanation="", skill_area="Docker", difficulty="intermédiaire")
+
+
+def test_skill_key_uses_taxonomy_canonical_form():
+    assert skill_key("k8s") == skill_key("Kubernetes") == "kubernetes"
+    assert skill_key("  Compétence Inconnue ") == "competence inconnue"
+
+
+def test_placeholders_detected():
+    assert not is_placeholder_question(question())
+    assert is_placeholder_question(_build_quiz_from_json({}, "débutant").questions[0])
+    assert is_placeholder_question(question(options=("A", "B", "Option 3", "Option 4")))
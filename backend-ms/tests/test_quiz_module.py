@@ -0,0 +1,74 @@
+import pytest
+
+pytest.importorskip("google.generativeai")
+
+import llm_gateway
+from quiz_module import Quiz, QuizGenerator, QuizQuestion, _QuestionStreamParser
+
+
+def q(text):
+    return QuizQuestion(question=text, options=["A", "B", "C", "D"], correct_answer=0,
+                        explanation="", skill_area="Python", difficulty="intermédiaire")
+
+
+# ----------------------------------------------------------------------
+# Parseur streaming
+# ----------------------------------------------------------------------
+def test_stream_parser_yields_each_completed_question():
+    text = '```json\n{"quiz_title": "T", "questions": [{"question": "a {x}", "options": ["[1]"]}, {"question": "b \\" }"}]}'
+    parser = _QuestionStreamParser()
+    found = []
+    for i in range(0, len(text), 7):
+        found += parser.feed(text[i:i + 7])
+    assert [f["question"] for f in found] == ["a {x}", 'b " }']
+
+
+def test_stream_parser_ignores_other_arrays():
+    parser = _QuestionStreamParser()
+    assert parser.feed('{"tags": [{"question": "non"}], "questions": [{"question": "oui"}]}') == [{"question": "oui"}]
+
+
+# ----------------------------------------------------------------------
+# Lots parallèles
+# ----------------------------------------------------------------------
+def test_plan_chunks_sizes():
+    assert QuizGenerator._plan_chunks(20, None) == [(None, 5)] * 4
+    chunks = QuizGenerator._plan_chunks(13, ["Python", "SQL"])
+    assert chunks == [(["Python"], 4), (["Python"], 3), (["SQL"], 6)]
+    assert sum(n for _, n in chunks) == 13
+
+
+def test_chunk_prompts_are_distinct():
+    gen = QuizGenerator(model=object())
+    profile = {"name": "A", "skills": ["Python"]}
+    prompts = {gen._chunk_prompt(profile, "intermédiaire", 5, None, i, 4) for i in range(4)}
+    assert len(prompts) == 4
+
+
+def test_chunked_quiz_tops_up_after_duplicates(monkeypatch):
+    gen = QuizGenerator(model=object())
+    calls = []
+
+    def fake_chunk(prompt, level, n, skills):
+        calls.append(prompt)
+        if len(calls) <= 4:
+            return [q(f"Question {i}") for i in range(n)]  # quatre lots identiques
+        return [q(f"Complément {len(calls)}-{i}") for i in range(n)]
+
+    monkeypatch.setattr(gen, "_generate_chunk", fake_chunk)
+    quiz = gen._generate_chunked({"name": "A"}, "intermédiaire", 20, None)
+    assert len(quiz.questions) == 20
+    assert "Question 0" in calls[-1]  # le complément connaît les questions déjà obtenues
+
+
+def test_stream_skips_questions_already_banked(monkeypatch):
+    gen = QuizGenerator(model=object())
+    monkeypatch.setattr(gen, "_draw_from_bank", lambda *args: [q("Question 0")])
+    monkeypatch.setattr(gen, "_store_in_bank", lambda questions, level: None)
+    raw = ', '.join('{"question": "%s", "options": ["A", "B", "C", "D"], "correct_answer": 0}' % t
+                    for t in ("Question 0", "Question 1", "Question 1", "Question 2"))
+    monkeypatch.setattr(llm_gateway, "generate_stream", lambda *args, **kwargs: iter(['{"questions": [%s]}' % raw]))
+
+    items = list(gen.generate_quiz_stream({"name": "A"}, "intermédiaire", num_questions=3))
+    assert [i.question for i in items[:-1]] == ["Question 0", "Question 1", "Question 2"]
+    assert isinstance(items[-1], Quiz) and len(items[-1].questions) == 3
@@ -0,0 +1,29 @@
+from skill_taxonomy import SkillTaxonomy, taxonomy
+
+
+def test_extract_canonical_longest_match_and_symbols():
+    text = "Expert Spring Boot, C++, C#, .NET, k8s et Node.js ; JavaScript/TypeScript. Java."
+    assert taxonomy.extract(text) == ["Spring Boot", "C++", "C#", ".NET", "Kubernetes", "Node.js",
+                                      "JavaScript", "TypeScript", "Java"]
+
+
+def test_extract_requires_word_boundaries():
+    small = SkillTaxonomy([{"name": "Go", "aliases": ["golang"]}, {"name": "R"}])
+    assert small.extract("Google, Rust, Docker") == []
+    assert small.extract("Go (Golang) et R") == ["Go", "R"]
+
+
+def test_extract_each_aligns_with_items():
+    assert taxonomy.extract_each(["React.js", "PostgreSQL", "rien"]) == [["React"], ["PostgreSQL"], []]
+
+
+def test_canonical():
+    assert taxonomy.canonical("K8S") == "Kubernetes"
+    assert taxonomy.canonical("inconnu") is None
+
+
+def test_missing_skills_uses_aliases_and_raw_text():
+    missing = taxonomy.missing_skills(["Kubernetes", "Docker", "PostgreSQL", "Compétence maison"],
+                                      ["k8s"], have_text="Déploiement avec Docker")
+    assert missing == ["PostgreSQL", "Compétence maison"]
+    assert taxonomy.missing_skills(["Compétence maison"], ["compétence  MAISON"]) == []
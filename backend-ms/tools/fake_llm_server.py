@@ -0,0 +1,258 @@
+# tools/fake_llm_server.py - Serveur Gemini factice (tests de charge sans consommer de quota)
+# Implémente generateContent et streamGenerateContent (API REST v1beta) avec :
+# - latence configurable (fixe, uniforme ou log-normale) et taux d'erreurs (500/503, 429)
+# - réponses canoniques valides pour chaque prompt de l'application (CV, CV groupés, offre,
+#   quiz, vérification, explications, chat, résumé de chat)
+#
+# Lancement :
+#   python tools/fake_llm_server.py --port 8089 --latency lognormal:800:0.5 --error-rate 0.02
+# Puis l'API, pointée sur ce serveur :
+#   GEMINI_API_ENDPOINT=http://127.0.0.1:8089 GEMINI_TRANSPORT=rest GOOGLE_API_KEY=fake MONGO_MOCK=1 python apps.py
+
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+_ROUTE_RE = re.compile(r"^/v1beta/models/(?P<model>[^:/]+):(?P<method>generateContent|streamGenerateContent)")
+
+SKILLS = ["Python", "SQL", "Docker", "React", "Git", "Machine Learning", "Flask", "MongoDB"]
+
+
+# ----------------------------------------------------------------------
+# Latence / erreurs
+# ----------------------------------------------------------------------
+def parse_latency(spec: str) -> Callable[[], float]:
+    """
+    Distribution de latence (ms) -> fonction renvoyant un délai en secondes.
+      fixed:500 | uniform:200:1500 | lognormal:<médiane>:<sigma>
+    """
+    kind, *args = spec.split(":")
+    values = [float(a) for a in args]
+    if kind == "fixed":
+        return lambda: values[0] / 1000.0
+    if kind == "uniform":
+        return lambda: random.uniform(values[0], values[1]) / 1000.0
+    if kind == "lognormal":
+        median, sigma = values[0], (values[1] if len(values) > 1 else 0.5)
+        return lambda: random.lognormvariate(math.log(median), sigma) / 1000.0
+    raise ValueError(f"Distribution de latence inconnue: {spec}")
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.by_kind: Dict[str, int] = {}
+        self.errors = 0
+
+    def hit(self, kind: str) -> None:
+        with self.lock:
+            self.by_kind[kind] = self.by_kind.get(kind, 0) + 1
+
+    def error(self) -> None:
+        with self.lock:
+            self.errors += 1
+
+
+# ----------------------------------------------------------------------
+# Réponses canoniques
+# ----------------------------------------------------------------------
+def _indices(prompt: str) -> List[int]:
+    return [int(i) for i in re.findall(r"^\[(\d+)\]", prompt, re.MULTILINE)]
+
+
+def fake_candidate(fields: Optional[List[str]] = None, seed: int = 0) -> Dict[str, Any]:
+    rnd = random.Random(seed)
+    full = {
+        "name": f"Candidat {seed}",
+        "email": f"candidat{seed}@example.com",
+        "phone": "+33 6 00 00 00 00",
+        "skills": rnd.sample(SKILLS, 5),
+        "education": [{"degree": "Master Informatique", "institution_name": "Université de Test",
+                       "graduation_year": "2021"}],
+        "experience": [{"job_title": "Développeur", "company_name": "ACME", "years_worked": "2019-2023",
+                        "description": "Développement d'API et de pipelines de données."}],
+        "certifications": ["AWS Certified Cloud Practitioner"],
+        "languages": ["Français", "Anglais"],
+    }
+    return {f: full[f] for f in (fields or full)}
+
+
+def fake_questions(n: int, skill: str, level: str) -> List[Dict[str, Any]]:
+    return [
+        {
+            "id": i + 1,
+            "question": f"[{skill}] Question factice n°{random.randint(0, 10**6)} ({level}) ?",
+            "options": ["Réponse A", "Réponse B", "Réponse C", "Réponse D"],
+            "correct_answer": random.randint(0, 3),
+            "explanation": "Explication factice.",
+            "skill_area": skill,
+            "difficulty": level,
+        }
+        for i in range(n)
+    ]
+
+
+def respond(prompt: str) -> Tuple[str, str]:
+    """Renvoie (type de prompt, texte de la réponse)."""
+    if "<<<CV " in prompt:
+        ids = [int(i) for i in re.findall(r"<<<CV (\d+)>>>", prompt)]
+        return "parse_cv_bulk", json.dumps([{"doc_id": i, **fake_candidate(seed=i)} for i in ids])
+    if prompt.startswith("Extract the information from the given text extracted from a candidate CV"):
+        fields = re.findall(r"'(\w+)':''", prompt.split("\n", 2)[1])
+        return "parse_cv", json.dumps(fake_candidate(fields, seed=len(prompt)))
+    if "Analyse le texte d'offre d'emploi" in prompt:
+        return "parse_job", json.dumps({
+            "title": "Développeur Python", "company": "ACME", "location": "Paris", "contract": "CDI",
+            "required_skills": random.sample(SKILLS, 4), "experience_required": "3 ans",
+            "education_required": "Bac+5", "responsibilities": ["Développer des API", "Écrire des tests"],
+        })
+    if "GÉNÈRE EXCLUSIVEMENT DU JSON" in prompt:
+        n = int((re.search(r"Génère exactement (\d+) questions", prompt) or [0, 5])[1])
+        focus = re.search(r"COMPÉTENCES PRIORITAIRES[^:]*: (.+)", prompt)
+        skill = focus.group(1).split(",")[0].strip() if focus else random.choice(SKILLS)
+        level = (re.search(r"NIVEAU DEMANDÉ: (\S+)", prompt) or [0, "INTERMÉDIAIRE"])[1].lower()
+        return "quiz", json.dumps({"quiz_title": f"Quiz {level.title()} - Évaluation Technique",
+                                   "quiz_description": "Quiz factice", "estimated_duration": int(n * 1.5),
+                                   "questions": fake_questions(n, skill, level)}, ensure_ascii=False)
+    if "Vérifie la cohérence de chacune" in prompt:
+        return "quiz_verify", json.dumps({"verifications": [
+            {"index": i, "is_correct_answer_valid": True, "correct_answer_index": 0, "correct_option_text": "",
+             "explanation_is_valid": True, "corrected_explanation": "", "verification_details": "ok"}
+            for i in _indices(prompt)]})
+    if "Vérifie la cohérence de cette question" in prompt:
+        return "quiz_verify", json.dumps({"is_correct_answer_valid": True, "correct_answer_index": 0,
+                                          "correct_option_text": "", "explanation_is_valid": True,
+                                          "corrected_explanation": "", "verification_details": "ok"})
+    if '"explanations"' in prompt:
+        return "quiz_explain", json.dumps({"explanations": [
+            {"index": i, "explanation": "Explication détaillée factice."} for i in _indices(prompt)]},
+            ensure_ascii=False)
+    if "explication pédagogique" in prompt:
+        return "quiz_explain", "Explication détaillée factice."
+    if "Tu tiens le résumé d'une conversation" in prompt:
+        return "chat_summary", "Résumé factice : l'utilisateur prépare une candidature de développeur Python."
+    return "chat", "Réponse factice de l'assistant : pensez à mettre en avant vos projets récents."
+
+
+def _prompt_text(body: Dict[str, Any]) -> str:
+    parts = []
+    for content in body.get("contents", []) or []:
+        for part in content.get("parts", []) or []:
+            if "text" in part:
+                parts.append(part["text"])
+    return "\n".join(parts)
+
+
+def _candidate(text: str) -> Dict[str, Any]:
+    return {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]},
+                            "finishReason": "STOP", "index": 0}],
+            "usageMetadata": {"promptTokenCount": 0, "candidatesTokenCount": len(text) // 4,
+                              "totalTokenCount": len(text) // 4}}
+
+
+# ----------------------------------------------------------------------
+# Serveur HTTP
+# ----------------------------------------------------------------------
+def make_handler(latency: Callable[[], float], error_rate: float, throttle_rate: float,
+                 stream_chunks: int, stats: Stats):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt, *args):
+            pass
+
+        def _send_json(self, status: int, payload: Any) -> None:
+            data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            match = _ROUTE_RE.match(self.path)
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if not match:
+                self._send_json(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+                return
+
+            delay = latency()
+            roll = random.random()
+            if roll < error_rate:
+                time.sleep(delay / 2)
+                stats.error()
+                status = random.choice([500, 503])
+                self._send_json(status, {"error": {"code": status, "message": "Fake upstream error",
+                                                   "status": "INTERNAL" if status == 500 else "UNAVAILABLE"}})
+                return
+            if roll < error_rate + throttle_rate:
+                stats.error()
+                self._send_json(429, {"error": {"code": 429, "message": "Quota exceeded",
+                                                "status": "RESOURCE_EXHAUSTED"}})
+                return
+
+            kind, text = respond(_prompt_text(body))
+            stats.hit(kind)
+            if match.group("method") == "generateContent":
+                time.sleep(delay)
+                self._send_json(200, _candidate(text))
+                return
+
+            # Streaming : tableau JSON envoyé morceau par morceau (format attendu par le transport REST)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            size = max(1, math.ceil(len(text) / stream_chunks))
+            pieces = [text[i:i + size] for i in range(0, len(text), size)] or [""]
+            for i, piece in enumerate(pieces):
+                time.sleep(delay / len(pieces))
+                frame = ("[" if i == 0 else ",") + json.dumps(_candidate(piece), ensure_ascii=False)
+                self._write_chunk(frame.encode("utf-8"))
+            self._write_chunk(b"]")
+            self._write_chunk(b"")
+
+        def _write_chunk(self, data: bytes) -> None:
+            self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+    return Handler
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Serveur Gemini factice")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", default="lognormal:800:0.5",
+                        help="fixed:<ms> | uniform:<min>:<max> | lognormal:<médiane>:<sigma>")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="part de réponses 500/503")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="part de réponses 429")
+    parser.add_argument("--stream-chunks", type=int, default=8, help="nb de morceaux en streaming")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    stats = Stats()
+    handler = make_handler(parse_latency(args.latency), args.error_rate, args.throttle_rate,
+                           args.stream_chunks, stats)
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    print(f"🧪 Gemini factice sur http://{args.host}:{args.port} (latence {args.latency}, "
+          f"erreurs {args.error_rate:.0%}, 429 {args.throttle_rate:.0%})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"📊 Requêtes servies: {stats.by_kind} | erreurs injectées: {stats.errors}")
+
+
+if __name__ == "__main__":
+    main()
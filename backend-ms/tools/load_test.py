@@ -0,0 +1,218 @@
+# tools/load_test.py - Test de charge des endpoints adossés à Gemini
+# Chaque utilisateur virtuel s'inscrit puis enchaîne : upload -> parse-cv -> match -> quiz
+# -> quiz/evaluate -> chat. Rapport par endpoint : nb de requêtes, erreurs, p50/p95/p99 (ms)
+# et débit (req/s). Bibliothèque standard uniquement.
+#
+# Exemple (API lancée contre tools/fake_llm_server.py, Mongo local ou MONGO_MOCK=1) :
+#   python tools/load_test.py --base-url http://127.0.0.1:3001 --users 20 --iterations 5
+#   python tools/load_test.py --users 50 --duration 120 --json rapport.json
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from metrics import percentile  # noqa: E402
+
+ENDPOINTS = ["/api/upload", "/api/parse-cv", "/api/match", "/api/quiz", "/api/quiz/evaluate", "/api/chat"]
+
+SAMPLE_CV = """Jean Dupont
+jean.dupont@example.com | +33 6 12 34 56 78
+Développeur Python - 4 ans d'expérience
+Compétences : Python, Flask, SQL, Docker, Git, MongoDB
+Expérience : Développeur backend chez ACME (2020-2024), API REST et pipelines de données.
+Formation : Master Informatique, Université de Lyon, 2020
+Langues : Français, Anglais"""
+
+SAMPLE_JOB = """Développeur Python confirmé (CDI) - Paris
+Nous recherchons un développeur Python avec 3 ans d'expérience minimum.
+Compétences requises : Python, Django, PostgreSQL, Docker, Kubernetes.
+Missions : concevoir des API, écrire des tests, participer aux revues de code."""
+
+
+# ----------------------------------------------------------------------
+# Fichier PDF minimal (texte brut) pour /api/upload
+# ----------------------------------------------------------------------
+def build_pdf(text: str) -> bytes:
+    def esc(line: str) -> str:
+        return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+    lines = text.encode("latin-1", "replace").decode("latin-1").splitlines()
+    stream = "BT /F1 11 Tf 50 780 Td 14 TL " + " ".join(f"({esc(l)}) '" for l in lines) + " ET"
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents 4 0 R "
+        "/Resources << /Font << /F1 5 0 R >> >> >>",
+        f"<< /Length {len(stream.encode('latin-1'))} >>\nstream\n{stream}\nendstream",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n{obj}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    out += "".join(f"{o:010d} 00000 n \n" for o in offsets).encode("latin-1")
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    return bytes(out)
+
+
+# ----------------------------------------------------------------------
+# Client HTTP + mesures
+# ----------------------------------------------------------------------
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+    def add(self, endpoint: str, ms: float, ok: bool) -> None:
+        with self.lock:
+            self.samples.setdefault(endpoint, []).append(ms)
+            if not ok:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def report(self, elapsed_s: float) -> Dict[str, Dict[str, Any]]:
+        with self.lock:
+            return {
+                ep: {
+                    "requests": len(vals),
+                    "errors": self.errors.get(ep, 0),
+                    "p50_ms": round(percentile(vals, 50), 1),
+                    "p95_ms": round(percentile(vals, 95), 1),
+                    "p99_ms": round(percentile(vals, 99), 1),
+                    "throughput_rps": round(len(vals) / elapsed_s, 2) if elapsed_s else 0.0,
+                }
+                for ep, vals in self.samples.items()
+            }
+
+
+class Client:
+    def __init__(self, base_url: str, recorder: Recorder, timeout: float):
+        self.base_url = base_url.rstrip("/")
+        self.recorder = recorder
+        self.timeout = timeout
+        self.token: Optional[str] = None
+
+    def request(self, endpoint: str, payload: Any = None, body: Optional[bytes] = None,
+                content_type: str = "application/json", record: bool = True) -> Tuple[int, Dict[str, Any]]:
+        data = body if body is not None else json.dumps(payload or {}).encode("utf-8")
+        headers = {"Content-Type": content_type}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        req = urllib.request.Request(self.base_url + endpoint, data=data, headers=headers, method="POST")
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                status, raw = resp.status, resp.read()
+        except urllib.error.HTTPError as e:
+            status, raw = e.code, e.read()
+        except Exception as e:
+            status, raw = 0, json.dumps({"error": str(e)}).encode("utf-8")
+        ms = (time.perf_counter() - started) * 1000
+        if record:
+            self.recorder.add(endpoint, ms, 200 <= status < 300)
+        try:
+            return status, json.loads(raw or b"{}")
+        except ValueError:
+            return status, {}
+
+    def upload(self, filename: str, content: bytes) -> Tuple[int, Dict[str, Any]]:
+        boundary = uuid.uuid4().hex
+        body = (
+            f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"{filename}\"\r\n"
+            f"Content-Type: application/pdf\r\n\r\n"
+        ).encode("utf-8") + content + f"\r\n--{boundary}--\r\n".encode("utf-8")
+        return self.request("/api/upload", body=body, content_type=f"multipart/form-data; boundary={boundary}")
+
+
+# ----------------------------------------------------------------------
+# Scénario
+# ----------------------------------------------------------------------
+def virtual_user(index: int, args, recorder: Recorder, stop_at: Optional[float], pdf: bytes) -> None:
+    client = Client(args.base_url, recorder, args.timeout)
+    email = f"loadtest-{uuid.uuid4().hex[:10]}-{index}@example.com"
+    status, data = client.request("/api/auth/register", {"email": email, "password": "loadtest",
+                                                          "firstName": "Load", "lastName": f"Test{index}"},
+                                  record=False)
+    client.token = data.get("accessToken")
+    if not client.token:
+        print(f"❌ Utilisateur {index}: inscription impossible ({status})")
+        return
+
+    iteration = 0
+    while iteration < args.iterations or stop_at:
+        if stop_at and time.monotonic() >= stop_at:
+            break
+        iteration += 1
+        _, up = client.upload(f"cv-{index}.pdf", pdf)
+        cv_text = (up.get("text") or "").strip() or SAMPLE_CV
+        client.request("/api/parse-cv", {"cvText": cv_text})
+        client.request("/api/match", {"cvText": cv_text, "jobText": SAMPLE_JOB})
+        _, quiz = client.request("/api/quiz", {"level": args.level, "count": args.quiz_count})
+        questions = quiz.get("questions") or []
+        answers = {str(q.get("id", i)): 0 for i, q in enumerate(questions)}
+        client.request("/api/quiz/evaluate", {"quizId": quiz.get("quiz_id"), "questions": questions,
+                                              "answers": answers})
+        client.request("/api/chat", {"messages": [{"role": "user",
+                                                   "content": "Quelles compétences dois-je renforcer ?"}]})
+
+
+def print_report(report: Dict[str, Dict[str, Any]], elapsed_s: float) -> None:
+    print(f"\n📊 Résultats ({elapsed_s:.1f}s)")
+    print(f"{'endpoint':<22}{'req':>7}{'err':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>9}")
+    for ep in ENDPOINTS:
+        r = report.get(ep)
+        if r:
+            print(f"{ep:<22}{r['requests']:>7}{r['errors']:>6}{r['p50_ms']:>10}{r['p95_ms']:>10}"
+                  f"{r['p99_ms']:>10}{r['throughput_rps']:>9}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Test de charge des endpoints Gemini")
+    parser.add_argument("--base-url", default="http://127.0.0.1:3001")
+    parser.add_argument("--users", type=int, default=10, help="utilisateurs virtuels simultanés")
+    parser.add_argument("--iterations", type=int, default=3, help="scénarios par utilisateur")
+    parser.add_argument("--duration", type=float, default=None, help="durée (s) ; prioritaire sur --iterations")
+    parser.add_argument("--level", default="moyen", choices=["facile", "moyen", "difficile"])
+    parser.add_argument("--quiz-count", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--cv-file", default=None, help="PDF/DOCX à uploader (par défaut : PDF généré)")
+    parser.add_argument("--json", default=None, help="écrit le rapport JSON dans ce fichier")
+    args = parser.parse_args(argv)
+
+    if args.cv_file:
+        with open(args.cv_file, "rb") as f:
+            pdf = f.read()
+    else:
+        pdf = build_pdf(SAMPLE_CV)
+    recorder = Recorder()
+    stop_at = time.monotonic() + args.duration if args.duration else None
+
+    print(f"🚦 {args.users} utilisateur(s) -> {args.base_url}"
+          f" ({f'{args.duration:.0f}s' if args.duration else f'{args.iterations} itération(s)'})")
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=args.users) as pool:
+        for f in [pool.submit(virtual_user, i, args, recorder, stop_at, pdf) for i in range(args.users)]:
+            f.result()
+    elapsed = time.monotonic() - started
+
+    report = recorder.report(elapsed)
+    print_report(report, elapsed)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"elapsed_s": round(elapsed, 2), "users": args.users, "endpoints": report}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
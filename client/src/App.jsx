@@ -111,7 +111,7 @@ function MainApp() {
           <div className="space-y-4">
             <div id="chat" className="sticky top-4">
               {/* 👇 ajoute refreshKey pour recharger les cartes dans le chat */}
-              <ChatSection apiUrl="/api/chat" refreshKey={assistantRefreshKey} />
+              <ChatSection apiUrl="/api/chat/stream" refreshKey={assistantRefreshKey} />
             </div>
           </div>
           {/* // ... */}
@@ -3,7 +3,7 @@ import React, { useEffect, useMemo, useRef, useState, useCallback } from "react"
 import { Send, Loader2, Bot, User, Trash2, Copy, Check, MessageSquare, FileText, Briefcase } from "lucide-react";
 
 export default function ChatSection({
-  apiUrl = "/api/chat",
+  apiUrl = "/api/chat/stream",
   cardsApi = "/api/assistant/cards",
   recosApi = "/api/assistant/recommendations",
   systemPrompt = "Tu es un assistant utile spécialisé en recrutement : tu aides à analyser des CV et des offres d'emploi, et tu réponds en français de façon claire et concise.",
@@ -15,8 +15,12 @@ export default function ChatSection({
   ]);
   const [input, setInput] = useState("");
   const [loading, setLoading] = useState(false);
+  // Réponse en cours de streaming (affichée au fil des morceaux reçus)
+  const [streamingId, setStreamingId] = useState(null);
   const [error, setError] = useState("");
   const [copiedId, setCopiedId] = useState(null);
+  // Session serveur : une fois créée, seul le nouveau message est envoyé (historique résumé côté API)
+  const [sessionId, setSessionId] = useState(null);
 
   const [modalCard, setModalCard] = useState(null);
   const [cards, setCards] = useState({ profile: null, cv: null, job: null });
@@ -26,6 +30,7 @@ export default function ChatSection({
 
   const listRef = useRef(null);
   const inputRef = useRef(null);
+  const contextKeyRef = useRef(refreshKey);
 
   const apiMessages = useMemo(() => [
     { role: "system", content: systemPrompt },
@@ -101,16 +106,44 @@ export default function ChatSection({
       const res = await fetch(apiUrl, {
         method: "POST",
         headers: { "Content-Type": "application/json", ...(token ? { Authorization: `Bearer ${token}` } : {}) },
-        body: JSON.stringify({ messages: [...apiMessages, { role: "user", content: trimmed }] }),
+        body: JSON.stringify(sessionId
+          ? { sessionId, message: trimmed, refreshContext: refreshKey !== contextKeyRef.current }
+          : { messages: [...apiMessages, { role: "user", content: trimmed }] }),
       });
-      const data = await res.json();
-      if (!res.ok) throw new Error(data?.error || `HTTP ${res.status}`);
-      const content = data?.message?.content || data?.reply || data?.choices?.[0]?.message?.content || "(Réponse vide)";
-      setMessages(prev => [...prev, { id: crypto.randomUUID(), role: "assistant", content }]);
+      if (!res.ok || !res.body) {
+        const data = await res.json().catch(() => null);
+        throw new Error(data?.error || `HTTP ${res.status}`);
+      }
+      contextKeyRef.current = refreshKey;
+
+      // SSE : morceaux {"delta"} puis "done" (message complet, ou réponse dégradée) ou "error"
+      const replyId = crypto.randomUUID();
+      const setReply = (content) => setMessages(prev => prev.some(m => m.id === replyId)
+        ? prev.map(m => (m.id === replyId ? { ...m, content } : m))
+        : [...prev, { id: replyId, role: "assistant", content }]);
+      let partial = "";
+      let finished = false;
+      await readServerSentEvents(res, (event, data) => {
+        if (event === "error") throw new Error(data?.error || "Erreur chat");
+        if (event === "done") {
+          finished = true;
+          // sessionId absent/null pour un utilisateur anonyme : l'historique complet reste envoyé
+          if (data?.sessionId) setSessionId(data.sessionId);
+          setReply(data?.message?.content || partial || "(Réponse vide)");
+          return;
+        }
+        if (data?.delta) {
+          partial += data.delta;
+          setStreamingId(replyId);
+          setReply(partial);
+        }
+      });
+      if (!finished) throw new Error("Flux interrompu");
     } catch (e) {
       setError("Impossible d'obtenir une réponse de l'IA.");
       console.error(e);
     } finally {
+      setStreamingId(null);
       setLoading(false);
       inputRef.current?.focus();
     }
@@ -120,6 +153,7 @@ export default function ChatSection({
   function handleKeyDown(e) { if (e.key === "Enter" && !e.shiftKey) { e.preventDefault(); void sendMessage(input); } }
   function clearChat() {
     setMessages([{ id: crypto.randomUUID(), role: "assistant", content: "Nouveau chat démarré ! Comment puis-je vous aider ?" }]);
+    setSessionId(null);
     setError("");
     inputRef.current?.focus();
   }
@@ -178,7 +212,7 @@ export default function ChatSection({
 
         {messages.map(m => <MessageBubble key={m.id} m={m} onCopy={copyMessage} copiedId={copiedId} />)}
 
-        {loading && (
+        {loading && !streamingId && (
           <div className="flex items-start gap-3">
             <div className="mt-1 flex h-9 w-9 items-center justify-center rounded-full bg-gradient-to-r from-purple-600/10 to-blue-600/10">
               <Bot className="h-5 w-5 text-purple-600" />
@@ -231,6 +265,39 @@ export default function ChatSection({
   );
 }
 
+/* ===== Lecture d'un flux SSE (fetch + ReadableStream) ===== */
+async function readServerSentEvents(res, onEvent) {
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  const dispatch = (block) => {
+    let event = "message";
+    const lines = [];
+    for (const line of block.split("\n")) {
+      if (line.startsWith("event:")) event = line.slice(6).trim();
+      else if (line.startsWith("data:")) lines.push(line.slice(5).trimStart());
+    }
+    if (lines.length) onEvent(event, JSON.parse(lines.join("\n")));
+  };
+  try {
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true }).replace(/\r\n/g, "\n");
+      let sep;
+      while ((sep = buffer.indexOf("\n\n")) !== -1) {
+        dispatch(buffer.slice(0, sep));
+        buffer = buffer.slice(sep + 2);
+      }
+    }
+    if (buffer.trim()) dispatch(buffer);
+  } catch (e) {
+    // Évènement "error" ou JSON invalide : on coupe le flux côté client
+    reader.cancel().catch(() => {});
+    throw e;
+  }
+}
+
 /* ===== Affichage de bulles (supporte types) ===== */
 function MessageBubble({ m, onCopy, copiedId }) {
   // message "system"
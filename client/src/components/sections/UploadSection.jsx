@@ -209,6 +209,8 @@ export default function UploadSection({
 
       const data = await res.json();
       setParsedCv?.(data.parsed_cv);
+      // Analyse partielle (service indisponible) : non enregistrée côté serveur
+      if (data.degraded) setWarning(data.warning || "Analyse partielle, non enregistrée.");
       onDataChanged?.(); 
     } catch (err) {
       const msg = err?.message?.includes("Failed to fetch")
@@ -225,8 +227,11 @@ export default function UploadSection({
     if (!jobText?.trim()) return;
     setLoading(true);
     setError("");
+    setWarning("");
     try {
       const res = await userApiService.parseJob(jobText.trim());
+      // Analyse de secours (service indisponible) : non enregistrée côté serveur
+      if (res?.degraded) setWarning(res.warning || "Analyse de l'offre indisponible, non enregistrée.");
       onDataChanged?.();
     } catch (err) {
       setError(err.message || "Erreur d'analyse de l'offre");
@@ -293,6 +298,7 @@ export default function UploadSection({
       }
 
       const data = await res.json();
+      if (data.degraded) setWarning(data.warning || "Analyse partielle, non enregistrée.");
 
       setLastResult({
         score: Math.round((data.score || 0) * 100) / 100,